@@ -0,0 +1,71 @@
+"""Compare the chatbot keyword fallback against the old per-entry loop.
+
+Usage: python -m benchmarks.chatbot_keywords [--entries 5000] [--messages 500]
+"""
+import argparse
+import random
+import string
+import time
+
+from nbtelog.keywords import KeywordMatcher
+
+
+def make_vocabulary(size, rng):
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_keywords(vocabulary, entries, rng):
+    return [
+        ', '.join(' '.join(rng.choices(vocabulary, k=rng.randint(1, 2))) for _ in range(rng.randint(2, 6)))
+        for _ in range(entries)
+    ]
+
+
+def loop_best_match(keywords_list, message):
+    # The matching loop previously inlined in nbtelog.views.chat
+    keyword_matches = []
+    for idx, keywords in enumerate(keywords_list):
+        matches = [k for k in keywords if k in message]
+        if matches:
+            keyword_matches.append((idx, len(matches)))
+    if not keyword_matches:
+        return None
+    return max(keyword_matches, key=lambda x: x[1])[0]
+
+
+def timed(func, messages):
+    start = time.perf_counter()
+    for message in messages:
+        func(message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=5000)
+    parser.add_argument('--messages', type=int, default=500)
+    parser.add_argument('--vocabulary', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+    keyword_fields = make_keywords(vocabulary, args.entries, rng)
+    messages = [' '.join(rng.choices(vocabulary, k=rng.randint(4, 20))) for _ in range(args.messages)]
+
+    start = time.perf_counter()
+    matcher = KeywordMatcher(keyword_fields)
+    build = time.perf_counter() - start
+    keywords_list = [field.lower().split(',') for field in keyword_fields]
+
+    loop = timed(lambda message: loop_best_match(keywords_list, message), messages)
+    automaton = timed(matcher.best_match, messages)
+
+    print(f"entries={args.entries} keywords={len(matcher)} messages={args.messages}")
+    print(f"automaton build: {build * 1000:.1f} ms")
+    print(f"loop:      {loop / args.messages * 1e6:10.1f} us/message")
+    print(f"automaton: {automaton / args.messages * 1e6:10.1f} us/message ({loop / automaton:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Compare two benchmarks.routes result files route by route.
+
+Usage: python -m benchmarks.compare BASELINE.json CANDIDATE.json [--metric p95_ms]
+"""
+import argparse
+import json
+
+METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'throughput_rps')
+
+
+def load(path):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--metric', choices=METRICS, default='p95_ms')
+    args = parser.parse_args()
+
+    before, after = load(args.baseline), load(args.candidate)
+    print(f"baseline  {before['commit'][:10]}{' (dirty)' if before['dirty'] else ''}  {before['timestamp']}")
+    print(f"candidate {after['commit'][:10]}{' (dirty)' if after['dirty'] else ''}  {after['timestamp']}")
+    if before['data'] != after['data'] or before['concurrency'] != after['concurrency']:
+        print("Warning: the runs used different data or concurrency.")
+
+    print(f"\n{'route':22} {'baseline':>10} {'candidate':>10} {'change':>8}")
+    for name in sorted(set(before['routes']) | set(after['routes'])):
+        old = before['routes'].get(name, {}).get(args.metric)
+        new = after['routes'].get(name, {}).get(args.metric)
+        if old is None or new is None:
+            print(f"{name:22} {'-' if old is None else f'{old:.1f}':>10} {'-' if new is None else f'{new:.1f}':>10}")
+            continue
+        change = f"{(new - old) / old * 100:+.0f}%" if old else ''
+        print(f"{name:22} {old:10.1f} {new:10.1f} {change:>8}")
+
+
+if __name__ == '__main__':
+    main()
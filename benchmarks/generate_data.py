@@ -0,0 +1,216 @@
+"""Fill a database with synthetic news, institutions, programs, chatbot entries and documents.
+
+Meant for a scratch database used by benchmarks.routes, e.g.
+
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 python manage.py migrate
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 python -m benchmarks.generate_data --scale 0.1
+
+Rows are written with bulk_create, so the derived data the model signals
+would maintain (search index, statistics, cached home page blocks) is
+rebuilt at the end instead. Document files are small text files saved to
+the default storage under documents/bench/.
+
+Usage: python -m benchmarks.generate_data [--scale 1.0] [--news 50000] [--seed 0] [--no-index]
+"""
+import argparse
+import datetime
+import hashlib
+import os
+import random
+import time
+
+import django
+
+# Default row counts at --scale 1
+DEFAULTS = {
+    'news': 50000,
+    'institutions': 5000,
+    'programs': 50000,
+    'chatbot': 5000,
+    'documents': 2000,
+}
+
+BATCH_SIZE = 1000
+MARKER = 'bench'
+
+# Words the generated text is drawn from, so searches and chat messages
+# built from the same list find something
+WORDS = (
+    'polytechnic accreditation programme institution technical education board national diploma '
+    'higher engineering technology science management computer mechanical electrical civil '
+    'agriculture business administration accounting marketing laboratory workshop curriculum '
+    'students lecturers industry training skills vocational certificate admission examination '
+    'quality assurance audit facilities library research innovation development policy guidelines '
+    'monotechnic college federal state private approval resource inspection report standards'
+).split()
+STATUSES = ['Accredited', 'Interim', 'Denied', 'Expired']
+QUALIFICATIONS = ['ND', 'HND', 'NSQ', 'Certificate', 'Post-HND']
+CHAT_CATEGORIES = ['general', 'accreditation', 'programs', 'institutions', 'admission', 'contact']
+
+
+def words(rng, low, high):
+    return ' '.join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def batched(model, objects):
+    model.objects.bulk_create(objects, batch_size=BATCH_SIZE)
+
+
+def counts(args):
+    return {
+        name: getattr(args, name) if getattr(args, name) is not None else int(default * args.scale)
+        for name, default in DEFAULTS.items()
+    }
+
+
+def generate_news(count, rng):
+    from django.contrib.auth.models import User
+    from nbtelog.models import News, NewsCategory
+
+    author, _ = User.objects.get_or_create(username=f'{MARKER}-author')
+    categories = [
+        NewsCategory.objects.get_or_create(slug=f'{MARKER}-{name}', defaults={'name': name.title()})[0]
+        for name in ('announcements', 'accreditation', 'events', 'research')
+    ]
+    start = datetime.datetime(2015, 1, 1, tzinfo=datetime.timezone.utc)
+    span = (datetime.datetime.now(datetime.timezone.utc) - start).total_seconds()
+    for offset in range(0, count, BATCH_SIZE):
+        news = [
+            News(
+                title=words(rng, 4, 10).capitalize(),
+                slug=f'{MARKER}-{i}',
+                content='\n\n'.join(words(rng, 40, 90) for _ in range(rng.randint(2, 5))),
+                author=author,
+                category=rng.choice(categories),
+                status='published' if rng.random() < 0.9 else 'draft',
+            )
+            for i in range(offset, min(offset + BATCH_SIZE, count))
+        ]
+        batched(News, news)
+        # created_at is auto_now_add, so spread the dates out afterwards
+        for item in news:
+            item.created_at = start + datetime.timedelta(seconds=rng.uniform(0, span))
+        News.objects.bulk_update(news, ['created_at'], batch_size=BATCH_SIZE)
+
+
+def generate_register(institutions, programs, rng):
+    from nbtelog.models import Institution, Program
+
+    batched(Institution, [
+        Institution(
+            name=f"{words(rng, 1, 2).title()} Polytechnic {i}",
+            code=f'{MARKER.upper()}{i:06d}',
+            address=f"{rng.randint(1, 200)} {words(rng, 1, 2).title()} Road",
+            contact_email=f'registrar{i}@example.edu.ng',
+            contact_phone=f'0803{i:07d}',
+            website=f'https://poly{i}.example.edu.ng' if rng.random() < 0.7 else '',
+            established_date=datetime.date(rng.randint(1950, 2020), rng.randint(1, 12), 1),
+            accreditation_status=rng.choice(STATUSES),
+            last_audit_date=datetime.date(rng.randint(2010, 2025), rng.randint(1, 12), 1) if rng.random() < 0.8 else None,
+        )
+        for i in range(institutions)
+    ])
+    institution_ids = list(
+        Institution.objects.filter(code__startswith=MARKER.upper()).values_list('id', flat=True)
+    )
+    if not institution_ids:
+        return
+    for offset in range(0, programs, BATCH_SIZE):
+        batched(Program, [
+            Program(
+                institution_id=institution_ids[i % len(institution_ids)],
+                name=words(rng, 2, 4).title(),
+                code=f'P{i:07d}',
+                description=words(rng, 10, 30),
+                duration=rng.choice(['1 year', '2 years', '3 years']),
+                qualification_type=rng.choice(QUALIFICATIONS),
+                accreditation_status=rng.choice(STATUSES),
+            )
+            for i in range(offset, min(offset + BATCH_SIZE, programs))
+        ])
+
+
+def generate_chatbot(count, rng):
+    from nbtelog.models import ChatBot
+
+    batched(ChatBot, [
+        ChatBot(
+            question=f"What about {words(rng, 3, 8)}?",
+            answer=words(rng, 15, 40).capitalize() + '.',
+            category=rng.choice(CHAT_CATEGORIES),
+            keywords=', '.join(words(rng, 1, 2) for _ in range(rng.randint(2, 5))),
+        )
+        for _ in range(count)
+    ])
+
+
+def generate_documents(count, rng):
+    from django.core.files.base import ContentFile
+    from nbtelog import documents
+    from nbtelog.models import Document
+
+    storage = Document._meta.get_field('file').storage
+    rows = []
+    for i in range(count):
+        text = '\n'.join(words(rng, 10, 20) for _ in range(rng.randint(20, 200)))
+        data = text.encode()
+        name = storage.save(f'documents/{MARKER}/document-{i}.txt', ContentFile(data))
+        rows.append(Document(
+            title=words(rng, 3, 8).capitalize(),
+            description=words(rng, 10, 25),
+            file=name,
+            file_size=len(data),
+            content_type='text/plain',
+            checksum=hashlib.sha256(data).hexdigest(),
+            file_exists=True,
+            metadata_from=name,
+            extracted_text=documents.compress_text(text),
+            text_extracted_from=name,
+        ))
+    batched(Document, rows)
+
+
+def refresh_derived(index):
+    from nbtelog import chatbot, search_index, stats
+
+    if index:
+        search_index.rebuild()
+    stats.recompute()
+    chatbot.invalidate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiplier for the default row counts.")
+    for name, default in DEFAULTS.items():
+        parser.add_argument(f'--{name}', type=int, help=f"Rows to create (default {default} x scale).")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-index', action='store_true',
+                        help="Skip rebuilding the search index (run rebuild_search_index later).")
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nbtesite.settings')
+    django.setup()
+    from nbtelog.models import News
+
+    if News.objects.filter(slug__startswith=f'{MARKER}-').exists():
+        parser.error("This database already has generated data; point DATABASE_URL at a fresh one.")
+
+    rng = random.Random(args.seed)
+    wanted = counts(args)
+    steps = [
+        ('news', lambda: generate_news(wanted['news'], rng)),
+        ('institutions and programs', lambda: generate_register(wanted['institutions'], wanted['programs'], rng)),
+        ('chatbot', lambda: generate_chatbot(wanted['chatbot'], rng)),
+        ('documents', lambda: generate_documents(wanted['documents'], rng)),
+        ('derived data', lambda: refresh_derived(not args.no_index)),
+    ]
+    for label, step in steps:
+        start = time.perf_counter()
+        step()
+        print(f"{label:26} {time.perf_counter() - start:7.1f} s")
+    print(', '.join(f"{count} {name}" for name, count in wanted.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""Load every route in nbtelog.urls with concurrent requests and record latency percentiles.
+
+Sample slugs, primary keys, search terms and pagination cursors are read
+from the database the site uses, so run benchmarks.generate_data first.
+Without --url requests go through Django's test client in this process;
+with --url they go over HTTP to a running server, e.g.
+
+    gunicorn nbtesite.wsgi -w 4 &
+    python -m benchmarks.routes --url http://127.0.0.1:8000 --concurrency 16
+
+Each route gets --requests requests from --concurrency threads. Results are
+written as JSON (default benchmarks/results/<time>-<commit>.json); compare
+two runs with benchmarks.compare.
+
+Usage: python -m benchmarks.routes [--url URL] [--concurrency 8] [--requests 200] [--route NAME ...]
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import django
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+# Routes that are left out, with the reason recorded in the results
+SKIPPED = {
+    'chat_stats': "staff only",
+    'metrics': "set METRICS_TOKEN to include it",
+}
+
+# Routes far heavier than the rest get fewer requests
+REQUEST_SHARE = {
+    'api_export': 0.05,
+}
+
+
+class Request:
+    def __init__(self, path, method='GET', body=None, headers=None):
+        self.path = path
+        self.method = method
+        self.body = body
+        self.headers = headers or {}
+
+
+def _news_cursors(pages):
+    """Cursors of news_list pages spread over the whole published list."""
+    from nbtelog.models import News
+    from nbtelog.pagination import encode_cursor
+    from nbtelog.views import NEWS_PER_PAGE
+
+    published = News.objects.filter(status='published').order_by('-created_at', '-id')
+    total = published.count()
+    cursors = []
+    for page in range(1, pages + 1):
+        offset = total * page // (pages + 1) // NEWS_PER_PAGE * NEWS_PER_PAGE
+        row = published.values_list('created_at', 'id')[offset:offset + 1].first()
+        if row is not None:
+            cursors.append(encode_cursor(row))
+    return cursors
+
+
+def build_requests(rng, samples=50):
+    """Map each URL name in nbtelog.urls to the requests sent to it."""
+    from django.urls import reverse
+    from nbtelog import search_index
+    from nbtelog.models import ChatBot, Document, Institution, News
+    from benchmarks.generate_data import WORDS
+
+    news_slugs = list(News.objects.filter(status='published').order_by('?').values_list('slug', flat=True)[:samples])
+    document_ids = list(Document.objects.filter(file_exists=True).order_by('?').values_list('pk', flat=True)[:samples])
+    institution_codes = list(Institution.objects.order_by('?').values_list('code', flat=True)[:samples])
+    questions = list(ChatBot.objects.filter(is_active=True).order_by('?').values_list('question', flat=True)[:samples])
+    terms = rng.sample(WORDS, min(samples, len(WORDS)))
+
+    def url(name, *args):
+        return reverse(f'nbtelog:{name}', args=args)
+
+    requests = {
+        'news_list': [Request(url('news_list'))] + [
+            Request(f"{url('news_list')}?after={cursor}") for cursor in _news_cursors(10)
+        ],
+        'news_detail': [Request(url('news_detail', slug)) for slug in news_slugs],
+        'search': [Request(f"{url('search')}?q={term}") for term in terms]
+        + [Request(f"{url('search')}?q={a}+{b}&page=2") for a, b in zip(terms, reversed(terms))],
+        'search_suggest': [Request(f"{url('search_suggest')}?q={term[:3]}") for term in terms],
+        'document_download': [Request(url('document_download', pk)) for pk in document_ids],
+        'chat': [
+            Request(url('chat'), 'POST', json.dumps({'message': question}), {'Content-Type': 'application/json'})
+            for question in questions or ['how do i get my programme accredited?']
+        ],
+        'chat_batch': [
+            Request(url('chat_batch'), 'POST', json.dumps({'messages': rng.sample(terms, 5)}),
+                    {'Content-Type': 'application/json'})
+        ],
+        'api_institutions': [Request(url('api_institutions'))]
+        + [Request(f"{url('api_institutions')}?code={code}") for code in institution_codes[:10]],
+        'api_programs': [Request(url('api_programs'))]
+        + [Request(f"{url('api_programs')}?qualification_type={q}") for q in ('ND', 'HND', 'NSQ')],
+        'api_export': [
+            Request(url('api_export', 'programs', 'csv'), headers={'Accept-Encoding': 'gzip'}),
+            Request(url('api_export', 'institutions', 'jsonl')),
+        ],
+    }
+    if token := os.environ.get('METRICS_TOKEN'):
+        requests['metrics'] = [Request(url('metrics'), headers={'Authorization': f'Bearer {token}'})]
+    if search_index.is_empty():
+        print("Warning: the search index is empty; run rebuild_search_index for realistic search timings.")
+    return requests
+
+
+def route_names():
+    from nbtelog import urls
+
+    return [pattern.name for pattern in urls.urlpatterns]
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def send(self, request):
+        data = request.body.encode() if request.body is not None else None
+        http_request = urllib.request.Request(
+            self.base_url + request.path, data=data, method=request.method, headers=request.headers,
+        )
+        try:
+            with urllib.request.urlopen(http_request, timeout=60) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+class InProcessClient:
+    def __init__(self):
+        from django.conf import settings
+
+        # The test client sends Host: testserver
+        settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        self._local = threading.local()
+
+    def send(self, request):
+        from django.test import Client
+
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client()
+        headers = {key.lower(): value for key, value in request.headers.items()}
+        content_type = headers.pop('content-type', 'application/octet-stream')
+        if request.method == 'POST':
+            response = client.post(request.path, request.body, content_type=content_type, headers=headers)
+        else:
+            response = client.get(request.path, headers=headers)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        response.close()
+        return response.status_code
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_route(client, requests, count, concurrency):
+    def one(i):
+        request = requests[i % len(requests)]
+        start = time.perf_counter()
+        try:
+            status = client.send(request)
+        except Exception as e:
+            status = type(e).__name__
+        return time.perf_counter() - start, status
+
+    # One request per sample first, so first-use costs (building the chatbot
+    # index, filling caches) do not land in the measured run
+    for i in range(min(len(requests), count)):
+        one(i)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(one, range(count)))
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(seconds for seconds, _ in samples)
+    statuses = Counter(str(status) for _, status in samples)
+    errors = sum(n for status, n in statuses.items() if not status.isdigit() or int(status) >= 500)
+    return {
+        'requests': count,
+        'errors': errors,
+        'statuses': dict(statuses),
+        'throughput_rps': count / elapsed,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+    }
+
+
+def git_state():
+    def git(*args):
+        try:
+            return subprocess.run(['git', *args], capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return ''
+    return {'commit': git('rev-parse', 'HEAD'), 'dirty': bool(git('status', '--porcelain', '--untracked-files=no', '--', '.', ':!debug.log'))}
+
+
+def data_counts():
+    from nbtelog.models import ChatBot, Document, Institution, News, Program
+
+    return {model._meta.model_name: model.objects.count() for model in (News, Institution, Program, ChatBot, Document)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help="Base URL of a running server (default: test client in this process).")
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help="Requests per route.")
+    parser.add_argument('--route', action='append', help="Only run this URL name (may be repeated).")
+    parser.add_argument('--output', help="Results file (default: benchmarks/results/<time>-<commit>.json).")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nbtesite.settings')
+    django.setup()
+    from django.urls import reverse
+
+    rng = random.Random(args.seed)
+    samples = build_requests(rng)
+    client = HttpClient(args.url) if args.url else InProcessClient()
+
+    results, skipped = {}, {}
+    for name in route_names():
+        if args.route and name not in args.route:
+            continue
+        if name in SKIPPED and name not in samples:
+            skipped[name] = SKIPPED[name]
+            continue
+        requests = samples.get(name)
+        if requests is None:
+            try:
+                requests = [Request(reverse(f'nbtelog:{name}'))]
+            except Exception:
+                skipped[name] = "no sample request"
+                continue
+        if not requests:
+            skipped[name] = "no sample data"
+            continue
+        count = max(1, int(args.requests * REQUEST_SHARE.get(name, 1)))
+        results[name] = result = run_route(client, requests, count, args.concurrency)
+        print(
+            f"{name:22} {result['throughput_rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f}  "
+            f"p95 {result['p95_ms']:7.1f}  p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}"
+        )
+    for name, reason in skipped.items():
+        print(f"{name:22} skipped ({reason})")
+
+    state = git_state()
+    report = {
+        **state,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'target': args.url or 'in-process',
+        'concurrency': args.concurrency,
+        'requests_per_route': args.requests,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'data': data_counts(),
+        'routes': results,
+        'skipped': skipped,
+    }
+    if args.output:
+        output = Path(args.output)
+    else:
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        output = RESULTS_DIR / f"{stamp}-{state['commit'][:8] or 'nogit'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Wrote {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Measure worker cold start time and RSS with and without scikit-learn.
+
+Each sample runs in a fresh interpreter that sets Django up and imports the
+URLconf (and with it every view module), which is what a gunicorn worker or
+a manage.py command pays before doing any work.
+
+Usage: python -m benchmarks.worker_startup [--runs 5]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import nbtesite.urls
+if {eager_sklearn}:
+    # What nbtelog.views imported at module load before the lean scorer
+    import sklearn.feature_extraction.text
+    import sklearn.metrics.pairwise
+elapsed = time.perf_counter() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+json.dump({{'seconds': elapsed, 'max_rss_kb': rss}}, sys.stdout)
+"""
+
+VARIANTS = {
+    'eager sklearn (before)': True,
+    'lean scorer (after)': False,
+}
+
+
+def sample(eager_sklearn):
+    env = dict(os.environ)
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'nbtesite.settings')
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE.format(eager_sklearn=eager_sklearn)],
+        check=True, capture_output=True, text=True, env=env,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    for name, eager_sklearn in VARIANTS.items():
+        samples = [sample(eager_sklearn) for _ in range(args.runs)]
+        seconds = statistics.median(s['seconds'] for s in samples)
+        rss = statistics.median(s['max_rss_kb'] for s in samples)
+        print(f"{name:24} startup {seconds * 1000:7.1f} ms   max RSS {rss / 1024:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
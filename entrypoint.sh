@@ -23,6 +23,20 @@ done
 echo "DB is up."
 
 python manage.py migrate --noinput
+python manage.py rebuild_search_index --if-empty
+# Start the statistics from the current register; signals keep them up to date from here
+python manage.py rebuild_statistics
 python manage.py collectstatic --noinput
 
+# Per-worker metrics files from a previous run (see METRICS_DIR)
+if [ -n "${METRICS_DIR}" ]; then
+  mkdir -p "${METRICS_DIR}"
+  rm -f "${METRICS_DIR}"/metrics-*.json
+fi
+
+# SERVER_MODE=asgi serves the async chat view from uvicorn workers
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+  exec gunicorn nbtesite.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:8000
+fi
+
 exec gunicorn nbtesite.wsgi:application --bind 0.0.0.0:8000
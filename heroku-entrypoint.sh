@@ -7,5 +7,16 @@ python manage.py collectstatic --noinput
 # Run migrations (if database is available)
 python manage.py migrate --noinput || echo "Migrations failed, continuing..."
 
+# Index any kinds the search index does not have yet (first deploy, new kinds)
+python manage.py rebuild_search_index --if-empty || echo "Search index build failed, continuing..."
+
+# Start the statistics from the current register; signals keep them up to date from here
+python manage.py rebuild_statistics || echo "Statistics rebuild failed, continuing..."
+
 # Start the application
+# SERVER_MODE=asgi serves the async chat view from uvicorn workers
+if [ "${SERVER_MODE:-wsgi}" = "asgi" ]; then
+  exec gunicorn nbtesite.asgi:application -k uvicorn_worker.UvicornWorker --bind 0.0.0.0:$PORT
+fi
+
 exec gunicorn nbtesite.wsgi:application --bind 0.0.0.0:$PORT
\ No newline at end of file
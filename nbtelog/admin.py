@@ -1,4 +1,9 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from . import register
 from .models import UserProfile, NewsCategory, News, Institution, Program, Document, SliderImage, ChatBot
 
 @admin.register(UserProfile)
@@ -19,21 +24,65 @@ class NewsAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     date_hierarchy = 'created_at'
 
+class RegisterImportForm(forms.Form):
+    file = forms.FileField(help_text="National register as .csv or .xlsx")
+    dry_run = forms.BooleanField(required=False, help_text="Only validate the rows")
+
+class RegisterImportMixin:
+    """Adds an "Import register" page to the change list (see nbtelog.register)."""
+    change_list_template = 'admin/nbtelog/register_change_list.html'
+    register_kind = None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import/', self.admin_site.admin_view(self.import_register_view), name='%s_%s_import' % info),
+        ] + super().get_urls()
+
+    def import_register_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            raise PermissionDenied
+        result = None
+        form = RegisterImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            try:
+                result = register.import_register(
+                    upload, upload.name, kind=self.register_kind, dry_run=form.cleaned_data['dry_run'],
+                )
+            except register.RegisterError as e:
+                form.add_error('file', str(e))
+            else:
+                level = messages.WARNING if result.errors else messages.SUCCESS
+                self.message_user(request, str(result).capitalize() + '.', level)
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Import {self.register_kind} register",
+            'form': form,
+            'result': result,
+            'columns': register.COLUMNS[self.register_kind],
+        }
+        return TemplateResponse(request, 'admin/nbtelog/register_import.html', context)
+
 @admin.register(Institution)
-class InstitutionAdmin(admin.ModelAdmin):
+class InstitutionAdmin(RegisterImportMixin, admin.ModelAdmin):
+    register_kind = 'institutions'
     list_display = ['name', 'code', 'accreditation_status', 'established_date']
     list_filter = ['accreditation_status']
     search_fields = ['name', 'code']
 
 @admin.register(Program)
-class ProgramAdmin(admin.ModelAdmin):
+class ProgramAdmin(RegisterImportMixin, admin.ModelAdmin):
+    register_kind = 'programs'
     list_display = ['name', 'institution', 'code', 'qualification_type', 'accreditation_status']
     list_filter = ['qualification_type', 'accreditation_status', 'institution']
     search_fields = ['name', 'code', 'institution__name']
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ('title', 'uploaded_at')
+    list_display = ('title', 'uploaded_at', 'download_count')
     list_filter = ('uploaded_at',)
     search_fields = ('title', 'description')
     date_hierarchy = 'uploaded_at'
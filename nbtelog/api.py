@@ -0,0 +1,223 @@
+import hashlib
+import json
+from functools import partial
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, F, Max, Prefetch
+from django.http import Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseNotModified, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags, urlencode
+
+from . import export, page_cache, stats
+from .models import Institution, Program
+from .pagination import keyset_paginate
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Clients may reuse a response this long before revalidating with its ETag
+MAX_AGE = 60
+# Rendered pages are kept under their ETag, which changes with the data
+CACHE_TIMEOUT = 3600
+
+INSTITUTION_FIELDS = [
+    'code', 'name', 'address', 'contact_email', 'contact_phone', 'website',
+    'established_date', 'accreditation_status', 'last_audit_date',
+]
+PROGRAM_FIELDS = ['code', 'name', 'duration', 'qualification_type', 'accreditation_status']
+
+# Query parameters each endpoint reads; the rest are left out of cache keys
+# and page links
+INSTITUTION_PARAMS = ('accreditation_status', 'qualification_type', 'code', 'after', 'before', 'limit')
+PROGRAM_PARAMS = ('accreditation_status', 'qualification_type', 'institution', 'after', 'before', 'limit')
+STATISTICS_PARAMS = ('top',)
+
+
+def register_version():
+    """Return a cheap stamp that changes whenever an institution or program changes.
+
+    Counts catch deletions, which MAX(updated_at) alone would miss.
+    """
+    stamp = []
+    for model in (Institution, Program):
+        row = model.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+        stamp += [row['count'], row['latest'].isoformat() if row['latest'] else '']
+    return stamp
+
+
+def _limit(request):
+    try:
+        return max(1, min(int(request.GET.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))
+    except ValueError:
+        return DEFAULT_LIMIT
+
+
+def _page_url(request, params, **cursor):
+    query = [
+        (name, value)
+        for name in sorted(params) if name not in ('after', 'before')
+        for value in request.GET.getlist(name)
+    ]
+    query += cursor.items()
+    return request.build_absolute_uri(request.path + '?' + urlencode(query))
+
+
+def _json(payload):
+    return json.dumps(payload, cls=DjangoJSONEncoder, separators=(',', ':'))
+
+
+def read_only_api(build=None, *, version=register_version, query_params=()):
+    """Wrap a function building a JSON payload from the request.
+
+    The ETag hashes the data version and the path with the ``query_params``
+    the endpoint reads, so an unchanged resource is answered with 304 (or
+    from the cache) without running the page query at all. ``version``
+    returns the data version; it defaults to register_version.
+    """
+    if build is None:
+        return partial(read_only_api, version=version, query_params=query_params)
+
+    def view(request):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+        data_version = version()
+        path = page_cache.cache_path(request, query_params)
+        key = hashlib.sha256(f"{build.__name__}:{data_version}:{path}".encode()).hexdigest()[:32]
+        etag = f'"{key}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            body = cache.get(f"api:{key}")
+            if body is None:
+                body = _json(build(request))
+                cache.set(f"api:{key}", body, CACHE_TIMEOUT)
+            response = HttpResponse(body, content_type='application/json')
+        response['ETag'] = etag
+        patch_cache_control(response, public=True, max_age=MAX_AGE)
+        return response
+
+    view.__name__ = build.__name__
+    view.__doc__ = build.__doc__
+    return view
+
+
+def _paginated(request, params, page, items):
+    return {
+        'results': items,
+        'next': _page_url(request, params, after=page.next_cursor) if page.has_next else None,
+        'previous': _page_url(request, params, before=page.previous_cursor) if page.has_previous else None,
+    }
+
+
+@read_only_api(query_params=INSTITUTION_PARAMS)
+def institutions(request):
+    """Institutions with their programs, ordered by code.
+
+    Filters: accreditation_status, qualification_type (institutions offering
+    at least one program of that type), code. Pages with ?after=/?before=.
+    """
+    queryset = Institution.objects.only('id', *INSTITUTION_FIELDS)
+    if status := request.GET.get('accreditation_status'):
+        queryset = queryset.filter(accreditation_status=status)
+    if code := request.GET.get('code'):
+        queryset = queryset.filter(code=code)
+    programs = Program.objects.only('id', 'institution_id', *PROGRAM_FIELDS).order_by('code')
+    if qualification := request.GET.get('qualification_type'):
+        queryset = queryset.filter(programs__qualification_type=qualification).distinct()
+        programs = programs.filter(qualification_type=qualification)
+    queryset = queryset.prefetch_related(Prefetch('programs', queryset=programs))
+
+    page = keyset_paginate(
+        queryset, ['code'], _limit(request),
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+    items = [
+        {
+            **{field: getattr(institution, field) for field in INSTITUTION_FIELDS},
+            'programs': [
+                {field: getattr(program, field) for field in PROGRAM_FIELDS}
+                for program in institution.programs.all()
+            ],
+        }
+        for institution in page
+    ]
+    return _paginated(request, INSTITUTION_PARAMS, page, items)
+
+
+@read_only_api(query_params=PROGRAM_PARAMS)
+def programs(request):
+    """Programs ordered by institution and code.
+
+    Filters: accreditation_status, qualification_type, institution (code).
+    Pages with ?after=/?before=.
+    """
+    queryset = Program.objects.all()
+    if status := request.GET.get('accreditation_status'):
+        queryset = queryset.filter(accreditation_status=status)
+    if qualification := request.GET.get('qualification_type'):
+        queryset = queryset.filter(qualification_type=qualification)
+    if institution := request.GET.get('institution'):
+        queryset = queryset.filter(institution__code=institution)
+    queryset = queryset.values(
+        'institution_id', *PROGRAM_FIELDS,
+        institution_code=F('institution__code'), institution_name=F('institution__name'),
+    )
+
+    page = keyset_paginate(
+        queryset, ['institution_id', 'code'], _limit(request),
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+    items = [
+        {key: value for key, value in row.items() if key != 'institution_id'}
+        for row in page
+    ]
+    return _paginated(request, PROGRAM_PARAMS, page, items)
+
+
+@read_only_api(version=stats.version, query_params=STATISTICS_PARAMS)
+def statistics(request):
+    """Institution and program counts, precomputed by nbtelog.stats.
+
+    ?top= sets how many institutions are ranked by number of programs.
+    """
+    try:
+        top = max(1, min(int(request.GET.get('top', stats.TOP_INSTITUTIONS)), MAX_LIMIT))
+    except ValueError:
+        top = stats.TOP_INSTITUTIONS
+    return stats.summary(top)
+
+
+def register_export(request, kind, format):
+    """Stream the whole register as CSV or JSON lines.
+
+    Rows are read with a database cursor and written as they arrive, and
+    gzip-compressed on the fly for clients that accept it, so memory use
+    does not grow with the number of rows. The ETag follows
+    register_version, so an unchanged register is answered with 304
+    without reading any rows.
+    """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+    if kind not in export.EXPORTS or format not in export.FORMATS:
+        raise Http404("Unknown export")
+
+    gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+    key = hashlib.sha256(f"{kind}:{format}:{register_version()}".encode()).hexdigest()[:32]
+    # Compressed and plain bodies differ, so they get different tags
+    etag = f'"{key}-gzip"' if gzip else f'"{key}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        content_type = 'text/csv; charset=utf-8' if format == 'csv' else 'application/x-ndjson; charset=utf-8'
+        response = StreamingHttpResponse(export.export_stream(kind, format, gzip=gzip), content_type=content_type)
+        if gzip:
+            response['Content-Encoding'] = 'gzip'
+        filename = f"{kind}-{timezone.now():%Y%m%d}.{format}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['ETag'] = etag
+    patch_vary_headers(response, ['Accept-Encoding'])
+    patch_cache_control(response, no_cache=True)
+    return response
@@ -0,0 +1,323 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .keywords import KeywordMatcher, normalize_text
+from .models import ChatBot
+from .scoring import get_scorer
+
+logger = logging.getLogger(__name__)
+
+SIMILARITY_THRESHOLD = 0.3
+MAX_BATCH_MESSAGES = 500
+MAX_TOP_K = 20
+
+BUSY_RESPONSE = "I'm sorry, I'm receiving a lot of questions right now. Please try again in a moment."
+NOT_CONFIGURED_RESPONSE = "I'm sorry, I'm not configured yet. Please try again later."
+NO_MATCH_RESPONSE = "I'm sorry, I don't understand your question. Please try rephrasing or contact our support team."
+
+
+class ChatBotBusy(Exception):
+    """Raised when too many messages are already waiting to be scored."""
+
+
+def _version_stamp():
+    return {'count': Count('id'), 'latest': Max('updated_at')}
+
+
+def current_version():
+    """Return a cheap stamp that changes whenever any ChatBot row changes."""
+    stamp = ChatBot.objects.aggregate(**_version_stamp())
+    return (stamp['count'], stamp['latest'])
+
+
+async def acurrent_version():
+    stamp = await ChatBot.objects.aaggregate(**_version_stamp())
+    return (stamp['count'], stamp['latest'])
+
+
+class ChatBotIndex:
+    """TF-IDF model over the active ChatBot questions.
+
+    The scorer is fitted once on the questions and incoming messages are only
+    scored against it; see ``nbtelog.scoring`` for the available backends.
+    """
+
+    def __init__(self, entries, version=None):
+        self.entries = entries
+        self.version = version
+        self.keywords = KeywordMatcher([entry.keywords for entry in entries])
+        self.scorer = get_scorer([entry.question.lower() for entry in entries]) if entries else None
+
+    def __len__(self):
+        return len(self.entries)
+
+    def similarities(self, messages):
+        """Return ``(indices, scores)`` of the non-zero similarities per message."""
+        return self.scorer.scores(messages)
+
+    def similarity(self, message):
+        """Return the cosine similarity of ``message`` against every question."""
+        indices, values = self.similarities([message])[0]
+        scores = np.zeros(len(self.entries))
+        scores[indices] = values
+        return scores
+
+    def keyword_match(self, message):
+        """Return the entry whose keywords appear most often in ``message``."""
+        best_idx = self.keywords.best_match(message)
+        if best_idx is None:
+            return None
+        return self.entries[best_idx]
+
+    def _respond(self, message, best_match_idx, best_match_score):
+        if best_match_score > SIMILARITY_THRESHOLD:
+            return self.entries[best_match_idx].answer, best_match_score
+
+        entry = self.keyword_match(message)
+        if entry is not None:
+            return entry.answer, 0.0
+        return NO_MATCH_RESPONSE, 0.0
+
+    def answer(self, message):
+        """Return ``(response, confidence)`` for a lower-cased user message."""
+        if not self.entries:
+            return NOT_CONFIGURED_RESPONSE, 0.0
+
+        similarity_scores = self.similarity(message)
+        best_match_idx = int(np.argmax(similarity_scores))
+        best_match_score = float(similarity_scores[best_match_idx])
+        logger.debug(f"Best match score: {best_match_score}")
+
+        return self._respond(message, best_match_idx, best_match_score)
+
+    def top_k(self, messages, k=5):
+        """Answer a batch of lower-cased messages and list the best candidates.
+
+        Returns one dict per message with the chosen ``response`` and
+        ``confidence`` (as ``answer`` would give) plus up to ``k`` candidate
+        entries ranked by similarity and then by keyword hits.
+        """
+        if not self.entries:
+            return [
+                {'message': message, 'response': NOT_CONFIGURED_RESPONSE, 'confidence': 0.0, 'candidates': []}
+                for message in messages
+            ]
+
+        results = []
+        for message, (indices, values) in zip(messages, self.similarities(messages)):
+            row_scores = dict(zip(indices.tolist(), values.tolist()))
+            keyword_hits = self.keywords.matches(message)
+
+            candidates = sorted(
+                set(row_scores) | set(keyword_hits),
+                key=lambda idx: (-row_scores.get(idx, 0.0), -len(keyword_hits.get(idx, ())), idx),
+            )[:k]
+
+            if row_scores:
+                best_match_idx = max(row_scores, key=lambda idx: (row_scores[idx], -idx))
+                best_match_score = row_scores[best_match_idx]
+            else:
+                best_match_idx, best_match_score = 0, 0.0
+            response, confidence = self._respond(message, best_match_idx, best_match_score)
+
+            results.append({
+                'message': message,
+                'response': response,
+                'confidence': confidence,
+                'candidates': [
+                    {
+                        'id': self.entries[idx].pk,
+                        'question': self.entries[idx].question,
+                        'answer': self.entries[idx].answer,
+                        'category': self.entries[idx].category,
+                        'score': row_scores.get(idx, 0.0),
+                        'keywords': keyword_hits.get(idx, []),
+                    }
+                    for idx in candidates
+                ],
+            })
+        return results
+
+
+class ResponseCache:
+    """Bounded LRU cache with a per-entry time to live.
+
+    Keeps hit/miss/eviction counters so the size can be tuned from
+    ``stats()``.
+    """
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                expires, value = item
+                if expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class ScoringPool:
+    """Bounded thread pool that scores messages off the event loop.
+
+    At most ``max_pending`` messages may be queued or running at once; past
+    that ``run`` raises ``ChatBotBusy`` straight away so the caller can shed
+    load instead of letting requests pile up.
+    """
+
+    def __init__(self, workers=2, max_pending=16):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='chatbot')
+        self.max_pending = max_pending
+        self.pending = 0
+        self._lock = threading.Lock()
+
+    async def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise ChatBotBusy()
+            self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            with self._lock:
+                self.pending -= 1
+
+
+response_cache = ResponseCache(
+    maxsize=getattr(settings, 'CHATBOT_CACHE_SIZE', 1024),
+    ttl=getattr(settings, 'CHATBOT_CACHE_TTL', 3600),
+)
+
+scoring_pool = ScoringPool(
+    workers=getattr(settings, 'CHATBOT_WORKERS', 2),
+    max_pending=getattr(settings, 'CHATBOT_MAX_PENDING', 16),
+)
+
+_index = None
+_lock = threading.Lock()
+
+
+def get_index():
+    """Return the process-wide index, rebuilding it if the table changed.
+
+    Each worker keeps its own copy. The version stamp is read from the
+    database on every call so a change saved through another worker is picked
+    up on the next request; changes in this worker are dropped immediately by
+    the ``ChatBot`` signal handlers.
+    """
+    version = current_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    return _install(list(ChatBot.objects.filter(is_active=True)), version)
+
+
+async def aget_index():
+    """Async version of ``get_index`` using the async ORM.
+
+    Fitting the new index happens on the scoring pool so the event loop is
+    never blocked by it.
+    """
+    version = await acurrent_version()
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    entries = [entry async for entry in ChatBot.objects.filter(is_active=True)]
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(scoring_pool.executor, _install, entries, version)
+
+
+def _install(entries, version):
+    global _index
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = ChatBotIndex(entries, version=version)
+            response_cache.clear()
+            logger.info(f"Built chatbot index over {len(entries)} active entries")
+        return _index
+
+
+def invalidate():
+    """Drop the cached index so the next request rebuilds it."""
+    global _index
+    with _lock:
+        _index = None
+    response_cache.clear()
+
+
+def answer(index, message):
+    """Return ``(response, confidence)`` for a user message.
+
+    The message is normalized first and answers are cached per normalized
+    message and index version, so repeated questions skip scoring entirely.
+    """
+    key = normalize_text(message)
+    cached = response_cache.get((index.version, key))
+    if cached is not None:
+        return cached
+
+    result = index.answer(key)
+    response_cache.set((index.version, key), result)
+    return result
+
+
+async def aanswer(index, message):
+    """Async version of ``answer``; scoring runs on the bounded pool.
+
+    Raises ``ChatBotBusy`` when the pool is saturated.
+    """
+    key = normalize_text(message)
+    cached = response_cache.get((index.version, key))
+    if cached is not None:
+        return cached
+
+    result = await scoring_pool.run(index.answer, key)
+    response_cache.set((index.version, key), result)
+    return result
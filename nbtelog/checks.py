@@ -0,0 +1,16 @@
+from django.core.checks import Tags, Warning, register
+
+from .static_assets import missing_references
+
+
+@register(Tags.staticfiles, Tags.templates)
+def check_static_references(app_configs, **kwargs):
+    """Warn about templates that refer to static files which do not exist."""
+    return [
+        Warning(
+            f"{template} refers to missing static file '{name}'.",
+            hint="Add the file to STATICFILES_DIRS and run collectstatic, or remove the reference.",
+            id='nbtelog.W001',
+        )
+        for template, name in missing_references()
+    ]
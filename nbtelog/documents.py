@@ -0,0 +1,196 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import posixpath
+import re
+import zipfile
+import zlib
+from html import unescape
+
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Anything past this is not worth indexing
+MAX_TEXT_LENGTH = 1_000_000
+
+_tags = re.compile(r'<[^>]+>')
+_whitespace = re.compile(r'\s+')
+
+# Bytes read per step when hashing a file, and sniffed for its content type
+CHUNK_SIZE = 1024 * 1024
+SNIFF_SIZE = 2048
+
+# Parts of Office Open XML packages that hold the visible text
+OFFICE_PARTS = {
+    '.docx': re.compile(r'word/(document|header\d*|footer\d*|footnotes)\.xml$'),
+    '.pptx': re.compile(r'ppt/slides/slide\d+\.xml$'),
+    '.xlsx': re.compile(r'xl/sharedStrings\.xml$'),
+}
+
+
+def compress_text(text):
+    return zlib.compress(text.encode('utf-8'), 6) if text else b''
+
+
+def decompress_text(data):
+    return zlib.decompress(bytes(data)).decode('utf-8') if data else ''
+
+
+def _extract_pdf(fileobj):
+    # Optional dependency; only needed where documents are uploaded or indexed
+    from pypdf import PdfReader
+
+    parts, length = [], 0
+    for page in PdfReader(fileobj).pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= MAX_TEXT_LENGTH:
+            break
+    return '\n'.join(parts)
+
+
+def _extract_office(fileobj, extension):
+    pattern = OFFICE_PARTS[extension]
+    parts = []
+    with zipfile.ZipFile(fileobj) as package:
+        for name in sorted(package.namelist()):
+            if pattern.match(name):
+                xml = package.read(name).decode('utf-8', errors='ignore')
+                # Paragraph and cell ends become spaces so words do not run together
+                parts.append(_tags.sub(' ', xml))
+    return ' '.join(parts)
+
+
+def extract_text(field_file):
+    """Return the plain text of a PDF or Office Open XML file.
+
+    Unsupported formats give an empty string.
+    """
+    extension = os.path.splitext(field_file.name)[1].lower()
+    if extension != '.pdf' and extension not in OFFICE_PARTS:
+        return ''
+
+    with field_file.open('rb') as fileobj:
+        if extension == '.pdf':
+            text = _extract_pdf(fileobj)
+        else:
+            text = _extract_office(fileobj, extension)
+
+    return _whitespace.sub(' ', unescape(text)).strip()[:MAX_TEXT_LENGTH]
+
+
+def needs_text(document):
+    return bool(document.file) and document.text_extracted_from != document.file.name
+
+
+def refresh_text(document, force=False):
+    """Extract and store the text of ``document`` if its file changed.
+
+    Returns True when new text was stored. The row is updated with a queryset
+    update so no save signals fire again.
+    """
+    if not force and not needs_text(document):
+        return False
+
+    try:
+        text = extract_text(document.file) if document.file else ''
+    except ImportError as e:
+        logger.warning(f"Cannot extract text from {document.file.name}: {e}")
+        return False
+    except Exception as e:
+        logger.error(f"Text extraction failed for {document.file.name}: {e}")
+        text = ''
+
+    document.extracted_text = compress_text(text)
+    document.text_extracted_from = document.file.name if document.file else ''
+    document.text_extracted_at = timezone.now()
+    type(document).objects.filter(pk=document.pk).update(
+        extracted_text=document.extracted_text,
+        text_extracted_from=document.text_extracted_from,
+        text_extracted_at=document.text_extracted_at,
+    )
+    return True
+
+
+def _content_type(head, name):
+    try:
+        # Optional at runtime: python-magic needs the libmagic system library
+        import magic
+        return magic.from_buffer(head, mime=True)
+    except ImportError:
+        return mimetypes.guess_type(name)[0] or 'application/octet-stream'
+
+
+def read_metadata(field_file):
+    """Return (size, content type, SHA-256) of a stored file in one pass."""
+    digest = hashlib.sha256()
+    size = 0
+    head = b''
+    with field_file.open('rb') as fileobj:
+        while chunk := fileobj.read(CHUNK_SIZE):
+            if not head:
+                head = chunk[:SNIFF_SIZE]
+            digest.update(chunk)
+            size += len(chunk)
+    return size, _content_type(head, field_file.name), digest.hexdigest()
+
+
+def needs_metadata(document):
+    return document.metadata_from != (document.file.name or '')
+
+
+def refresh_metadata(document, force=False):
+    """Read and store the size, type and checksum of ``document``'s file.
+
+    Returns True when the row was updated. A missing file is recorded with
+    ``file_exists=False``. Like refresh_text, the row is updated with a
+    queryset update so no save signals fire again.
+    """
+    if not force and not needs_metadata(document):
+        return False
+
+    size, content_type, checksum, exists = None, '', '', None
+    if document.file:
+        try:
+            size, content_type, checksum = read_metadata(document.file)
+            exists = True
+        except FileNotFoundError:
+            exists = False
+        except Exception as e:
+            # S3 reports a missing key as a ClientError; either way the file
+            # cannot be served
+            logger.error(f"Cannot read {document.file.name}: {e}")
+            exists = False
+
+    document.file_size = size
+    document.content_type = content_type
+    document.checksum = checksum
+    document.file_exists = exists
+    document.metadata_from = document.file.name or ''
+    type(document).objects.filter(pk=document.pk).update(
+        file_size=size,
+        content_type=content_type,
+        checksum=checksum,
+        file_exists=exists,
+        metadata_from=document.metadata_from,
+    )
+    return True
+
+
+def stored_names(storage, directories):
+    """Return the names of every file in ``directories`` of ``storage``.
+
+    One listing per directory rather than one existence check per file; on
+    S3 a listing is a paginated ListObjects call.
+    """
+    names = set()
+    for directory in directories:
+        try:
+            _, files = storage.listdir(directory)
+        except FileNotFoundError:
+            continue
+        names.update(posixpath.join(directory, name) if directory else name for name in files)
+    return names
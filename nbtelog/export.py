@@ -0,0 +1,92 @@
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Institution, Program
+
+# Rows fetched per round trip; on PostgreSQL .iterator() uses a server-side
+# cursor so only this many rows are held at once
+CHUNK_SIZE = 2000
+
+# Output is handed to the server (and the compressor) in pieces of about this size
+BUFFER_SIZE = 64 * 1024
+
+EXPORTS = {
+    'institutions': (
+        Institution.objects.order_by('code'),
+        [
+            'code', 'name', 'address', 'contact_email', 'contact_phone', 'website',
+            'established_date', 'accreditation_status', 'last_audit_date', 'updated_at',
+        ],
+    ),
+    'programs': (
+        Program.objects.order_by('institution_id', 'code'),
+        [
+            'institution__code', 'code', 'name', 'description', 'duration',
+            'qualification_type', 'accreditation_status', 'updated_at',
+        ],
+    ),
+}
+FORMATS = ('csv', 'jsonl')
+
+
+def _header(column):
+    return column.replace('__', '_')
+
+
+def _rows(kind):
+    queryset, columns = EXPORTS[kind]
+    return queryset.values_list(*columns).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object for csv.writer that returns what it is given."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(kind):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([_header(column) for column in EXPORTS[kind][1]])
+    for row in _rows(kind):
+        yield writer.writerow(row)
+
+
+def jsonl_lines(kind):
+    keys = [_header(column) for column in EXPORTS[kind][1]]
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in _rows(kind):
+        yield encoder.encode(dict(zip(keys, row))) + '\n'
+
+
+def _buffered(lines):
+    """Join small text lines into BUFFER_SIZE byte chunks."""
+    parts, size = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        parts.append(data)
+        size += len(data)
+        if size >= BUFFER_SIZE:
+            yield b''.join(parts)
+            parts, size = [], 0
+    if parts:
+        yield b''.join(parts)
+
+
+def _gzipped(chunks, level=6):
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(kind, format, gzip=False):
+    """Yield the export of ``kind`` as bytes, in constant memory."""
+    lines = csv_lines(kind) if format == 'csv' else jsonl_lines(kind)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if gzip else chunks
@@ -0,0 +1,104 @@
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.templatetags.static import static
+from django.urls import reverse
+from django.utils.text import Truncator
+
+from .models import Institution, News, SliderImage
+from .page_cache import build_version
+
+# The home page blocks are kept in the cache under a stamp of the model
+# behind them, so a change shows up at once in every worker even with a
+# per-worker cache; the timeout only clears out entries of old stamps
+BLOCK_TIMEOUT = 24 * 3600
+
+LATEST_NEWS = 3
+FEATURED_INSTITUTIONS = 3
+DEFAULT_SLIDES = 7
+
+
+def _key(block, stamp):
+    # The build version is part of the key because the default slides and
+    # rendered URLs point at versioned static files
+    return f"home:{block}:{build_version()}:{stamp}"
+
+
+def data_version(model):
+    """Return a cheap stamp that changes whenever a row of ``model`` changes.
+
+    The count catches deletions, which MAX(updated_at) alone would miss.
+    """
+    stamp = model.objects.aggregate(count=Count('id'), latest=Max('updated_at'))
+    return f"{stamp['count']}:{stamp['latest'].isoformat() if stamp['latest'] else ''}"
+
+
+def _slider_images():
+    slides = [
+        {
+            'url': slide.image.url,
+            'image': slide.responsive_image,
+            'title': slide.title,
+            'caption': slide.caption,
+        }
+        for slide in SliderImage.objects.filter(is_active=True).order_by('order')
+    ]
+    if slides:
+        return slides
+    return [
+        {
+            'url': static(f'images/slide{i}.jpg'),
+            'title': f'Default Slide {i}',
+            'caption': '',
+        }
+        for i in range(1, DEFAULT_SLIDES + 1)
+    ]
+
+
+def _latest_news():
+    news = News.objects.filter(status='published').order_by('-created_at')[:LATEST_NEWS]
+    return [
+        {
+            'title': item.title,
+            'summary': Truncator(item.content).words(30),
+            'url': reverse('nbtelog:news_detail', args=[item.slug]),
+            'image': item.responsive_image,
+            'created_at': item.created_at,
+        }
+        for item in news
+    ]
+
+
+def _featured_institutions():
+    return [
+        {'name': name}
+        for name in Institution.objects.values_list('name', flat=True)[:FEATURED_INSTITUTIONS]
+    ]
+
+
+BLOCKS = {
+    'slider': _slider_images,
+    'news': _latest_news,
+    'institutions': _featured_institutions,
+}
+
+# The model each block is built from
+MODEL_FOR_BLOCK = {
+    'slider': SliderImage,
+    'news': News,
+    'institutions': Institution,
+}
+
+
+def blocks():
+    """Return the home page blocks, building any that are not cached."""
+    keys = {block: _key(block, data_version(MODEL_FOR_BLOCK[block])) for block in BLOCKS}
+    cached = cache.get_many(keys.values())
+    result, missing = {}, {}
+    for block, key in keys.items():
+        if key in cached:
+            result[block] = cached[key]
+        else:
+            result[block] = missing[key] = BLOCKS[block]()
+    if missing:
+        cache.set_many(missing, BLOCK_TIMEOUT)
+    return result
@@ -0,0 +1,153 @@
+import base64
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Widths generated for every uploaded image (never wider than the original)
+WIDTHS = (480, 960, 1440, 1920)
+
+JPEG_QUALITY = 80
+WEBP_QUALITY = 75
+
+# The placeholder is inlined as a data URI and blurred by the browser
+PLACEHOLDER_WIDTH = 24
+
+
+def _encode(image, format, **options):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **options)
+    return buffer.getvalue()
+
+
+def _open(field_file):
+    # Imported here so that modules importing the models do not pay for Pillow
+    from PIL import Image, ImageOps
+
+    with field_file.open('rb') as fileobj:
+        image = Image.open(fileobj)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    return image
+
+
+def _resized(image, width):
+    from PIL import Image
+
+    height = max(1, round(image.height * width / image.width))
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def build_variants(field_file):
+    """Write resized JPEG and WebP copies of ``field_file`` next to it.
+
+    Returns the description stored on the model: the source name and size,
+    an inline placeholder and [width, name] lists for each format.
+    """
+    image = _open(field_file)
+    storage = field_file.storage
+    stem, _ = posixpath.splitext(field_file.name)
+
+    widths = [width for width in WIDTHS if width < image.width] + [image.width]
+    variants = {
+        'source': field_file.name,
+        'width': image.width,
+        'height': image.height,
+        'jpeg': [],
+        'webp': [],
+    }
+    for width in widths:
+        resized = image if width == image.width else _resized(image, width)
+        jpeg = resized.convert('RGB')
+        name = storage.save(
+            f"{stem}_{width}w.jpg",
+            ContentFile(_encode(jpeg, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)),
+        )
+        variants['jpeg'].append([width, name])
+        name = storage.save(
+            f"{stem}_{width}w.webp",
+            ContentFile(_encode(resized, 'WEBP', quality=WEBP_QUALITY, method=4)),
+        )
+        variants['webp'].append([width, name])
+
+    tiny = _resized(image, min(PLACEHOLDER_WIDTH, image.width))
+    data = base64.b64encode(_encode(tiny, 'WEBP', quality=30)).decode()
+    variants['placeholder'] = f"data:image/webp;base64,{data}"
+    return variants
+
+
+def delete_variants(storage, variants):
+    for format in ('jpeg', 'webp'):
+        for _, name in variants.get(format, []):
+            try:
+                storage.delete(name)
+            except Exception as e:
+                logger.warning(f"Could not delete image variant {name}: {e}")
+
+
+def needs_variants(field_file, variants):
+    return (variants or {}).get('source', '') != (field_file.name or '')
+
+
+def refresh_variants(instance, field_name, variants_field, force=False):
+    """Build the variants of ``instance.<field_name>`` if the image changed.
+
+    Returns True when the row was updated. Variants of the previous image
+    are deleted, and the row is updated with a queryset update so no save
+    signals fire again; updated_at is bumped with it so caches keyed on it
+    (see nbtelog.home) pick up the variants.
+    """
+    field_file = getattr(instance, field_name)
+    old = getattr(instance, variants_field) or {}
+    if not force and not needs_variants(field_file, old):
+        return False
+
+    variants = {}
+    if field_file:
+        try:
+            variants = build_variants(field_file)
+        except Exception as e:
+            logger.error(f"Could not build variants of {field_file.name}: {e}")
+            # Record the attempt so the broken upload is not retried on every save
+            variants = {'source': field_file.name}
+
+    if old:
+        delete_variants(field_file.storage, old)
+    setattr(instance, variants_field, variants)
+    type(instance).objects.filter(pk=instance.pk).update(**{variants_field: variants, 'updated_at': timezone.now()})
+    return True
+
+
+class ResponsiveImage:
+    """What a template needs to render an <img>/<picture> with srcset.
+
+    Built from the stored variants; only URLs are computed, the storage is
+    not accessed. Without variants it falls back to the original file.
+    """
+
+    def __init__(self, field_file, variants=None):
+        variants = variants or {}
+        storage = field_file.storage
+        self.width = variants.get('width')
+        self.height = variants.get('height')
+        self.placeholder = variants.get('placeholder', '')
+        self.srcset = self._srcset(storage, variants.get('jpeg'))
+        self.webp_srcset = self._srcset(storage, variants.get('webp'))
+
+        jpeg = variants.get('jpeg') or []
+        # A mid-sized variant is the src for browsers that ignore srcset
+        fallback = next((name for width, name in jpeg if width >= 960), jpeg[-1][1] if jpeg else None)
+        self.src = storage.url(fallback) if fallback else field_file.url
+
+    @staticmethod
+    def _srcset(storage, entries):
+        return ', '.join(f"{storage.url(name)} {width}w" for width, name in entries or [])
+
+    def __bool__(self):
+        return bool(self.src)
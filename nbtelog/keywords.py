@@ -0,0 +1,129 @@
+import re
+from collections import deque
+
+_punctuation = re.compile(r'[^\w\s]+')
+_whitespace = re.compile(r'\s+')
+
+
+def normalize_text(text):
+    """Case-fold text, turn punctuation into spaces and collapse whitespace."""
+    return _whitespace.sub(' ', _punctuation.sub(' ', text.casefold())).strip()
+
+
+def split_keywords(keywords):
+    """Split a comma-separated keyword field into unique normalized keywords."""
+    seen = []
+    for keyword in keywords.split(','):
+        keyword = normalize_text(keyword)
+        if keyword and keyword not in seen:
+            seen.append(keyword)
+    return seen
+
+
+def _is_word_char(char):
+    return char.isalnum() or char == '_'
+
+
+class KeywordMatcher:
+    """Aho-Corasick automaton over the keywords of a list of entries.
+
+    Every keyword of every entry is compiled into one automaton, so a message
+    is scanned once however many entries and keywords there are.
+    ``keywords_list`` holds one comma-separated keyword string per entry.
+    A keyword only matches on word boundaries, so ``"art"`` does not match
+    inside ``"start"``.
+    """
+
+    def __init__(self, keywords_list):
+        self.keywords = []
+        self.entries_for = []
+        self.entry_keywords = []
+        keyword_ids = {}
+
+        for entry_idx, keywords in enumerate(keywords_list):
+            normalized = split_keywords(keywords)
+            self.entry_keywords.append(normalized)
+            for keyword in normalized:
+                if keyword not in keyword_ids:
+                    keyword_ids[keyword] = len(self.keywords)
+                    self.keywords.append(keyword)
+                    self.entries_for.append([])
+                self.entries_for[keyword_ids[keyword]].append(entry_idx)
+
+        self._build(self.keywords)
+
+    def _build(self, keywords):
+        # State 0 is the root; each state has its transitions, its failure
+        # link and the ids of the keywords that end there.
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for keyword_id, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append(keyword_id)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._fail[next_state] == next_state:
+                    self._fail[next_state] = 0
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def find(self, message):
+        """Return the ids of every keyword found in ``message``."""
+        text = normalize_text(message)
+        goto, fail, output, keywords = self._goto, self._fail, self._output, self.keywords
+        found = set()
+        state = 0
+        end = len(text)
+
+        for pos, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if not output[state]:
+                continue
+            if pos + 1 < end and _is_word_char(text[pos + 1]):
+                continue
+            for keyword_id in output[state]:
+                start = pos + 1 - len(keywords[keyword_id])
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    found.add(keyword_id)
+        return found
+
+    def matches(self, message):
+        """Return ``{entry_index: [keyword, ...]}`` for every entry with a hit."""
+        hits = {}
+        for keyword_id in sorted(self.find(message)):
+            for entry_idx in self.entries_for[keyword_id]:
+                hits.setdefault(entry_idx, []).append(self.keywords[keyword_id])
+        return hits
+
+    def best_match(self, message):
+        """Return the index of the entry with the most keyword hits, or None.
+
+        Ties go to the entry that comes first, as before.
+        """
+        hits = self.matches(message)
+        if not hits:
+            return None
+        return min(hits, key=lambda idx: (-len(hits[idx]), idx))
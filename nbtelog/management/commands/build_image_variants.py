@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from nbtelog import images
+from nbtelog.models import News, SliderImage
+
+# (model, image field, variants field)
+SOURCES = [
+    (SliderImage, 'image', 'image_variants'),
+    (News, 'featured_image', 'featured_image_variants'),
+]
+
+
+class Command(BaseCommand):
+    help = "Create resized JPEG/WebP variants of slider and news images."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Rebuild variants that are already up to date.",
+        )
+
+    def handle(self, *args, **options):
+        built = 0
+        for model, field_name, variants_field in SOURCES:
+            queryset = model.objects.exclude(**{field_name: ''}).exclude(**{f"{field_name}__isnull": True})
+            queryset = queryset.only('pk', field_name, variants_field).order_by('pk')
+            for instance in queryset.iterator(chunk_size=100):
+                if images.refresh_variants(instance, field_name, variants_field, force=options['force']):
+                    built += 1
+                    self.stdout.write(f"Built variants of {getattr(instance, field_name).name}")
+        self.stdout.write(self.style.SUCCESS(f"Built variants for {built} images."))
@@ -0,0 +1,225 @@
+import csv
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from nbtelog import documents, search_index
+from nbtelog.models import Document
+
+# Files are read and uploaded in parts of this size, several parts at a time;
+# S3 needs parts of at least 5 MiB
+DEFAULT_CHUNK_MB = 16
+DEFAULT_WORKERS = 4
+DEFAULT_PART_THREADS = 4
+
+BATCH_SIZE = 200
+
+
+class Journal:
+    """Append-only record of finished uploads, so an interrupted run resumes.
+
+    One JSON object per line, keyed by the local path of the file.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        self._lock = threading.Lock()
+        if self.path.exists():
+            with self.path.open(encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self.entries[entry['path']] = entry
+
+    def add(self, entry):
+        with self._lock:
+            self.entries[entry['path']] = entry
+            with self.path.open('a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + '\n')
+
+
+class Command(BaseCommand):
+    help = (
+        "Upload a directory (or a CSV manifest with path,title,description columns) "
+        "of documents to the configured storage and create their Document rows. "
+        "Files whose checksum is already stored are skipped; run "
+        "sync_document_metadata first so existing documents have checksums."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Directory to import, or a .csv manifest.")
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                            help="Files uploaded at the same time.")
+        parser.add_argument('--part-threads', type=int, default=DEFAULT_PART_THREADS,
+                            help="Parts of one file uploaded at the same time (S3 only).")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_MB,
+                            help="Multipart part size in MiB (S3 only).")
+        parser.add_argument('--journal',
+                            help="Progress file used to resume (default: <source>.import.jsonl).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="List what would be imported without uploading.")
+
+    def handle(self, *args, **options):
+        source = Path(options['source'])
+        items = self.collect(source)
+        journal = Journal(options['journal'] or f"{source.resolve()}.import.jsonl")
+        self.storage = Document._meta.get_field('file').storage
+        self.transfer = self.s3_transfer(options) if hasattr(self.storage, 'bucket') else None
+
+        self.known = set(Document.objects.exclude(checksum='').values_list('checksum', flat=True))
+        self.known.update(entry['checksum'] for entry in journal.entries.values())
+        self.lock = threading.Lock()
+
+        pending = [item for item in items if str(item['path']) not in journal.entries]
+        self.stdout.write(
+            f"{len(items)} files, {len(items) - len(pending)} already uploaded, {len(pending)} to go."
+        )
+        if options['dry_run']:
+            for item in pending:
+                self.stdout.write(f"Would import {item['path']}")
+            return
+
+        failed = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            futures = {pool.submit(self.upload, item): item for item in pending}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    entry = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"Failed {item['path']}: {e}")
+                    continue
+                if entry is None:
+                    self.stdout.write(f"Skipped duplicate {item['path']}")
+                else:
+                    journal.add(entry)
+                    self.stdout.write(f"Uploaded {item['path']} -> {entry['name']}")
+
+            created = self.create_rows(journal, pool)
+
+        message = f"Created {created} documents."
+        if failed:
+            raise CommandError(f"{message} {failed} files failed; run the command again to retry them.")
+        self.stdout.write(self.style.SUCCESS(message))
+
+    def collect(self, source):
+        if source.is_dir():
+            return [
+                {'path': path, 'title': '', 'description': ''}
+                for path in sorted(source.rglob('*'))
+                if path.is_file() and not path.name.endswith('.import.jsonl')
+            ]
+        if source.suffix.lower() == '.csv':
+            with source.open(newline='', encoding='utf-8-sig') as f:
+                return [
+                    {
+                        'path': (source.parent / row['path']).resolve(),
+                        'title': (row.get('title') or '').strip(),
+                        'description': (row.get('description') or '').strip(),
+                    }
+                    for row in csv.DictReader(f)
+                ]
+        raise CommandError(f"{source} is neither a directory nor a .csv manifest.")
+
+    def s3_transfer(self, options):
+        from boto3.s3.transfer import TransferConfig
+
+        chunk = max(5, options['chunk_size']) * 1024 * 1024
+        return TransferConfig(
+            multipart_threshold=chunk,
+            multipart_chunksize=chunk,
+            max_concurrency=max(1, options['part_threads']),
+            use_threads=True,
+        )
+
+    def upload(self, item):
+        path = item['path']
+        size, content_type, checksum = documents.read_metadata(File(open(path, 'rb'), name=str(path)))
+        with self.lock:
+            if checksum in self.known:
+                return None
+            self.known.add(checksum)
+
+        # The checksum in the key keeps names unique without asking the
+        # storage, and makes a retried upload overwrite its own object
+        name = f"documents/{checksum[:12]}/{path.name}"
+        try:
+            if self.transfer is not None:
+                self.storage.connection.meta.client.upload_file(
+                    str(path), self.storage.bucket_name, self.storage._normalize_name(name),
+                    ExtraArgs={'ContentType': content_type}, Config=self.transfer,
+                )
+            else:
+                with open(path, 'rb') as f:
+                    name = self.storage.save(name, File(f))
+        except Exception:
+            with self.lock:
+                self.known.discard(checksum)
+            raise
+
+        return {
+            'path': str(path),
+            'name': name,
+            'checksum': checksum,
+            'size': size,
+            'content_type': content_type,
+            'title': item['title'] or path.stem.replace('_', ' ').strip(),
+            'description': item['description'],
+        }
+
+    @staticmethod
+    def extract(entry):
+        try:
+            return documents.extract_text(File(open(entry['path'], 'rb'), name=entry['name']))
+        except Exception:
+            # Left for extract_document_text, which reads the stored copy
+            return None
+
+    def create_rows(self, journal, pool):
+        """Create the rows of journaled uploads that do not have one yet."""
+        existing = set(
+            Document.objects.filter(checksum__in=[e['checksum'] for e in journal.entries.values()])
+            .values_list('checksum', flat=True)
+        )
+        entries = [e for e in journal.entries.values() if e['checksum'] not in existing]
+        if not entries:
+            return 0
+
+        # Extract text from the local copies rather than downloading again
+        texts = list(pool.map(self.extract, entries))
+        now = timezone.now()
+        rows = []
+        for entry, text in zip(entries, texts):
+            row = Document(
+                title=entry['title'][:200],
+                description=entry['description'],
+                file=entry['name'],
+                file_size=entry['size'],
+                content_type=entry['content_type'],
+                checksum=entry['checksum'],
+                file_exists=True,
+                metadata_from=entry['name'],
+            )
+            if text is not None:
+                row.extracted_text = documents.compress_text(text)
+                row.text_extracted_from = entry['name']
+                row.text_extracted_at = now
+            rows.append(row)
+
+        with transaction.atomic():
+            Document.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+
+        # bulk_create sends no signals, so index the new rows here; they are
+        # read back because MySQL does not return primary keys
+        created = Document.objects.filter(checksum__in=[row.checksum for row in rows])
+        for document in created.iterator(chunk_size=BATCH_SIZE):
+            search_index.index_object(document)
+        return len(rows)
@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from nbtelog import export
+
+
+class Command(BaseCommand):
+    help = "Write all institutions or programs as CSV or JSON lines, optionally gzipped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(export.EXPORTS))
+        parser.add_argument('--format', choices=export.FORMATS, default='csv')
+        parser.add_argument('--output', '-o', help="File to write (default: stdout).")
+        parser.add_argument('--gzip', action='store_true', help="Compress the output with gzip.")
+
+    def handle(self, *args, **options):
+        stream = export.export_stream(options['kind'], options['format'], gzip=options['gzip'])
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in stream:
+                    f.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {options['output']}"))
+        else:
+            for chunk in stream:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
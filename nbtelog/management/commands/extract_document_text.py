@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from nbtelog import documents, search_index
+from nbtelog.models import Document
+
+
+class Command(BaseCommand):
+    help = "Extract searchable text from uploaded documents and reindex them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Re-extract documents whose text is already up to date.",
+        )
+
+    def handle(self, *args, **options):
+        extracted = 0
+        for document in Document.objects.order_by('pk').iterator(chunk_size=100):
+            if documents.refresh_text(document, force=options['force']):
+                search_index.index_object(document)
+                extracted += 1
+                self.stdout.write(f"Extracted {document.file.name}")
+        self.stdout.write(self.style.SUCCESS(f"Extracted text from {extracted} documents."))
@@ -0,0 +1,48 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from nbtelog import register
+
+
+class Command(BaseCommand):
+    help = (
+        "Upsert institutions or programs from a national register in CSV or XLSX. "
+        "Institutions are matched on code, programs on (institution_code, code)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Register file (.csv or .xlsx).")
+        parser.add_argument('--kind', choices=register.KINDS,
+                            help="Register type; detected from the columns when omitted.")
+        parser.add_argument('--report',
+                            help="Write the per-row errors to this CSV file ('-' for stdout).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Validate the rows without saving them.")
+        parser.add_argument('--no-index', action='store_true',
+                            help="Do not update the search index; run rebuild_search_index afterwards.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            with open(path, 'rb') as f:
+                result = register.import_register(
+                    f, path, kind=options['kind'], dry_run=options['dry_run'], reindex=not options['no_index'],
+                )
+        except (OSError, register.RegisterError) as e:
+            raise CommandError(str(e))
+
+        if options['report']:
+            if options['report'] == '-':
+                register.write_report(result, sys.stdout)
+            else:
+                with open(options['report'], 'w', newline='', encoding='utf-8') as f:
+                    register.write_report(result, f)
+        else:
+            for number, message in result.errors[:50]:
+                self.stderr.write(f"Row {number}: {message}")
+            if len(result.errors) > 50:
+                self.stderr.write(f"... and {len(result.errors) - 50} more; use --report for all of them.")
+
+        style = self.style.WARNING if result.errors else self.style.SUCCESS
+        self.stdout.write(style(str(result).capitalize() + ('' if not options['dry_run'] else ' (dry run)') + '.'))
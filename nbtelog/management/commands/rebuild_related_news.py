@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from nbtelog import related
+
+
+class Command(BaseCommand):
+    help = "Recompute the related articles shown on every news detail page."
+
+    def handle(self, *args, **options):
+        total = related.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Computed related news for {total} articles."))
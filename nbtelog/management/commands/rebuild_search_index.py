@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from nbtelog import search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the site search index from News, Institutions, Programs and Documents."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--kind', action='append', choices=sorted(search_index.SOURCES),
+            help="Only rebuild this kind of document (may be repeated).",
+        )
+        parser.add_argument(
+            '--if-empty', action='store_true',
+            help="Only rebuild the kinds that have no documents in the index yet.",
+        )
+
+    def handle(self, *args, **options):
+        kinds = options['kind'] or sorted(search_index.SOURCES)
+        if options['if_empty']:
+            # Checked per kind, so kinds added in an upgrade get indexed
+            kinds = [kind for kind in kinds if search_index.is_empty(kind)]
+            if not kinds:
+                self.stdout.write("Search index already built, skipping.")
+                return
+
+        total = search_index.rebuild(kinds)
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} documents."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from nbtelog import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the institution and program statistics from scratch."
+
+    def handle(self, *args, **options):
+        revision = stats.recompute()
+        summary = stats.summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"Counted {summary['institutions']} institutions and {summary['programs']} programs "
+            f"(revision {revision})."
+        ))
@@ -0,0 +1,57 @@
+import posixpath
+
+from django.core.management.base import BaseCommand
+
+from nbtelog import documents
+from nbtelog.models import Document
+
+
+class Command(BaseCommand):
+    help = "Store the size, content type and checksum of uploaded documents and check their files exist."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help="Re-read documents whose metadata is already up to date.",
+        )
+        parser.add_argument(
+            '--verify', action='store_true',
+            help="Only check that every file still exists, by listing storage once per directory.",
+        )
+
+    def handle(self, *args, **options):
+        if options['verify']:
+            self.verify()
+            return
+
+        updated = 0
+        queryset = Document.objects.defer('extracted_text').order_by('pk')
+        for document in queryset.iterator(chunk_size=100):
+            if documents.refresh_metadata(document, force=options['force']):
+                updated += 1
+                if document.file_exists is False:
+                    self.stdout.write(self.style.WARNING(f"Missing {document.file.name}"))
+                else:
+                    self.stdout.write(f"Read {document.file.name}")
+        self.stdout.write(self.style.SUCCESS(f"Updated metadata of {updated} documents."))
+
+    def verify(self):
+        rows = list(Document.objects.only('id', 'file', 'file_exists'))
+        storage = Document._meta.get_field('file').storage
+        directories = {posixpath.dirname(row.file.name) for row in rows if row.file}
+        names = documents.stored_names(storage, sorted(directories))
+
+        changed = []
+        for row in rows:
+            exists = bool(row.file) and row.file.name in names
+            if not exists:
+                self.stdout.write(self.style.WARNING(f"Missing {row.file.name or f'file of document {row.pk}'}"))
+            if row.file_exists != exists:
+                row.file_exists = exists
+                changed.append(row)
+        Document.objects.bulk_update(changed, ['file_exists'], batch_size=500)
+
+        missing = sum(1 for row in rows if not row.file_exists)
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {len(rows)} documents: {missing} missing, {len(changed)} updated."
+        ))
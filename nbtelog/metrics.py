@@ -0,0 +1,276 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.template.base import Template
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the request latency histogram, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# With METRICS_DIR set, each worker writes its totals there at most this often
+FLUSH_INTERVAL = 5
+
+# Counters kept per process: name -> (help text, label names)
+COUNTERS = {
+    'nbtelog_http_requests_total': (
+        "Requests handled, by view, method and status code.", ('view', 'method', 'status'),
+    ),
+    'nbtelog_db_queries_total': ("SQL queries run while handling requests.", ('view',)),
+    'nbtelog_db_query_seconds_total': ("Time spent in SQL queries.", ('view',)),
+    'nbtelog_template_render_seconds_total': ("Time spent rendering templates.", ('view',)),
+    'nbtelog_cache_requests_total': ("Cache lookups, by result (hit or miss).", ('view', 'result')),
+}
+LATENCY = 'nbtelog_http_request_duration_seconds'
+
+_current = contextvars.ContextVar('nbtelog_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """What one request spent, filled in by the hooks below."""
+
+    __slots__ = ('queries', 'query_time', 'template_time', 'template_depth', 'cache_hits', 'cache_misses',
+                 'in_get_many')
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.in_get_many = 0
+
+
+def start_request():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """connection.execute_wrapper hook counting queries and their time."""
+    current = _current.get()
+    if current is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        current.queries += 1
+        current.query_time += time.perf_counter() - start
+
+
+_original_render = Template.render
+_missing = object()
+_installed = False
+
+
+def _timed_render(self, context):
+    current = _current.get()
+    # Included templates render inside their parent; only time the outermost
+    if current is None or current.template_depth:
+        return _original_render(self, context)
+    current.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        current.template_depth -= 1
+        current.template_time += time.perf_counter() - start
+
+
+def _counting_get(original):
+    def get(self, key, default=None, version=None):
+        value = original(self, key, _missing, version)
+        current = _current.get()
+        if current is not None and not current.in_get_many:
+            if value is _missing:
+                current.cache_misses += 1
+            else:
+                current.cache_hits += 1
+        return default if value is _missing else value
+    return get
+
+
+def _counting_get_many(original):
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        current = _current.get()
+        if current is None:
+            return original(self, keys, version)
+        # The base get_many calls get() per key; count the keys once here
+        current.in_get_many += 1
+        try:
+            values = original(self, keys, version)
+        finally:
+            current.in_get_many -= 1
+        current.cache_hits += len(values)
+        current.cache_misses += len(keys) - len(values)
+        return values
+    return get_many
+
+
+def install():
+    """Hook template rendering and the configured cache backends, once per process."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _timed_render
+    for config in settings.CACHES.values():
+        backend = import_string(config['BACKEND'])
+        if not getattr(backend, '_nbtelog_metrics', False):
+            backend.get = _counting_get(backend.get)
+            backend.get_many = _counting_get_many(backend.get_many)
+            backend._nbtelog_metrics = True
+
+
+class Registry:
+    """Per-process totals, updated once per request under one lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {name: Counter() for name in COUNTERS}
+        # view -> [count per bucket..., count above the last bucket]
+        self.latency = {}
+        self.latency_sum = Counter()
+        self._flushed_at = time.monotonic()
+        self._exit_flush_registered = False
+
+    def record(self, view, method, status, duration, request_metrics):
+        bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if duration <= bound), len(LATENCY_BUCKETS))
+        with self._lock:
+            counters = self.counters
+            counters['nbtelog_http_requests_total'][(view, method, str(status))] += 1
+            counters['nbtelog_db_queries_total'][(view,)] += request_metrics.queries
+            counters['nbtelog_db_query_seconds_total'][(view,)] += request_metrics.query_time
+            counters['nbtelog_template_render_seconds_total'][(view,)] += request_metrics.template_time
+            counters['nbtelog_cache_requests_total'][(view, 'hit')] += request_metrics.cache_hits
+            counters['nbtelog_cache_requests_total'][(view, 'miss')] += request_metrics.cache_misses
+            buckets = self.latency.setdefault(view, [0] * (len(LATENCY_BUCKETS) + 1))
+            buckets[bucket] += 1
+            self.latency_sum[view] += duration
+            due = time.monotonic() - self._flushed_at >= FLUSH_INTERVAL
+        if due:
+            self.flush_if_shared()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': {
+                    name: [[*labels, value] for labels, value in counter.items()]
+                    for name, counter in self.counters.items()
+                },
+                'latency': {view: list(buckets) for view, buckets in self.latency.items()},
+                'latency_sum': dict(self.latency_sum),
+            }
+
+    def flush(self):
+        """Write this worker's totals to METRICS_DIR/metrics-<pid>.json."""
+        with self._lock:
+            self._flushed_at = time.monotonic()
+        directory = Path(settings.METRICS_DIR)
+        try:
+            directory.mkdir(parents=True, exist_ok=True)
+            # Written to a temporary file and renamed so readers never see half a file
+            fd, temp = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.snapshot(), f)
+            os.replace(temp, directory / f"metrics-{os.getpid()}.json")
+        except OSError as e:
+            logger.error(f"Could not write metrics to {directory}: {e}")
+
+    def flush_if_shared(self):
+        if settings.METRICS_DIR:
+            self.flush()
+
+    def register_exit_flush(self):
+        """Flush once more when the process exits; later calls do nothing.
+
+        Django builds the middleware chain again for every test client and
+        ASGI handler, so this is called more than once per process.
+        """
+        with self._lock:
+            if self._exit_flush_registered:
+                return
+            self._exit_flush_registered = True
+        atexit.register(self.flush_if_shared)
+
+
+registry = Registry()
+
+
+def _merge(total, snapshot):
+    for name, rows in snapshot['counters'].items():
+        counter = total['counters'].setdefault(name, Counter())
+        for *labels, value in rows:
+            counter[tuple(labels)] += value
+    for view, buckets in snapshot['latency'].items():
+        merged = total['latency'].setdefault(view, [0] * len(buckets))
+        for i, count in enumerate(buckets):
+            merged[i] += count
+    for view, seconds in snapshot['latency_sum'].items():
+        total['latency_sum'][view] += seconds
+
+
+def collect():
+    """Totals of this process plus, with METRICS_DIR, every other worker's last flush.
+
+    Files of workers that have exited are kept so their counts are not lost;
+    clear the directory when the server starts.
+    """
+    total = {'counters': {}, 'latency': {}, 'latency_sum': Counter()}
+    if settings.METRICS_DIR:
+        own = f"metrics-{os.getpid()}.json"
+        for path in sorted(Path(settings.METRICS_DIR).glob('metrics-*.json')):
+            if path.name == own:
+                continue
+            try:
+                _merge(total, json.loads(path.read_text()))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping metrics file {path}: {e}")
+    _merge(total, registry.snapshot())
+    return total
+
+
+def _labels(names, values):
+    def escape(value):
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(total):
+    """Format collected totals in the Prometheus text exposition format."""
+    lines = []
+    for name, (help_text, label_names) in COUNTERS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for labels, value in sorted(total['counters'].get(name, {}).items()):
+            lines.append(f"{name}{{{_labels(label_names, labels)}}} {_number(value)}")
+
+    lines += [f"# HELP {LATENCY} Time to produce a response, by view.", f"# TYPE {LATENCY} histogram"]
+    for view, buckets in sorted(total['latency'].items()):
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, '+Inf'), buckets):
+            cumulative += count
+            lines.append(f"{LATENCY}_bucket{{{_labels(('view', 'le'), (view, bound))}}} {cumulative}")
+        lines.append(f"{LATENCY}_sum{{{_labels(('view',), (view,))}}} {_number(total['latency_sum'][view])}")
+        lines.append(f"{LATENCY}_count{{{_labels(('view',), (view,))}}} {cumulative}")
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,80 @@
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+
+
+class MetricsMiddleware:
+    """Record latency, SQL, template and cache figures per view (see nbtelog.metrics).
+
+    Put it first in MIDDLEWARE so the time of the other middleware counts
+    too. Views are labelled by URL name, which keeps the number of series
+    bounded; requests that match no URL are grouped together. Streaming
+    responses are timed until the response starts, not until it ends.
+
+    Like Django's own middleware it runs in sync or async mode, whichever
+    the rest of the chain uses, so it adds no thread switch of its own
+    under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        metrics.install()
+        metrics.registry.register_exit_flush()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        request_metrics, token = metrics.start_request()
+        try:
+            with self.counting_queries():
+                response = self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self.record(request, response, start, request_metrics)
+        return response
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        # Views run through sync_to_async share these connections and this
+        # context, so their queries are counted too
+        request_metrics, token = metrics.start_request()
+        try:
+            with self.counting_queries():
+                response = await self.get_response(request)
+        finally:
+            metrics.end_request(token)
+        self.record(request, response, start, request_metrics)
+        return response
+
+    @staticmethod
+    def counting_queries():
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(metrics.record_query))
+        return stack
+
+    def record(self, request, response, start, request_metrics):
+        metrics.registry.record(
+            self.view_name(request), request.method, response.status_code,
+            time.perf_counter() - start, request_metrics,
+        )
+
+    @staticmethod
+    def view_name(request):
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            return match.view_name
+        if settings.STATIC_URL and request.path.startswith(settings.STATIC_URL):
+            return 'static'
+        return 'unmatched'
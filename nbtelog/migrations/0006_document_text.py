@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-18 07:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0005_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='extracted_text',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='text_extracted_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='text_extracted_from',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
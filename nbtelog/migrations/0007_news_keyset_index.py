@@ -0,0 +1,19 @@
+# Generated by Django 6.1.2 on 2026-10-18 07:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0006_document_text'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='news',
+            index=models.Index(fields=['status', '-created_at', '-id'], name='news_status_created_idx'),
+        ),
+    ]
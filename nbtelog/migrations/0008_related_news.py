@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-18 07:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0007_news_keyset_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedNews',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField()),
+                ('news', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='nbtelog.news')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='nbtelog.news')),
+            ],
+            options={
+                'verbose_name_plural': 'Related News',
+                'indexes': [models.Index(fields=['news', '-score'], name='related_news_score_idx')],
+                'unique_together': {('news', 'related')},
+            },
+        ),
+    ]
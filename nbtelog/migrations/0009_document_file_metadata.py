@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-18 08:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0008_related_news'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='checksum',
+            field=models.CharField(blank=True, editable=False, help_text='SHA-256 of the file', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='content_type',
+            field=models.CharField(blank=True, editable=False, max_length=100),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_exists',
+            field=models.BooleanField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='file_size',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='document',
+            name='metadata_from',
+            field=models.CharField(blank=True, editable=False, max_length=255),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 08:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0010_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='document',
+            name='download_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 6.1.2 on 2026-10-18 08:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0012_register_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatisticCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=40)),
+                ('key', models.CharField(blank=True, max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', '-count'], name='statistic_count_idx')],
+                'unique_together': {('dimension', 'key')},
+            },
+        ),
+    ]
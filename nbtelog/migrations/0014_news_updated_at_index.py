@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-18 08:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('nbtelog', '0013_statistic_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='news',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True),
+        ),
+    ]
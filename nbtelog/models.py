@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.urls import reverse
 from django.utils.text import slugify
 
 class UserProfile(models.Model):
@@ -40,23 +41,56 @@ class News(models.Model):
     content = models.TextField()
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     featured_image = models.ImageField(upload_to='news_images/', blank=True, null=True)
+    # Resized JPEG/WebP copies of featured_image (see nbtelog.images)
+    featured_image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
+    # Indexed so MAX(updated_at) is a cheap change stamp for the home page
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='draft')
     category = models.ForeignKey(NewsCategory, on_delete=models.SET_NULL, null=True)
 
     class Meta:
         verbose_name_plural = "News"
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of published news by (created_at, id)
+            models.Index(fields=['status', '-created_at', '-id'], name='news_status_created_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         if not self.slug:
             self.slug = slugify(self.title)
         super().save(*args, **kwargs)
 
+    def get_absolute_url(self):
+        return reverse('nbtelog:news_detail', args=[self.slug])
+
+    @property
+    def responsive_image(self):
+        from .images import ResponsiveImage
+        if not self.featured_image:
+            return None
+        return ResponsiveImage(self.featured_image, self.featured_image_variants)
+
     def __str__(self):
         return self.title
 
+class RelatedNews(models.Model):
+    """Precomputed text similarity between two published articles."""
+    news = models.ForeignKey(News, on_delete=models.CASCADE, related_name='related_links')
+    related = models.ForeignKey(News, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField()
+
+    class Meta:
+        verbose_name_plural = "Related News"
+        unique_together = ['news', 'related']
+        indexes = [
+            models.Index(fields=['news', '-score'], name='related_news_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.news} -> {self.related}"
+
 class Institution(models.Model):
     name = models.CharField(max_length=200)
     code = models.CharField(max_length=50, unique=True)
@@ -67,6 +101,8 @@ class Institution(models.Model):
     established_date = models.DateField()
     accreditation_status = models.CharField(max_length=50)
     last_audit_date = models.DateField(null=True, blank=True)
+    # Indexed so MAX(updated_at) is a cheap change stamp for the API
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f"{self.name} ({self.code})"
@@ -79,6 +115,7 @@ class Program(models.Model):
     duration = models.CharField(max_length=50)
     qualification_type = models.CharField(max_length=100)
     accreditation_status = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     class Meta:
         unique_together = ['institution', 'code']
@@ -91,13 +128,32 @@ class Document(models.Model):
     description = models.TextField(blank=True)
     file = models.FileField(upload_to='documents/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # Text extracted once from the file for site search, zlib-compressed
+    extracted_text = models.BinaryField(blank=True, null=True, editable=False)
+    text_extracted_from = models.CharField(max_length=255, blank=True, editable=False)
+    text_extracted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # File metadata read once per upload so listings never touch storage;
+    # file_exists is None until the file has been checked
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False)
+    content_type = models.CharField(max_length=100, blank=True, editable=False)
+    checksum = models.CharField(max_length=64, blank=True, editable=False, help_text="SHA-256 of the file")
+    file_exists = models.BooleanField(null=True, editable=False)
+    metadata_from = models.CharField(max_length=255, blank=True, editable=False)
+    download_count = models.PositiveIntegerField(default=0, editable=False)
     
+    @property
+    def text(self):
+        from .documents import decompress_text
+        return decompress_text(self.extracted_text)
+
     def __str__(self):
         return self.title
 
 class SliderImage(models.Model):
     title = models.CharField(max_length=200)
     image = models.ImageField(upload_to='slider_images/')
+    # Resized JPEG/WebP copies of image (see nbtelog.images)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     caption = models.TextField(blank=True)
     order = models.IntegerField(default=0)
     is_active = models.BooleanField(default=True)
@@ -107,6 +163,11 @@ class SliderImage(models.Model):
     class Meta:
         ordering = ['order', '-created_at']
 
+    @property
+    def responsive_image(self):
+        from .images import ResponsiveImage
+        return ResponsiveImage(self.image, self.image_variants)
+
     def __str__(self):
         return self.title
 
@@ -131,3 +192,45 @@ class ChatBot(models.Model):
 
     def __str__(self):
         return f"{self.category}: {self.question[:50]}"
+
+
+class SearchDocument(models.Model):
+    """One indexed News or Institution row in the site search index."""
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    length = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+    def __str__(self):
+        return f"{self.kind} #{self.object_id}"
+
+
+class SearchPosting(models.Model):
+    """How often a stemmed term occurs in an indexed document."""
+    term = models.CharField(max_length=64)
+    document = models.ForeignKey(SearchDocument, on_delete=models.CASCADE, related_name='postings')
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ['term', 'document']
+
+    def __str__(self):
+        return f"{self.term} in {self.document}"
+
+
+class StatisticCount(models.Model):
+    """A precomputed count of institutions or programs (see nbtelog.stats)."""
+    dimension = models.CharField(max_length=40)
+    key = models.CharField(max_length=100, blank=True)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ['dimension', 'key']
+        indexes = [
+            models.Index(fields=['dimension', '-count'], name='statistic_count_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.dimension} {self.key}: {self.count}"
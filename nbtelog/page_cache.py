@@ -0,0 +1,136 @@
+import hashlib
+import os
+from functools import partial, wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.template.loaders.app_directories import get_app_template_dirs
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, urlencode
+
+# Environment variables that identify a build, checked in this order
+BUILD_ENV_VARS = ('BUILD_VERSION', 'SOURCE_VERSION', 'GIT_REV')
+
+_build_version = None
+
+
+def _tree_fingerprint(digest, root):
+    root = Path(root)
+    if not root.is_dir():
+        return
+    for path in sorted(root.rglob('*')):
+        if path.is_file():
+            stat = path.stat()
+            digest.update(f"{path.relative_to(root)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+
+
+def compute_build_version():
+    """Hash the deploy id, every template and the static assets.
+
+    Anything that changes what a cached page would render - or which asset
+    URLs it points at - changes the version, which changes every cache key
+    and ETag.
+    """
+    digest = hashlib.sha256()
+    for name in BUILD_ENV_VARS:
+        digest.update(f"{name}={os.environ.get(name, '')};".encode())
+
+    template_dirs = []
+    for engine in settings.TEMPLATES:
+        template_dirs.extend(engine.get('DIRS', []))
+    template_dirs.extend(get_app_template_dirs('templates'))
+    for directory in template_dirs:
+        _tree_fingerprint(digest, directory)
+
+    # The manifest lists the hashed name of every collected asset; without
+    # one (development) fall back to the source directories
+    manifest = Path(settings.STATIC_ROOT or '') / 'staticfiles.json'
+    if settings.STATIC_ROOT and manifest.is_file():
+        digest.update(manifest.read_bytes())
+    else:
+        for directory in settings.STATICFILES_DIRS:
+            _tree_fingerprint(digest, directory)
+
+    return digest.hexdigest()[:16]
+
+
+def build_version():
+    """Return the build version, computed once per process.
+
+    With DEBUG on it is recomputed on every call so template edits show up
+    without a restart.
+    """
+    global _build_version
+    if _build_version is None or settings.DEBUG:
+        _build_version = compute_build_version()
+    return _build_version
+
+
+def cache_path(request, params=()):
+    """Return the request path with only the query parameters in ``params``.
+
+    Used in cache keys so that parameters a page does not read (tracking
+    tags, cache busters, junk) cannot create new cache entries.
+    """
+    query = urlencode([(name, value) for name in sorted(params) for value in request.GET.getlist(name)])
+    return f"{request.path}?{query}" if query else request.path
+
+
+def _finish(response, etag, max_age):
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=max_age)
+    return response
+
+
+def cache_page_for_build(view_func=None, *, data_version=None, max_age=None, query_params=()):
+    """Cache a view whose output only depends on the path and the build.
+
+    Rendered responses are stored under the build version and path, and
+    served with a strong ETag derived from the same two values. Because the
+    ETag is known without rendering, a matching If-None-Match is answered
+    with 304 straight away. Only use this for pages that render the same
+    HTML for every visitor. The query string is left out of the key apart
+    from the ``query_params`` the view reads.
+
+    Pages that also show data take a ``data_version`` function returning a
+    cheap stamp of that data, which becomes part of the key, and usually a
+    shorter browser ``max_age`` than the PAGE_CACHE_MAX_AGE default:
+
+        @cache_page_for_build(data_version=stats.version, max_age=60)
+    """
+    if view_func is None:
+        return partial(cache_page_for_build, data_version=data_version, max_age=max_age, query_params=query_params)
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view_func(request, *args, **kwargs)
+
+        version = build_version()
+        if data_version is not None:
+            version = f"{version}:{data_version()}"
+        browser_max_age = settings.PAGE_CACHE_MAX_AGE if max_age is None else max_age
+        path = cache_path(request, query_params)
+        key = hashlib.sha256(f"{version}:{path}".encode()).hexdigest()[:32]
+        etag = f'"{key}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return _finish(HttpResponseNotModified(), etag, browser_max_age)
+
+        cache_key = f"page_cache:{key}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            content, content_type = cached
+            return _finish(HttpResponse(content, content_type=content_type), etag, browser_max_age)
+
+        response = view_func(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            if hasattr(response, 'render'):
+                response.render()
+            cache.set(cache_key, (response.content, response['Content-Type']), settings.PAGE_CACHE_TIMEOUT)
+            _finish(response, etag, browser_max_age)
+        return response
+
+    return wrapper
@@ -0,0 +1,106 @@
+import base64
+import json
+from functools import reduce
+from operator import or_
+
+from django.db.models import Q
+
+
+def encode_cursor(values):
+    data = json.dumps([str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, model, fields):
+    """Turn a cursor back into typed field values, or None if it is invalid."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(raw, list) or len(raw) != len(fields):
+            return None
+        return [model._meta.get_field(name).to_python(value) for name, value in zip(fields, raw)]
+    except Exception:
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor=None, previous_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+def _seek(ordering, values, backwards):
+    """Build the WHERE clause selecting rows after (or before) ``values``."""
+    clauses = []
+    for i, field in enumerate(ordering):
+        name = field.lstrip('-')
+        descending = field.startswith('-') != backwards
+        equal = {f.lstrip('-'): value for f, value in zip(ordering[:i], values[:i])}
+        equal[f"{name}__{'lt' if descending else 'gt'}"] = values[i]
+        clauses.append(Q(**equal))
+    return reduce(or_, clauses)
+
+
+def keyset_paginate(queryset, ordering, per_page, after=None, before=None):
+    """Return one page of ``queryset`` ordered by ``ordering``.
+
+    ``ordering`` must end in a unique field (usually the primary key) so the
+    position is unambiguous. ``after``/``before`` are cursors taken from a
+    previous page's ``next_cursor``/``previous_cursor``. Each page costs one
+    indexed range query however deep it is, and no COUNT.
+    """
+    fields = [field.lstrip('-') for field in ordering]
+    model = queryset.model
+
+    backwards = False
+    cursor = None
+    if before:
+        cursor = decode_cursor(before, model, fields)
+        backwards = cursor is not None
+    if cursor is None and after:
+        cursor = decode_cursor(after, model, fields)
+
+    if backwards:
+        reversed_ordering = [field[1:] if field.startswith('-') else f"-{field}" for field in ordering]
+        queryset = queryset.order_by(*reversed_ordering)
+    else:
+        queryset = queryset.order_by(*ordering)
+    if cursor is not None:
+        queryset = queryset.filter(_seek(ordering, cursor, backwards))
+
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def cursor_for(obj):
+        # Rows may be model instances or .values() dicts
+        if isinstance(obj, dict):
+            return encode_cursor(obj[field] for field in fields)
+        return encode_cursor(getattr(obj, field) for field in fields)
+
+    if not rows:
+        return KeysetPage(rows)
+    if backwards:
+        next_cursor = cursor_for(rows[-1])
+        previous_cursor = cursor_for(rows[0]) if has_more else None
+    else:
+        next_cursor = cursor_for(rows[-1]) if has_more else None
+        previous_cursor = cursor_for(rows[0]) if cursor is not None else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
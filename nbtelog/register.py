@@ -0,0 +1,264 @@
+import csv
+import io
+import logging
+import os
+from itertools import chain, islice
+
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, router, transaction
+
+from . import search_index, stats, suggest
+from .models import Institution, Program
+
+logger = logging.getLogger(__name__)
+
+# Rows validated and written together, each chunk in its own transaction
+CHUNK_SIZE = 1000
+
+# Register columns per kind; the unique key columns come first
+COLUMNS = {
+    'institutions': [
+        'code', 'name', 'address', 'contact_email', 'contact_phone', 'website',
+        'established_date', 'accreditation_status', 'last_audit_date',
+    ],
+    'programs': [
+        'institution_code', 'code', 'name', 'description', 'duration',
+        'qualification_type', 'accreditation_status',
+    ],
+}
+KINDS = list(COLUMNS)
+
+
+class RegisterError(Exception):
+    pass
+
+
+class ImportResult:
+    def __init__(self, kind):
+        self.kind = kind
+        self.rows = 0
+        self.saved = 0
+        self.saved_ids = []
+        # [(row number, message)], row 1 being the header
+        self.errors = []
+
+    def add_error(self, row_number, message):
+        self.errors.append((row_number, message))
+
+    def __str__(self):
+        return f"{self.rows} {self.kind} rows read, {self.saved} saved, {len(self.errors)} errors"
+
+
+def _header(name):
+    return str(name or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    header = [_header(name) for name in next(reader, [])]
+    yield header
+    yield from reader
+
+
+def _xlsx_rows(fileobj):
+    try:
+        # Optional dependency, only needed for Excel registers
+        from openpyxl import load_workbook
+    except ImportError:
+        raise RegisterError("Reading .xlsx files needs openpyxl; export the register as CSV instead.")
+
+    # read_only mode streams the sheet instead of loading every cell
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [_header(name) for name in next(rows, ())]
+        yield header
+        for row in rows:
+            yield ['' if value is None else value for value in row]
+    finally:
+        workbook.close()
+
+
+def read_rows(fileobj, filename):
+    """Yield (row number, {column: value}) from a CSV or XLSX register."""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        rows = _csv_rows(fileobj)
+    elif extension == '.xlsx':
+        rows = _xlsx_rows(fileobj)
+    else:
+        raise RegisterError(f"Unsupported register format: {filename} (use .csv or .xlsx)")
+
+    header = next(rows)
+    for number, row in enumerate(rows, start=2):
+        if not any(str(value).strip() for value in row):
+            continue
+        yield number, dict(zip(header, row))
+
+
+def detect_kind(header):
+    return 'programs' if 'institution_code' in header else 'institutions'
+
+
+def _clean(model, name, value):
+    field = model._meta.get_field(name)
+    if isinstance(value, str):
+        value = value.strip()
+    if value == '' and field.null:
+        value = None
+    # Field-level validation only: uniqueness is what the upsert resolves
+    return field.clean(value, None)
+
+
+def _validate(model, columns, row):
+    values, errors = {}, []
+    for name in columns:
+        try:
+            values[name] = _clean(model, name, row.get(name, ''))
+        except ValidationError as e:
+            errors.append(f"{name}: {' '.join(e.messages)}")
+    return values, errors
+
+
+def _institution_rows(chunk, result):
+    objects = {}
+    for number, row in chunk:
+        values, errors = _validate(Institution, COLUMNS['institutions'], row)
+        if errors:
+            result.add_error(number, '; '.join(errors))
+            continue
+        # A later row for the same code replaces an earlier one
+        objects[values['code']] = (number, Institution(**values))
+    return list(objects.values())
+
+
+def _program_rows(chunk, result):
+    codes = {str(row.get('institution_code', '')).strip() for _, row in chunk}
+    institution_ids = dict(Institution.objects.filter(code__in=codes).values_list('code', 'id'))
+
+    objects = {}
+    for number, row in chunk:
+        institution_code = str(row.get('institution_code', '')).strip()
+        values, errors = _validate(Program, COLUMNS['programs'][1:], row)
+        institution_id = institution_ids.get(institution_code)
+        if institution_id is None:
+            errors.insert(0, f"institution_code: no institution with code '{institution_code}'")
+        if errors:
+            result.add_error(number, '; '.join(errors))
+            continue
+        objects[(institution_id, values['code'])] = (number, Program(institution_id=institution_id, **values))
+    return list(objects.values())
+
+
+UPSERT = {
+    'institutions': (Institution, _institution_rows, ['code']),
+    'programs': (Program, _program_rows, ['institution', 'code']),
+}
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _saved_ids(kind, objects):
+    if kind == 'institutions':
+        return Institution.objects.filter(code__in=[obj.code for obj in objects]).values_list('pk', flat=True)
+    keys = {(obj.institution_id, obj.code) for obj in objects}
+    rows = Program.objects.filter(
+        institution_id__in={institution_id for institution_id, _ in keys},
+        code__in={code for _, code in keys},
+    ).values_list('pk', 'institution_id', 'code')
+    return [pk for pk, institution_id, code in rows if (institution_id, code) in keys]
+
+
+def _upsert(model, objects, unique_fields):
+    update_fields = [
+        field.name for field in model._meta.concrete_fields
+        if not field.primary_key and field.name not in unique_fields
+    ]
+    # MySQL's ON DUPLICATE KEY UPDATE takes no conflict target; it uses
+    # whichever unique index the row collides with
+    connection = connections[router.db_for_write(model)]
+    if not connection.features.supports_update_conflicts_with_target:
+        unique_fields = None
+    model.objects.bulk_create(
+        objects, update_conflicts=True, unique_fields=unique_fields, update_fields=update_fields,
+    )
+
+
+def _write_chunk(kind, numbered, result):
+    model, _, unique_fields = UPSERT[kind]
+    try:
+        with transaction.atomic():
+            _upsert(model, [obj for _, obj in numbered], unique_fields)
+        result.saved += len(numbered)
+        result.saved_ids.extend(_saved_ids(kind, [obj for _, obj in numbered]))
+        return
+    except DatabaseError as e:
+        logger.warning(f"Register chunk failed, retrying row by row: {e}")
+
+    # Find the offending rows; the rest of the chunk is still saved
+    for number, obj in numbered:
+        try:
+            with transaction.atomic():
+                _upsert(model, [obj], unique_fields)
+            result.saved += 1
+            result.saved_ids.extend(_saved_ids(kind, [obj]))
+        except DatabaseError as e:
+            result.add_error(number, str(e))
+
+
+def import_register(fileobj, filename, kind=None, dry_run=False, reindex=True):
+    """Validate and upsert a register file and return an ImportResult.
+
+    Rows are read lazily and handled CHUNK_SIZE at a time: validated field
+    by field, then written with one INSERT ... ON CONFLICT UPDATE per chunk.
+    With ``reindex`` off the saved rows are not added to the search index,
+    which is most of the time of a large import; run rebuild_search_index
+    afterwards instead.
+    """
+    rows = read_rows(fileobj, filename)
+    first = next(rows, None)
+    if first is None:
+        return ImportResult(kind or 'institutions')
+    kind = kind or detect_kind(first[1])
+    if kind not in UPSERT:
+        raise RegisterError(f"Unknown register kind: {kind}")
+
+    prepare = UPSERT[kind][1]
+    result = ImportResult(kind)
+    for chunk in _chunks(chain([first], rows), CHUNK_SIZE):
+        result.rows += len(chunk)
+        numbered = prepare(chunk, result)
+        if numbered and not dry_run:
+            _write_chunk(kind, numbered, result)
+
+    result.errors.sort()
+    if result.saved_ids:
+        refresh_derived(kind, result.saved_ids, reindex)
+    logger.info(f"Imported {kind} register {filename}: {result}")
+    return result
+
+
+def refresh_derived(kind, object_ids, reindex=True):
+    """Bring the data built from the imported rows up to date.
+
+    bulk_create sends no model signals, so this does in bulk what the
+    signal handlers would have done per row.
+    """
+    if reindex:
+        search_kind = 'institution' if kind == 'institutions' else 'program'
+        search_index.index_objects(search_kind, object_ids)
+    stats.recompute()
+    if suggest.index.built_at is not None:
+        suggest.index.build()
+
+
+def write_report(result, fileobj):
+    """Write the per-row errors of ``result`` as CSV to a text file object."""
+    writer = csv.writer(fileobj)
+    writer.writerow(['row', 'error'])
+    writer.writerows(result.errors)
@@ -0,0 +1,188 @@
+import logging
+import math
+from collections import Counter, defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from .models import RelatedNews, SearchDocument, SearchPosting
+
+logger = logging.getLogger(__name__)
+
+# Related articles stored per article; the detail page shows the first few
+RELATED_PER_ARTICLE = 5
+
+# Articles are compared on their highest-weighted terms only
+SIGNATURE_TERMS = 25
+
+# Articles scored together in one dense block during a rebuild
+BATCH_SIZE = 64
+
+# Candidates fully scored when a single article changes
+MAX_CANDIDATES = 200
+
+# Similarities are computed from the term frequencies already stored in the
+# search index for published news (see nbtelog.search_index), so the rebuild
+# and the incremental updates read the same numbers and agree with each other.
+
+
+def _news_postings():
+    return SearchPosting.objects.filter(document__kind='news')
+
+
+def _collection_stats(terms=None):
+    """Return (number of articles, {term: document frequency})."""
+    total = SearchDocument.objects.filter(kind='news').count()
+    postings = _news_postings()
+    if terms is not None:
+        postings = postings.filter(term__in=terms)
+    df = dict(postings.values_list('term').annotate(df=Count('id')).values_list('term', 'df'))
+    return total, df
+
+
+def signature(frequencies, total, df):
+    """Return the top TF-IDF terms of an article as an l2-normalized dict."""
+    weights = {
+        term: frequency * (math.log((1 + total) / (1 + df.get(term, 0))) + 1.0)
+        for term, frequency in frequencies.items()
+    }
+    top = sorted(weights.items(), key=lambda item: -item[1])[:SIGNATURE_TERMS]
+    norm = math.sqrt(sum(weight * weight for _, weight in top)) or 1.0
+    return {term: weight / norm for term, weight in top}
+
+
+def _load_frequencies(object_ids=None):
+    """Return {news id: Counter(term -> frequency)} from the search index."""
+    postings = _news_postings()
+    if object_ids is not None:
+        postings = postings.filter(document__object_id__in=object_ids)
+    frequencies = defaultdict(Counter)
+    rows = postings.values_list('document__object_id', 'term', 'frequency').iterator(chunk_size=10000)
+    for object_id, term, frequency in rows:
+        frequencies[object_id][term] = frequency
+    return frequencies
+
+
+def rebuild():
+    """Recompute the related articles of every published article.
+
+    Signatures are turned into an inverted index and scored a block of
+    BATCH_SIZE articles at a time, so the work is a handful of NumPy
+    operations per term rather than a Python loop per article pair.
+    Returns the number of articles processed.
+    """
+    total, df = _collection_stats()
+    frequencies = _load_frequencies()
+    ids = sorted(frequencies)
+    signatures = [signature(frequencies[object_id], total, df) for object_id in ids]
+    del frequencies
+
+    postings = defaultdict(lambda: ([], []))
+    for i, terms in enumerate(signatures):
+        for term, weight in terms.items():
+            postings[term][0].append(i)
+            postings[term][1].append(weight)
+    postings = {
+        term: (np.array(indices, dtype=np.intp), np.array(weights))
+        for term, (indices, weights) in postings.items()
+    }
+
+    with transaction.atomic():
+        RelatedNews.objects.all().delete()
+        keep = min(RELATED_PER_ARTICLE, len(ids) - 1)
+        for start in range(0, len(ids), BATCH_SIZE):
+            block = np.zeros((min(BATCH_SIZE, len(ids) - start), len(ids)))
+            for row in range(block.shape[0]):
+                for term, weight in signatures[start + row].items():
+                    indices, weights = postings[term]
+                    block[row, indices] += weight * weights
+                block[row, start + row] = 0.0
+
+            if keep <= 0:
+                continue
+            top = np.argpartition(-block, keep - 1, axis=1)[:, :keep]
+            links = []
+            for row in range(block.shape[0]):
+                for column in top[row]:
+                    score = float(block[row, column])
+                    if score > 0:
+                        links.append(RelatedNews(
+                            news_id=ids[start + row], related_id=ids[column], score=score,
+                        ))
+            RelatedNews.objects.bulk_create(links)
+
+    logger.info(f"Rebuilt related news for {len(ids)} articles")
+    return len(ids)
+
+
+def update(news):
+    """Recompute the related articles of ``news`` and offer it to its neighbours.
+
+    Must run after the article has been (re)indexed for search.
+    """
+    with transaction.atomic():
+        RelatedNews.objects.filter(news=news).delete()
+        if news.status != 'published':
+            RelatedNews.objects.filter(related=news).delete()
+            return
+
+        own = _load_frequencies([news.pk]).get(news.pk)
+        if not own:
+            return
+        total, df = _collection_stats(own.keys())
+        own_signature = signature(own, total, df)
+
+        # Shortlist articles sharing signature terms, then score them exactly
+        partial = Counter()
+        rows = (
+            _news_postings()
+            .filter(term__in=own_signature)
+            .exclude(document__object_id=news.pk)
+            .values_list('term', 'document__object_id', 'frequency')
+        )
+        for term, object_id, frequency in rows:
+            partial[object_id] += own_signature[term] * frequency
+        candidates = [object_id for object_id, _ in partial.most_common(MAX_CANDIDATES)]
+        if not candidates:
+            return
+
+        candidate_frequencies = _load_frequencies(candidates)
+        terms = set().union(*(counts.keys() for counts in candidate_frequencies.values()))
+        _, candidate_df = _collection_stats(terms)
+        scores = {}
+        for object_id, counts in candidate_frequencies.items():
+            other = signature(counts, total, candidate_df)
+            score = sum(weight * other.get(term, 0.0) for term, weight in own_signature.items())
+            if score > 0:
+                scores[object_id] = score
+
+        best = sorted(scores.items(), key=lambda item: -item[1])[:RELATED_PER_ARTICLE]
+        RelatedNews.objects.bulk_create(
+            RelatedNews(news=news, related_id=object_id, score=score) for object_id, score in best
+        )
+
+        # Let this article displace the weakest link of the articles it is close to
+        RelatedNews.objects.filter(related=news).delete()
+        existing = defaultdict(list)
+        for link in RelatedNews.objects.filter(news_id__in=[object_id for object_id, _ in best]):
+            existing[link.news_id].append(link)
+        for object_id, score in best:
+            links = existing[object_id]
+            if len(links) < RELATED_PER_ARTICLE:
+                RelatedNews.objects.create(news_id=object_id, related=news, score=score)
+                continue
+            weakest = min(links, key=lambda link: link.score)
+            if weakest.score < score:
+                weakest.delete()
+                RelatedNews.objects.create(news_id=object_id, related=news, score=score)
+
+
+def related_for(news, limit=3):
+    """Return up to ``limit`` published related articles, best first."""
+    links = (
+        RelatedNews.objects.filter(news=news, related__status='published')
+        .select_related('related')
+        .order_by('-score')[:limit]
+    )
+    return [link.related for link in links]
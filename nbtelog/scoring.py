@@ -0,0 +1,159 @@
+import logging
+import math
+import re
+from collections import Counter
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Same tokenization as scikit-learn's TfidfVectorizer defaults
+TOKEN_PATTERN = re.compile(r'(?u)\b\w\w+\b')
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BaseScorer:
+    """TF-IDF / cosine scorer fitted once on a fixed list of documents.
+
+    Weights follow scikit-learn's defaults (raw term counts, smoothed idf,
+    l2-normalized documents). Words a message contains that no document has
+    seen still count towards its norm, weighted as if they appeared in one
+    extra document. The idf of the known words is not re-fitted with the
+    message added, so scores only approximate refitting on documents +
+    message; the best match is nearly always the same, not always.
+    Both backends compute the same scores.
+    """
+
+    def __init__(self, documents):
+        self.size = len(documents)
+        self.oov_idf = math.log((self.size + 2) / 2.0) + 1.0
+
+    def _unseen_norm(self, tokens, vocabulary):
+        unseen = Counter(token for token in tokens if token not in vocabulary)
+        return sum((count * self.oov_idf) ** 2 for count in unseen.values())
+
+    def scores(self, messages):
+        """Return ``(indices, scores)`` arrays of the non-zero cosine
+        similarities between each message and the documents."""
+        raise NotImplementedError
+
+
+class TfidfScorer(BaseScorer):
+    """Sparse TF-IDF scorer that only needs NumPy.
+
+    The normalized document weights are kept as a term-major sparse matrix
+    (CSR arrays), and a batch of messages is scored with one sparse product
+    against it, done with NumPy gathers and a bincount.
+    """
+
+    def __init__(self, documents):
+        super().__init__(documents)
+        counts = [Counter(tokenize(document)) for document in documents]
+        df = Counter()
+        for document_counts in counts:
+            df.update(document_counts.keys())
+
+        self.idf = {
+            term: math.log((1 + self.size) / (1 + frequency)) + 1.0
+            for term, frequency in df.items()
+        }
+        self.term_ids = {term: i for i, term in enumerate(self.idf)}
+        self.idf_weights = np.array(list(self.idf.values()))
+
+        postings = [([], []) for _ in self.term_ids]
+        for doc_idx, document_counts in enumerate(counts):
+            weights = {term: count * self.idf[term] for term, count in document_counts.items()}
+            norm = math.sqrt(sum(weight * weight for weight in weights.values()))
+            for term, weight in weights.items():
+                indices, values = postings[self.term_ids[term]]
+                indices.append(doc_idx)
+                values.append(weight / norm)
+
+        lengths = [len(indices) for indices, _ in postings]
+        self.indptr = np.concatenate([[0], np.cumsum(lengths, dtype=np.intp)]).astype(np.intp)
+        self.doc_indices = np.array([i for indices, _ in postings for i in indices], dtype=np.intp)
+        self.doc_weights = np.array([w for _, values in postings for w in values])
+
+    def scores(self, messages):
+        # Query matrix as (row, term, count) triples
+        rows, terms, counts = [], [], []
+        unseen = np.zeros(len(messages))
+        for row, message in enumerate(messages):
+            tokens = tokenize(message)
+            query = Counter(self.term_ids[token] for token in tokens if token in self.term_ids)
+            rows += [row] * len(query)
+            terms += query.keys()
+            counts += query.values()
+            unseen[row] = self._unseen_norm(tokens, self.idf)
+        rows = np.array(rows, dtype=np.intp)
+        terms = np.array(terms, dtype=np.intp)
+        weights = np.array(counts, dtype=float) * self.idf_weights[terms]
+        norms = np.sqrt(np.bincount(rows, weights * weights, minlength=len(messages)) + unseen)
+
+        # Every (message, document) contribution of every query term at once:
+        # the postings of each query term are gathered from the CSR arrays
+        starts = self.indptr[terms]
+        lengths = self.indptr[terms + 1] - starts
+        offsets = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths) + np.arange(lengths.sum())
+        cells = np.repeat(rows, lengths) * self.size + self.doc_indices[offsets]
+        values = np.repeat(weights, lengths) * self.doc_weights[offsets]
+        products = np.bincount(cells, values, minlength=len(messages) * self.size).reshape(len(messages), self.size)
+
+        results = []
+        for row in range(len(messages)):
+            indices = np.flatnonzero(products[row])
+            results.append((indices, products[row, indices] / norms[row]))
+        return results
+
+
+class SklearnScorer(BaseScorer):
+    """scikit-learn backed scorer; batches are one sparse matrix product."""
+
+    def __init__(self, documents):
+        super().__init__(documents)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.preprocessing import normalize
+
+        self.vectorizer = TfidfVectorizer(norm=None)
+        self.matrix = normalize(self.vectorizer.fit_transform(documents))
+        self.analyzer = self.vectorizer.build_analyzer()
+
+    def scores(self, messages):
+        vectors = self.vectorizer.transform(messages)
+        vocabulary = self.vectorizer.vocabulary_
+
+        norms = np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel()
+        for row, message in enumerate(messages):
+            norms[row] += self._unseen_norm(self.analyzer(message), vocabulary)
+        norms = np.sqrt(norms)
+        norms[norms == 0] = 1.0
+
+        products = (vectors @ self.matrix.T).tocsr()
+        results = []
+        for row in range(len(messages)):
+            start, end = products.indptr[row], products.indptr[row + 1]
+            results.append((products.indices[start:end], products.data[start:end] / norms[row]))
+        return results
+
+
+BACKENDS = {
+    'lean': TfidfScorer,
+    'sklearn': SklearnScorer,
+}
+
+
+def get_scorer(documents):
+    """Build a scorer with the backend named by ``settings.CHATBOT_BACKEND``."""
+    backend = getattr(settings, 'CHATBOT_BACKEND', 'lean')
+    if backend not in BACKENDS:
+        logger.warning(f"Unknown CHATBOT_BACKEND {backend!r}, using 'lean'")
+        backend = 'lean'
+    try:
+        return BACKENDS[backend](documents)
+    except ImportError as e:
+        logger.warning(f"Chatbot backend {backend!r} unavailable ({e}), using 'lean'")
+        return TfidfScorer(documents)
@@ -0,0 +1,280 @@
+import logging
+import math
+import re
+from collections import Counter, defaultdict, deque
+
+from django.db import transaction
+from django.db.models import Avg, Count
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Document, Institution, News, Program, SearchDocument, SearchPosting
+
+logger = logging.getLogger(__name__)
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Title words count this many times towards a term's frequency
+TITLE_WEIGHT = 3
+
+# Shortest query term that is also matched as a prefix ("poly" -> "polytechnic")
+MIN_PREFIX_LENGTH = 3
+
+BATCH_SIZE = 500
+
+TOKEN_PATTERN = re.compile(r'\w+')
+WORD_PATTERN = re.compile(r'\S+')
+
+STOP_WORDS = frozenset("""
+a an and are as at be been but by for from has have in is it its of on or that
+the this to was were will with
+""".split())
+
+
+def stem(word):
+    """Strip common English inflections so "programmes" finds "programme"."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+
+    for suffix in ('ingly', 'edly', 'ing', 'ed', 'ly'):
+        if word.endswith(suffix):
+            root = word[:-len(suffix)]
+            if len(root) >= 3 and re.search(r'[aeiouy]', root):
+                if len(root) > 2 and root[-1] == root[-2] and root[-1] not in 'lsz':
+                    root = root[:-1]
+                return root
+    return word
+
+
+def analyze(text):
+    """Split text into lower-cased, stemmed terms without stop words."""
+    return [
+        stem(token)[:64]
+        for token in TOKEN_PATTERN.findall(text.lower())
+        if token not in STOP_WORDS
+    ]
+
+
+def _news_fields(news):
+    return news.title, news.content
+
+
+def _institution_fields(institution):
+    return institution.name, f"{institution.code} {institution.address} {institution.accreditation_status}"
+
+
+def _program_fields(program):
+    return program.name, f"{program.code} {program.qualification_type} {program.description}"
+
+
+def _document_fields(document):
+    # Uses the text extracted at upload time, never the file itself
+    return document.title, f"{document.description} {document.text}"
+
+
+# kind -> (model, queryset of indexable rows, function returning (title, body))
+SOURCES = {
+    'news': (News, lambda: News.objects.filter(status='published'), _news_fields),
+    'institution': (Institution, lambda: Institution.objects.all(), _institution_fields),
+    'program': (Program, lambda: Program.objects.all(), _program_fields),
+    'document': (Document, lambda: Document.objects.all(), _document_fields),
+}
+
+KIND_FOR_MODEL = {model: kind for kind, (model, _, _) in SOURCES.items()}
+
+
+def term_frequencies(kind, obj):
+    title, body = SOURCES[kind][2](obj)
+    frequencies = Counter()
+    for term in analyze(title):
+        frequencies[term] += TITLE_WEIGHT
+    frequencies.update(analyze(body))
+    return frequencies
+
+
+def index_object(obj):
+    """Add or refresh ``obj`` in the index, or drop it if it is not indexable."""
+    kind = KIND_FOR_MODEL[type(obj)]
+    if not SOURCES[kind][1]().filter(pk=obj.pk).exists():
+        remove_object(obj)
+        return
+
+    frequencies = term_frequencies(kind, obj)
+    with transaction.atomic():
+        document, _ = SearchDocument.objects.update_or_create(
+            kind=kind, object_id=obj.pk,
+            defaults={'length': sum(frequencies.values())},
+        )
+        document.postings.all().delete()
+        SearchPosting.objects.bulk_create(
+            SearchPosting(term=term, document=document, frequency=frequency)
+            for term, frequency in frequencies.items()
+        )
+
+
+def remove_object(obj):
+    kind = KIND_FOR_MODEL[type(obj)]
+    SearchDocument.objects.filter(kind=kind, object_id=obj.pk).delete()
+
+
+def index_objects(kind, object_ids):
+    """Refresh many objects of one kind at once, e.g. after a bulk import."""
+    object_ids = list(object_ids)
+    for start in range(0, len(object_ids), BATCH_SIZE):
+        batch_ids = object_ids[start:start + BATCH_SIZE]
+        SearchDocument.objects.filter(kind=kind, object_id__in=batch_ids).delete()
+        objects = list(SOURCES[kind][1]().filter(pk__in=batch_ids))
+        if objects:
+            _index_batch(kind, objects)
+
+
+def rebuild(kinds=None):
+    """Rebuild the index from scratch and return the number of documents."""
+    kinds = kinds or list(SOURCES)
+    total = 0
+    for kind in kinds:
+        documents = SearchDocument.objects.filter(kind=kind)
+        SearchPosting.objects.filter(document__in=documents).delete()
+        documents.delete()
+
+        batch = []
+        for obj in SOURCES[kind][1]().iterator(chunk_size=BATCH_SIZE):
+            batch.append(obj)
+            if len(batch) >= BATCH_SIZE:
+                total += _index_batch(kind, batch)
+                batch = []
+        if batch:
+            total += _index_batch(kind, batch)
+        logger.info(f"Rebuilt search index for {kind}")
+    return total
+
+
+def _index_batch(kind, objects):
+    frequencies = {obj.pk: term_frequencies(kind, obj) for obj in objects}
+    with transaction.atomic():
+        SearchDocument.objects.bulk_create(
+            SearchDocument(kind=kind, object_id=pk, length=sum(counts.values()))
+            for pk, counts in frequencies.items()
+        )
+        # Not every backend returns primary keys from bulk_create, so read them back
+        document_ids = dict(
+            SearchDocument.objects.filter(kind=kind, object_id__in=frequencies)
+            .values_list('object_id', 'id')
+        )
+        SearchPosting.objects.bulk_create(
+            (
+                SearchPosting(term=term, document_id=document_ids[pk], frequency=frequency)
+                for pk, counts in frequencies.items()
+                for term, frequency in counts.items()
+            ),
+            batch_size=BATCH_SIZE * 10,
+        )
+    return len(objects)
+
+
+def is_empty(kind=None):
+    documents = SearchDocument.objects.all()
+    if kind is not None:
+        documents = documents.filter(kind=kind)
+    return not documents.exists()
+
+
+def search(query, kinds=None):
+    """Return ``[(kind, object_id, score), ...]`` ranked by BM25, best first.
+
+    Every query term is looked up exactly; the last one also matches as a
+    prefix so partially typed words and codes still find something.
+    """
+    terms = list(dict.fromkeys(analyze(query)))
+    if not terms:
+        return []
+
+    postings = SearchPosting.objects.filter(term__in=terms)
+    last = terms[-1]
+    if len(last) >= MIN_PREFIX_LENGTH:
+        # A range rather than LIKE so every backend can use the term index
+        postings = postings | SearchPosting.objects.filter(term__gte=last, term__lt=last + '\uffff')
+    if kinds:
+        postings = postings.filter(document__kind__in=kinds)
+    rows = list(postings.values_list(
+        'term', 'frequency', 'document__kind', 'document__object_id', 'document__length',
+    ))
+    if not rows:
+        return []
+
+    stats = SearchDocument.objects.aggregate(count=Count('id'), avg_length=Avg('length'))
+    total = stats['count'] or 1
+    avg_length = stats['avg_length'] or 1.0
+
+    document_frequency = Counter(row[0] for row in rows)
+    scores = defaultdict(float)
+    for term, frequency, kind, object_id, length in rows:
+        df = document_frequency[term]
+        idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        norm = K1 * (1 - B + B * length / avg_length)
+        scores[(kind, object_id)] += idf * frequency * (K1 + 1) / (frequency + norm)
+
+    return sorted(
+        ((kind, object_id, score) for (kind, object_id), score in scores.items()),
+        key=lambda hit: -hit[2],
+    )
+
+
+def _term_matcher(query):
+    query_terms = analyze(query)
+    terms = set(query_terms)
+    prefix = query_terms[-1] if query_terms and len(query_terms[-1]) >= MIN_PREFIX_LENGTH else None
+
+    def matches(word):
+        for token in TOKEN_PATTERN.findall(word.lower()):
+            if stem(token) in terms or (prefix and token.startswith(prefix)):
+                return True
+        return False
+
+    return matches
+
+
+def excerpt(text, query, words=30):
+    """Return up to ``words`` words of ``text`` around the first query match.
+
+    The text is HTML-escaped and matching words are wrapped in ``<mark>``.
+    Scanning stops as soon as the window is full.
+    """
+    matches = _term_matcher(query)
+    before = deque(maxlen=words // 4)
+    selected = None
+    cut_before = cut_after = False
+
+    for match in WORD_PATTERN.finditer(text):
+        word = match.group()
+        if selected is None:
+            if matches(word):
+                selected = list(before) + [word]
+            else:
+                cut_before = cut_before or len(before) == before.maxlen
+                before.append(word)
+        elif len(selected) < words:
+            selected.append(word)
+        else:
+            cut_after = True
+            break
+
+    if selected is None:
+        # No match in the text itself (e.g. only the title matched)
+        selected = WORD_PATTERN.findall(text[:words * 20])
+        cut_before, cut_after = False, len(selected) > words
+        selected = selected[:words]
+
+    highlighted = ' '.join(
+        f"<mark>{escape(word)}</mark>" if matches(word) else escape(word)
+        for word in selected
+    )
+    return mark_safe(('… ' if cut_before else '') + highlighted + (' …' if cut_after else ''))
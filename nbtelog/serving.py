@@ -0,0 +1,154 @@
+import atexit
+import logging
+import re
+import threading
+from collections import Counter
+
+from django.db import connections
+from django.db.models import F
+from django.utils.http import parse_etags
+
+logger = logging.getLogger(__name__)
+
+# Pending download counts are written this many seconds after the first of them
+COUNT_FLUSH_INTERVAL = 60
+
+_single_range = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """Return (start, end) for a single-range Range header, inclusive.
+
+    Returns None when the header should be ignored (absent, malformed or
+    asking for several ranges, which may then be answered with the whole
+    file) and raises ValueError when the range cannot be satisfied.
+    """
+    if not header:
+        return None
+    match = _single_range.match(header.replace(' ', ''))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # bytes=-N: the last N bytes
+        length = int(last)
+        # An empty file has no last bytes to send either
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def is_download_start(request):
+    """True for a GET of the whole file or of a range from its first byte."""
+    if request.method != 'GET':
+        return False
+    header = request.headers.get('Range', '').replace(' ', '')
+    return not header or header.startswith('bytes=0-')
+
+
+def if_range_matches(header, etag):
+    """True when a Range may be honoured under the request's If-Range.
+
+    Only an identical strong ETag validates; a date, a weak tag or a
+    document without checksum means the whole file is sent instead.
+    """
+    if not header:
+        return True
+    return etag is not None and parse_etags(header) == [etag]
+
+
+class RangeFile:
+    """Read at most ``length`` bytes of ``fileobj`` from its current position.
+
+    ``fileno`` is passed through so a WSGI server's file wrapper (gunicorn
+    uses sendfile) can send the range straight from the page cache; it
+    stops after Content-Length bytes.
+    """
+
+    def __init__(self, fileobj, length):
+        self.fileobj = fileobj
+        self.remaining = length
+        self.name = getattr(fileobj, 'name', '')
+
+    def fileno(self):
+        return self.fileobj.fileno()
+
+    def read(self, size=-1):
+        if self.remaining <= 0:
+            return b''
+        if size is None or size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.fileobj.close()
+
+
+def presigned_url(storage, name, expires, disposition=None):
+    """Return a short-lived signed GET URL for ``name`` in an S3 storage."""
+    from storages.utils import clean_name
+
+    params = {'Bucket': storage.bucket_name, 'Key': storage._normalize_name(clean_name(name))}
+    if disposition:
+        params['ResponseContentDisposition'] = disposition
+    return storage.connection.meta.client.generate_presigned_url(
+        'get_object', Params=params, ExpiresIn=expires,
+    )
+
+
+class DownloadCounter:
+    """Download counts buffered in memory and added to the rows in batches.
+
+    Only requests for the start of a file count, so a download that the
+    browser fetches in several ranges is counted once, and the database
+    sees one UPDATE per document per flush rather than one per request.
+    The first pending count starts a timer that flushes ``interval``
+    seconds later, so counts are written even when no more downloads come.
+    """
+
+    def __init__(self, model, interval=COUNT_FLUSH_INTERVAL):
+        self.model = model
+        self.interval = interval
+        self._pending = Counter()
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def add(self, pk):
+        with self._lock:
+            self._pending[pk] += 1
+            if self._timer is None:
+                self._timer = threading.Timer(self.interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            # The timer thread opened its own database connection
+            connections.close_all()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        for pk, count in pending.items():
+            try:
+                self.model.objects.filter(pk=pk).update(download_count=F('download_count') + count)
+            except Exception as e:
+                logger.error(f"Could not record {count} downloads of document {pk}: {e}")
+
+    def register_exit_flush(self):
+        # Only what is still pending when the server stops
+        atexit.register(self.flush)
@@ -0,0 +1,93 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import chatbot, documents, images, related, search_index, stats, suggest
+from .models import ChatBot, Document, Institution, News, Program, SliderImage
+
+
+@receiver([post_save, post_delete], sender=ChatBot)
+def chatbot_changed(sender, **kwargs):
+    chatbot.invalidate()
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Institution)
+@receiver(post_save, sender=Program)
+def search_source_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search_index.index_object(instance)
+
+
+@receiver(post_save, sender=News)
+def news_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Reads the postings written by search_source_saved above, which is
+        # connected first and therefore runs first
+        related.update(instance)
+
+
+@receiver(post_save, sender=Document)
+def document_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Read the file's metadata and text once per upload, then index it
+        documents.refresh_metadata(instance)
+        documents.refresh_text(instance)
+        search_index.index_object(instance)
+
+
+@receiver(post_save, sender=SliderImage)
+def slider_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.refresh_variants(instance, 'image', 'image_variants')
+
+
+@receiver(post_save, sender=News)
+def news_image_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        images.refresh_variants(instance, 'featured_image', 'featured_image_variants')
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Institution)
+@receiver(post_delete, sender=Program)
+@receiver(post_delete, sender=Document)
+def search_source_deleted(sender, instance, **kwargs):
+    search_index.remove_object(instance)
+
+
+@receiver(post_save, sender=News)
+@receiver(post_save, sender=Institution)
+@receiver(post_save, sender=Program)
+def suggestion_source_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        suggest.object_changed(instance)
+
+
+@receiver(post_delete, sender=News)
+@receiver(post_delete, sender=Institution)
+@receiver(post_delete, sender=Program)
+def suggestion_source_deleted(sender, instance, **kwargs):
+    suggest.object_changed(instance, deleted=True)
+
+
+@receiver(pre_save, sender=Institution)
+@receiver(pre_save, sender=Program)
+def statistics_source_saving(sender, instance, raw=False, **kwargs):
+    if not raw:
+        # Remember what the row was counted under before this save
+        instance._statistics_keys = stats.stored_keys(instance)
+
+
+@receiver(post_save, sender=Institution)
+@receiver(post_save, sender=Program)
+def statistics_source_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        keys = stats.KEYS[sender][0]
+        stats.apply(getattr(instance, '_statistics_keys', []), keys(instance))
+
+
+@receiver(post_delete, sender=Institution)
+@receiver(post_delete, sender=Program)
+def statistics_source_deleted(sender, instance, **kwargs):
+    keys = stats.KEYS[sender][0]
+    stats.apply(keys(instance), [])
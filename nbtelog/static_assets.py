@@ -0,0 +1,109 @@
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestFilesMixin, staticfiles_storage
+from django.template.loaders.app_directories import get_app_template_dirs
+
+logger = logging.getLogger(__name__)
+
+# {% static 'path' %} and 'path'|static_exists / 'path'|static_url in templates
+_references = re.compile(
+    r"""{%\s*static\s+(['"])(?P<tag>[^'"]+)\1"""
+    r"""|(['"])(?P<filter>[^'"]+)\3\s*\|\s*static_(?:exists|url)\b"""
+)
+
+
+class StaticAssets:
+    """Names of the collected static files, loaded once per process.
+
+    With a manifest storage the names and their hashed versions come from
+    the manifest that collectstatic wrote; otherwise STATIC_ROOT is scanned
+    and the staticfiles finders list what collectstatic would collect
+    (STATICFILES_DIRS and every app's static directory, admin included).
+    Either way a lookup is a dict access.
+    """
+
+    def __init__(self):
+        self._names = None
+        self._urls = {}
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if isinstance(staticfiles_storage, ManifestFilesMixin):
+            hashed = dict(staticfiles_storage.hashed_files)
+            if hashed:
+                logger.debug(f"Loaded {len(hashed)} static files from the manifest")
+                return hashed
+
+        names = {}
+        root = Path(settings.STATIC_ROOT) if settings.STATIC_ROOT else None
+        if root is not None and root.is_dir():
+            for directory, _, files in os.walk(root):
+                for filename in files:
+                    name = (Path(directory) / filename).relative_to(root).as_posix()
+                    names.setdefault(name, name)
+        for finder in finders.get_finders():
+            for path, storage in finder.list([]):
+                # Same naming as collectstatic, including STATICFILES_DIRS prefixes
+                prefix = getattr(storage, 'prefix', None)
+                name = Path(prefix, path).as_posix() if prefix else Path(path).as_posix()
+                names.setdefault(name, name)
+        logger.debug(f"Found {len(names)} static files on disk")
+        return names
+
+    @property
+    def names(self):
+        if self._names is None:
+            with self._lock:
+                if self._names is None:
+                    self._names = self._load()
+        return self._names
+
+    def exists(self, path):
+        return path in self.names
+
+    def url(self, path):
+        """Return the (hashed) URL of ``path``, or '' if it was not collected."""
+        stored = self.names.get(path)
+        if stored is None:
+            return ''
+        url = self._urls.get(stored)
+        if url is None:
+            url = self._urls[stored] = staticfiles_storage.url(path)
+        return url
+
+    def reset(self):
+        with self._lock:
+            self._names = None
+            self._urls = {}
+
+
+assets = StaticAssets()
+
+
+def template_dirs():
+    dirs = []
+    for engine in settings.TEMPLATES:
+        dirs.extend(Path(directory) for directory in engine.get('DIRS', []))
+    dirs.extend(Path(directory) for directory in get_app_template_dirs('templates'))
+    return dirs
+
+
+def missing_references():
+    """Return [(template, asset)] for static assets templates refer to but do not exist."""
+    missing = []
+    for directory in template_dirs():
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.rglob('*.html')):
+            text = path.read_text(encoding='utf-8', errors='ignore')
+            for match in _references.finditer(text):
+                name = match.group('tag') or match.group('filter')
+                if not assets.exists(name):
+                    missing.append((path.relative_to(directory).as_posix(), name))
+    return missing
@@ -0,0 +1,163 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import ExtractYear
+
+from .models import Institution, Program, StatisticCount
+
+# Dimensions kept in StatisticCount. The counts are adjusted by the model
+# signals as rows change and rebuilt from scratch by rebuild_statistics
+TOTAL = 'total'
+INSTITUTIONS_BY_STATUS = 'institutions_by_status'
+INSTITUTIONS_BY_AUDIT_YEAR = 'institutions_by_audit_year'
+PROGRAMS_BY_STATUS = 'programs_by_status'
+PROGRAMS_BY_QUALIFICATION = 'programs_by_qualification'
+PROGRAMS_BY_INSTITUTION = 'programs_by_institution'
+
+# Bumped on every change; part of the cache keys and ETags of pages that
+# show the statistics
+REVISION = 'revision'
+
+TOP_INSTITUTIONS = 10
+
+
+def institution_keys(institution):
+    """The (dimension, key) pairs an institution is counted under."""
+    audit_date = institution.last_audit_date
+    return [
+        (TOTAL, 'institutions'),
+        (INSTITUTIONS_BY_STATUS, institution.accreditation_status),
+        (INSTITUTIONS_BY_AUDIT_YEAR, str(audit_date.year) if audit_date else ''),
+    ]
+
+
+def program_keys(program):
+    """The (dimension, key) pairs a program is counted under."""
+    return [
+        (TOTAL, 'programs'),
+        (PROGRAMS_BY_STATUS, program.accreditation_status),
+        (PROGRAMS_BY_QUALIFICATION, program.qualification_type),
+        (PROGRAMS_BY_INSTITUTION, str(program.institution_id)),
+    ]
+
+
+KEYS = {
+    Institution: (institution_keys, ['accreditation_status', 'last_audit_date']),
+    Program: (program_keys, ['accreditation_status', 'qualification_type', 'institution_id']),
+}
+
+
+def stored_keys(instance):
+    """The keys ``instance`` is counted under as currently saved, if it is."""
+    keys, fields = KEYS[type(instance)]
+    if instance.pk is None:
+        return []
+    saved = type(instance).objects.filter(pk=instance.pk).only(*fields).first()
+    return keys(saved) if saved else []
+
+
+def _bump(dimension, key, delta):
+    updated = StatisticCount.objects.filter(dimension=dimension, key=key).update(count=F('count') + delta)
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            StatisticCount.objects.create(dimension=dimension, key=key, count=delta)
+    except IntegrityError:
+        # Created by a concurrent request in the meantime
+        StatisticCount.objects.filter(dimension=dimension, key=key).update(count=F('count') + delta)
+
+
+def apply(old_keys, new_keys):
+    """Move a row's counts from ``old_keys`` to ``new_keys``."""
+    deltas = Counter(new_keys)
+    deltas.subtract(old_keys)
+    changed = {key: delta for key, delta in deltas.items() if delta}
+    if not changed:
+        return
+    for (dimension, key), delta in changed.items():
+        _bump(dimension, key, delta)
+    _bump(REVISION, '', 1)
+
+
+def version():
+    """The current statistics revision, read with one indexed lookup."""
+    return StatisticCount.objects.filter(dimension=REVISION, key='').values_list('count', flat=True).first() or 0
+
+
+def _grouped(queryset, field, dimension):
+    return [
+        StatisticCount(dimension=dimension, key='' if value is None else str(value), count=count)
+        for value, count in queryset.values_list(field).annotate(count=Count('id')).order_by()
+    ]
+
+
+@transaction.atomic
+def recompute():
+    """Rebuild every count with one GROUP BY per dimension.
+
+    Used after bulk imports, which send no signals, and by the
+    rebuild_statistics command. Returns the new revision.
+    """
+    revision = version() + 1
+    rows = [
+        StatisticCount(dimension=TOTAL, key='institutions', count=Institution.objects.count()),
+        StatisticCount(dimension=TOTAL, key='programs', count=Program.objects.count()),
+        StatisticCount(dimension=REVISION, key='', count=revision),
+    ]
+    institutions = Institution.objects.annotate(audit_year=ExtractYear('last_audit_date'))
+    rows += _grouped(institutions, 'accreditation_status', INSTITUTIONS_BY_STATUS)
+    rows += _grouped(institutions, 'audit_year', INSTITUTIONS_BY_AUDIT_YEAR)
+    rows += _grouped(Program.objects.all(), 'accreditation_status', PROGRAMS_BY_STATUS)
+    rows += _grouped(Program.objects.all(), 'qualification_type', PROGRAMS_BY_QUALIFICATION)
+    rows += _grouped(Program.objects.all(), 'institution_id', PROGRAMS_BY_INSTITUTION)
+
+    StatisticCount.objects.all().delete()
+    StatisticCount.objects.bulk_create(rows, batch_size=1000)
+    return revision
+
+
+def _breakdown(counts, dimension, label, by_count=True):
+    items = [(key, count) for key, count in counts.get(dimension, {}).items() if count > 0]
+    if by_count:
+        items.sort(key=lambda item: (-item[1], item[0]))
+    else:
+        items.sort(reverse=True)
+    return [{label: key, 'count': count} for key, count in items]
+
+
+def summary(top=TOP_INSTITUTIONS):
+    """Return the statistics shown on the APRS & ICT page and in the API.
+
+    Three queries whatever the size of the register: the small dimensions,
+    the institutions with the most programs, and their names.
+    """
+    counts = {}
+    for dimension, key, count in (
+        StatisticCount.objects.exclude(dimension=PROGRAMS_BY_INSTITUTION).values_list('dimension', 'key', 'count')
+    ):
+        counts.setdefault(dimension, {})[key] = count
+
+    ranked = list(
+        StatisticCount.objects.filter(dimension=PROGRAMS_BY_INSTITUTION, count__gt=0)
+        .order_by('-count', 'key').values_list('key', 'count')[:top]
+    )
+    names = Institution.objects.only('code', 'name').in_bulk([int(key) for key, _ in ranked]) if ranked else {}
+    top_institutions = [
+        {'code': names[int(key)].code, 'name': names[int(key)].name, 'programs': count}
+        for key, count in ranked if int(key) in names
+    ]
+
+    totals = counts.get(TOTAL, {})
+    return {
+        'revision': counts.get(REVISION, {}).get('', 0),
+        'institutions': totals.get('institutions', 0),
+        'programs': totals.get('programs', 0),
+        'institutions_by_status': _breakdown(counts, INSTITUTIONS_BY_STATUS, 'status'),
+        # Most recent year first; '' (never audited) last
+        'institutions_by_audit_year': _breakdown(counts, INSTITUTIONS_BY_AUDIT_YEAR, 'year', by_count=False),
+        'programs_by_status': _breakdown(counts, PROGRAMS_BY_STATUS, 'status'),
+        'programs_by_qualification': _breakdown(counts, PROGRAMS_BY_QUALIFICATION, 'qualification_type'),
+        'top_institutions': top_institutions,
+    }
@@ -0,0 +1,229 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.urls import reverse
+
+from .models import Institution, News, Program
+
+logger = logging.getLogger(__name__)
+
+# Other workers pick up changes made elsewhere within this many seconds;
+# changes made in this worker apply immediately through the model signals
+MAX_AGE = 300
+
+MIN_QUERY_LENGTH = 2
+DEFAULT_LIMIT = 8
+MAX_LIMIT = 20
+
+# Only the first few words of a label start a completion of their own
+MAX_WORD_STARTS = 6
+
+_whitespace = re.compile(r'\s+')
+
+
+def normalize(text):
+    return _whitespace.sub(' ', text).strip().casefold()
+
+
+def _search_url(text):
+    return reverse('nbtelog:search') + '?' + urlencode({'q': text})
+
+
+def _news_entry(news_id, title, slug):
+    return ('news', news_id), 'News', title, [title], ('news', slug)
+
+
+def _institution_entry(institution_id, name, code, website):
+    url = ('href', website) if website else ('search', code)
+    return ('institution', institution_id), 'Institution', f"{name} ({code})", [name, code], url
+
+
+def _program_entry(program_id, name):
+    return ('program', program_id), 'Program', name, [name], ('search', name)
+
+
+class SuggestionIndex:
+    """Sorted array of normalized completion keys for the search box.
+
+    Each label is indexed from its start and from each of its first few
+    words, so "poly" completes "Federal Polytechnic". A lookup is a binary
+    search followed by a short scan over the keys sharing the prefix.
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._entries = {}
+        self._keys_for = {}
+        self._lock = threading.Lock()
+        self.built_at = None
+
+    def build(self):
+        entries = [
+            _news_entry(*row)
+            for row in News.objects.filter(status='published').values_list('id', 'title', 'slug')
+        ]
+        entries += [
+            _institution_entry(*row)
+            for row in Institution.objects.values_list('id', 'name', 'code', 'website')
+        ]
+        entries += [_program_entry(*row) for row in Program.objects.values_list('id', 'name')]
+
+        keys, entry_map, keys_for = [], {}, {}
+        for ref, kind, label, texts, url in entries:
+            entry_map[ref] = (kind, label, url)
+            keys_for[ref] = self._keys_of(ref, texts)
+            keys.extend(keys_for[ref])
+        keys.sort()
+
+        with self._lock:
+            self._keys, self._entries, self._keys_for = keys, entry_map, keys_for
+            self.built_at = time.monotonic()
+        logger.info(f"Built search suggestions over {len(entry_map)} entries")
+
+    @staticmethod
+    def _keys_of(ref, texts):
+        keys = []
+        for text in texts:
+            words = normalize(text).split(' ')
+            for position in range(min(len(words), MAX_WORD_STARTS)):
+                key = ' '.join(words[position:])
+                if key:
+                    # Completions of the whole label sort before inner words
+                    keys.append((key, 0 if position == 0 else 1, ref))
+        return keys
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > MAX_AGE
+
+    def update(self, ref, kind=None, label=None, texts=(), url=None):
+        """Replace the keys of ``ref``; with no ``kind`` the entry is removed."""
+        with self._lock:
+            for key in self._keys_for.pop(ref, []):
+                position = bisect.bisect_left(self._keys, key)
+                if position < len(self._keys) and self._keys[position] == key:
+                    del self._keys[position]
+            self._entries.pop(ref, None)
+
+            if kind is not None:
+                self._entries[ref] = (kind, label, url)
+                self._keys_for[ref] = self._keys_of(ref, texts)
+                for key in self._keys_for[ref]:
+                    bisect.insort(self._keys, key)
+
+    def lookup(self, query, limit=DEFAULT_LIMIT):
+        prefix = normalize(query)
+        if len(prefix) < MIN_QUERY_LENGTH:
+            return []
+
+        with self._lock:
+            position = bisect.bisect_left(self._keys, (prefix,))
+            matches = []
+            # Look a little past the limit so whole-label completions can be
+            # preferred over inner-word ones
+            while position < len(self._keys) and len(matches) < limit * 4:
+                key, rank, ref = self._keys[position]
+                if not key.startswith(prefix):
+                    break
+                matches.append((rank, key, ref))
+                position += 1
+            entries = self._entries
+
+            seen, results = set(), []
+            for rank, key, ref in sorted(matches):
+                kind, label, url = entries[ref]
+                if (kind, label) in seen:
+                    continue
+                seen.add((kind, label))
+                results.append((kind, label, url))
+                if len(results) >= limit:
+                    break
+
+        return [{'label': label, 'type': kind, 'url': _resolve(url)} for kind, label, url in results]
+
+
+def _resolve(url):
+    how, value = url
+    if how == 'news':
+        return reverse('nbtelog:news_detail', args=[value])
+    if how == 'search':
+        return _search_url(value)
+    return value
+
+
+index = SuggestionIndex()
+_build_lock = threading.Lock()
+_refresher = None
+_refresher_lock = threading.Lock()
+
+
+def _rebuild():
+    with _build_lock:
+        try:
+            index.build()
+        except Exception as e:
+            logger.error(f"Could not rebuild search suggestions: {e}", exc_info=True)
+        finally:
+            connection.close()
+
+
+def _refresh_forever():
+    while True:
+        if index.is_stale():
+            _rebuild()
+        age = time.monotonic() - index.built_at if index.built_at is not None else 0
+        time.sleep(max(MAX_AGE - age, 1))
+
+
+def start_refresher():
+    """Start the one background thread of this worker that keeps the index fresh.
+
+    It builds the index straight away if nothing has yet, then rebuilds it
+    every MAX_AGE seconds. Calling it again does nothing.
+    """
+    global _refresher
+    with _refresher_lock:
+        if _refresher is None:
+            _refresher = threading.Thread(target=_refresh_forever, name='suggest-refresher', daemon=True)
+            _refresher.start()
+
+
+def suggest(query, limit=DEFAULT_LIMIT):
+    if index.built_at is None:
+        # Normally built by the refresher when the worker starts; a request
+        # that comes first builds it itself
+        with _build_lock:
+            if index.built_at is None:
+                index.build()
+    if _refresher is None:
+        start_refresher()
+    return index.lookup(query, limit)
+
+
+def object_changed(obj, deleted=False):
+    """Refresh the suggestions for a saved or deleted model instance."""
+    if index.built_at is None:
+        return
+
+    if isinstance(obj, News):
+        ref = ('news', obj.pk)
+        if deleted or obj.status != 'published':
+            index.update(ref)
+        else:
+            index.update(*_news_entry(obj.pk, obj.title, obj.slug))
+    elif isinstance(obj, Institution):
+        ref = ('institution', obj.pk)
+        if deleted:
+            index.update(ref)
+        else:
+            index.update(*_institution_entry(obj.pk, obj.name, obj.code, obj.website))
+    elif isinstance(obj, Program):
+        ref = ('program', obj.pk)
+        if deleted:
+            index.update(ref)
+        else:
+            index.update(*_program_entry(obj.pk, obj.name))
@@ -1,3 +1,1313 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import gzip
+import hashlib
+import io
+import random
+import shutil
+import string
+import tempfile
+import threading
+import zipfile
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from benchmarks.chatbot_keywords import loop_best_match
+
+from . import (
+    api, chatbot, documents, home, images, metrics, page_cache, register, related, scoring, search_index,
+    static_assets, stats, suggest, views,
+)
+from .keywords import KeywordMatcher, split_keywords
+from .middleware import MetricsMiddleware
+from .management.commands import bulk_import_documents
+from .models import (
+    ChatBot, Document, Institution, News, Program, RelatedNews, SearchDocument, SliderImage, StatisticCount,
+)
+from .pagination import decode_cursor, encode_cursor, keyset_paginate
+from .serving import DownloadCounter, if_range_matches, parse_range
+
+# Pages are rendered without running collectstatic, which the manifest
+# storage needs
+plain_static = override_settings(STORAGES={
+    **settings.STORAGES,
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+})
+
+
+def make_institution(code, **fields):
+    defaults = {
+        'name': f"Polytechnic {code}",
+        'address': "1 Campus Road",
+        'contact_email': f"registrar@{code.lower()}.example.edu.ng",
+        'contact_phone': '08030000000',
+        'established_date': datetime.date(1990, 1, 1),
+        'accreditation_status': 'Accredited',
+    }
+    return Institution.objects.create(code=code, **{**defaults, **fields})
+
+
+def make_program(institution, code, **fields):
+    defaults = {
+        'name': f"Program {code}",
+        'description': "A program.",
+        'duration': '2 years',
+        'qualification_type': 'ND',
+        'accreditation_status': 'Accredited',
+    }
+    return Program.objects.create(institution=institution, code=code, **{**defaults, **fields})
+
+
+def make_news(slug, **fields):
+    author, _ = User.objects.get_or_create(username='author')
+    defaults = {
+        'title': slug.replace('-', ' ').title(),
+        'content': "Some news.",
+        'author': author,
+        'status': 'published',
+    }
+    return News.objects.create(slug=slug, **{**defaults, **fields})
+
+
+class StatisticsTests(TestCase):
+    def counts(self):
+        """The stored counts apart from the revision, leaving out zeros."""
+        return {
+            (dimension, key): count
+            for dimension, key, count in StatisticCount.objects.exclude(dimension=stats.REVISION)
+            .values_list('dimension', 'key', 'count')
+            if count
+        }
+
+    def assertMatchesRecompute(self):
+        incremental = self.counts()
+        stats.recompute()
+        self.assertEqual(incremental, self.counts())
+
+    def test_signals_match_recompute(self):
+        first = make_institution('AAA', last_audit_date=datetime.date(2021, 5, 1))
+        second = make_institution('BBB', accreditation_status='Interim')
+        program = make_program(first, 'P1')
+        make_program(first, 'P2', qualification_type='HND')
+        make_program(second, 'P3', accreditation_status='Denied')
+        self.assertMatchesRecompute()
+
+        program.accreditation_status = 'Expired'
+        program.institution = second
+        program.save()
+        first.last_audit_date = None
+        first.save()
+        second.accreditation_status = 'Accredited'
+        second.save()
+        self.assertMatchesRecompute()
+
+    def test_cascade_delete_matches_recompute(self):
+        first = make_institution('AAA')
+        second = make_institution('BBB')
+        for i in range(3):
+            make_program(first, f'A{i}')
+        make_program(second, 'B0', qualification_type='HND')
+        stats.recompute()
+
+        pk = first.pk
+        first.delete()
+        self.assertEqual(self.counts()[(stats.TOTAL, 'programs')], 1)
+        self.assertNotIn((stats.PROGRAMS_BY_INSTITUTION, str(pk)), self.counts())
+        self.assertMatchesRecompute()
+
+    def test_apply_bumps_revision_only_on_change(self):
+        institution = make_institution('AAA')
+        revision = stats.version()
+        institution.name = "Renamed"
+        institution.save()
+        self.assertEqual(stats.version(), revision)
+        institution.accreditation_status = 'Interim'
+        institution.save()
+        self.assertEqual(stats.version(), revision + 1)
+
+
+class MetricsMiddlewareTests(TestCase):
+    def requests_recorded(self, view):
+        rows = metrics.registry.snapshot()['counters']['nbtelog_http_requests_total']
+        return sum(row[-1] for row in rows if row[0] == view)
+
+    def test_follows_the_mode_of_the_chain(self):
+        async def async_view(request):
+            return HttpResponse()
+
+        self.assertFalse(iscoroutinefunction(MetricsMiddleware(lambda request: HttpResponse())))
+        self.assertTrue(iscoroutinefunction(MetricsMiddleware(async_view)))
+
+    def test_exit_flush_registered_once(self):
+        with mock.patch.object(metrics, 'registry', metrics.Registry()), \
+                mock.patch.object(metrics.atexit, 'register') as register:
+            for _ in range(3):
+                MetricsMiddleware(lambda request: HttpResponse())
+        register.assert_called_once()
+
+    @override_settings(MIDDLEWARE=[
+        path for path in settings.MIDDLEWARE if path != 'whitenoise.middleware.WhiteNoiseMiddleware'
+    ])
+    async def test_async_requests_are_recorded(self):
+        before = self.requests_recorded('nbtelog:api_statistics')
+        response = await self.async_client.get('/api/statistics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.requests_recorded('nbtelog:api_statistics'), before + 1)
+
+
+class KeywordMatcherTests(TestCase):
+    def test_whole_words_only(self):
+        matcher = KeywordMatcher(['art', 'start up', 'fees, school fees'])
+        self.assertEqual(matcher.matches("Art history"), {0: ['art']})
+        self.assertEqual(matcher.matches("where do I start?"), {})
+        self.assertEqual(matcher.matches("how to start up"), {1: ['start up']})
+        self.assertEqual(matcher.matches("art_class smart"), {})
+        self.assertEqual(matcher.matches("School-fees, please!"), {2: ['fees', 'school fees']})
+        self.assertIsNone(matcher.best_match("nothing relevant"))
+
+    def test_overlapping_keywords(self):
+        matcher = KeywordMatcher(['national diploma', 'higher national diploma, diploma'])
+        self.assertEqual(matcher.find("higher national diploma"), {0, 1, 2})
+        self.assertEqual(matcher.best_match("higher national diploma"), 1)
+        self.assertEqual(matcher.best_match("national diploma"), 0)
+
+    def test_agrees_with_the_old_loop_on_whole_words(self):
+        rng = random.Random(0)
+        # Words of one length never contain each other, so the old substring
+        # loop and the word-boundary matcher must agree
+        vocabulary = sorted({''.join(rng.choices(string.ascii_lowercase, k=5)) for _ in range(300)})
+        fields = [
+            ', '.join({' '.join(rng.choices(vocabulary, k=rng.randint(1, 2))) for _ in range(rng.randint(1, 4))})
+            for _ in range(200)
+        ]
+        matcher = KeywordMatcher(fields)
+        keywords_list = [split_keywords(field) for field in fields]
+        for _ in range(300):
+            message = ' '.join(rng.choices(vocabulary, k=rng.randint(1, 30)))
+            self.assertEqual(matcher.best_match(message), loop_best_match(keywords_list, message), message)
+
+
+class ScoringTests(SimpleTestCase):
+    def setUp(self):
+        rng = random.Random(0)
+        vocabulary = sorted({''.join(rng.choices(string.ascii_lowercase, k=5)) for _ in range(200)})
+        self.documents = [' '.join(rng.choices(vocabulary, k=rng.randint(3, 12))) for _ in range(80)]
+        # Some words no document has seen
+        self.messages = [
+            ' '.join(rng.choices(vocabulary + ['unseen', 'words'], k=rng.randint(1, 10))) for _ in range(300)
+        ]
+
+    def dense(self, scorer):
+        matrix = np.zeros((len(self.messages), len(self.documents)))
+        for row, (indices, values) in enumerate(scorer.scores(self.messages)):
+            matrix[row, indices] = values
+        return matrix
+
+    def test_backends_agree(self):
+        lean = self.dense(scoring.TfidfScorer(self.documents))
+        fitted = self.dense(scoring.SklearnScorer(self.documents))
+        np.testing.assert_allclose(lean, fitted, atol=1e-12)
+
+    def test_approximates_refitting_with_the_message(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.metrics.pairwise import cosine_similarity
+
+        scores = self.dense(scoring.TfidfScorer(self.documents))
+        same_best = 0
+        for row, message in enumerate(self.messages):
+            vectors = TfidfVectorizer().fit_transform(self.documents + [message])
+            refitted = cosine_similarity(vectors[-1], vectors[:-1]).ravel()
+            np.testing.assert_allclose(scores[row], refitted, atol=0.05)
+            same_best += np.argmax(scores[row]) == np.argmax(refitted)
+        self.assertGreaterEqual(same_best, 0.9 * len(self.messages))
+
+
+class ChatBotIndexTests(TestCase):
+    def setUp(self):
+        chatbot.invalidate()
+        self.addCleanup(chatbot.invalidate)
+        make_chatbot("How do I apply for admission?")
+        make_chatbot("Which programs are accredited?")
+
+    def test_rebuilt_when_the_version_stamp_changes(self):
+        index = chatbot.get_index()
+        self.assertIs(chatbot.get_index(), index)
+        self.assertEqual(len(index), 2)
+
+        # A queryset update sends no signals, like a change saved by another worker
+        ChatBot.objects.filter(question__startswith="Which").update(
+            is_active=False, updated_at=timezone.now() + datetime.timedelta(seconds=1),
+        )
+        rebuilt = chatbot.get_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(len(rebuilt), 1)
+        self.assertIs(chatbot.get_index(), rebuilt)
+
+
+class ChatBatchTests(TestCase):
+    def setUp(self):
+        chatbot.invalidate()
+        self.addCleanup(chatbot.invalidate)
+        make_chatbot("How do I apply for admission?", keywords='apply, admission')
+        make_chatbot("Which programs are accredited?", keywords='accredited')
+        make_chatbot("What are the school fees?", keywords='fees, tuition')
+
+    def post(self, payload):
+        return self.client.post(reverse('nbtelog:chat_batch'), payload, content_type='application/json')
+
+    def test_answers_each_message_like_chat(self):
+        messages = ["How do I APPLY for admission", "tuition please", "something else entirely"]
+        response = self.post({'messages': messages, 'k': 2})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        index = chatbot.get_index()
+        for message, result in zip(messages, results):
+            response, confidence = index.answer(message.lower())
+            self.assertEqual(result['response'], response)
+            self.assertAlmostEqual(result['confidence'], confidence)
+            self.assertLessEqual(len(result['candidates']), 2)
+            scores = [candidate['score'] for candidate in result['candidates']]
+            self.assertEqual(scores, sorted(scores, reverse=True))
+
+        # Keyword hits are listed even without any similarity
+        self.assertEqual(results[1]['candidates'][0]['question'], "What are the school fees?")
+        self.assertEqual(results[1]['candidates'][0]['keywords'], ['tuition'])
+        self.assertEqual(results[2]['candidates'], [])
+
+    def test_k_is_clamped(self):
+        results = self.post({'messages': ["are programs accredited for admission"], 'k': 0}).json()['results']
+        self.assertEqual(len(results[0]['candidates']), 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get(reverse('nbtelog:chat_batch')).status_code, 405)
+        self.assertEqual(self.post({'messages': "not a list"}).status_code, 400)
+        self.assertEqual(self.post({'messages': [1, 2]}).status_code, 400)
+        self.assertEqual(self.post({'messages': ["hi"], 'k': 'many'}).status_code, 400)
+        with mock.patch.object(chatbot, 'MAX_BATCH_MESSAGES', 2):
+            self.assertEqual(self.post({'messages': ["a", "b", "c"]}).status_code, 400)
+
+
+class ResponseCacheTests(TestCase):
+    def test_lru_and_ttl(self):
+        responses = chatbot.ResponseCache(maxsize=2, ttl=10)
+        with mock.patch.object(chatbot.time, 'monotonic', return_value=100.0) as clock:
+            responses.set('a', 1)
+            responses.set('b', 2)
+            self.assertEqual(responses.get('a'), 1)
+            responses.set('c', 3)
+            # 'b' was the least recently used
+            self.assertIsNone(responses.get('b'))
+            self.assertEqual(responses.get('c'), 3)
+
+            clock.return_value = 111.0
+            self.assertIsNone(responses.get('a'))
+        self.assertEqual(responses.stats(), {
+            'size': 1, 'maxsize': 2, 'ttl': 10, 'hits': 2, 'misses': 2, 'evictions': 1, 'hit_ratio': 0.5,
+        })
+
+    def test_disabled_with_zero_size(self):
+        responses = chatbot.ResponseCache(maxsize=0)
+        responses.set('a', 1)
+        self.assertIsNone(responses.get('a'))
+
+    def test_answers_are_cached_until_the_table_changes(self):
+        chatbot.invalidate()
+        self.addCleanup(chatbot.invalidate)
+        entry = make_chatbot("How do I apply for admission?")
+        index = chatbot.get_index()
+        with mock.patch.object(index, 'answer', wraps=index.answer) as answer:
+            first = chatbot.answer(index, "How do I apply for admission?")
+            # Normalized to the same key
+            self.assertEqual(chatbot.answer(index, "how do i apply for  admission"), first)
+            self.assertEqual(answer.call_count, 1)
+        self.assertEqual(first[0], entry.answer)
+
+        entry.answer = "Apply online."
+        entry.save()
+        index = chatbot.get_index()
+        self.assertEqual(chatbot.answer(index, "How do I apply for admission?")[0], "Apply online.")
+
+
+class ChatSheddingTests(TestCase):
+    async def test_pool_refuses_past_max_pending(self):
+        pool = chatbot.ScoringPool(workers=1, max_pending=1)
+        self.addCleanup(pool.executor.shutdown)
+        release = threading.Event()
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0)
+        with self.assertRaises(chatbot.ChatBotBusy):
+            await pool.run(int, '1')
+        release.set()
+        self.assertTrue(await running)
+        # The slot is free again
+        self.assertEqual(await pool.run(int, '1'), 1)
+
+    async def test_chat_returns_503_when_busy(self):
+        chatbot.invalidate()
+        self.addCleanup(chatbot.invalidate)
+        await ChatBot.objects.acreate(question="How do I apply?", answer="Online.", category='general', keywords='')
+        full = chatbot.ScoringPool(workers=1, max_pending=0)
+        self.addCleanup(full.executor.shutdown)
+        with mock.patch.object(chatbot, 'scoring_pool', full):
+            response = await self.async_client.post(
+                reverse('nbtelog:chat'), {'message': "how do I apply?"}, content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response.json()['error'], 'busy')
+
+
+class KeysetPaginationTests(TestCase):
+    ordering = ['-created_at', '-id']
+
+    @classmethod
+    def setUpTestData(cls):
+        # Ten articles sharing three timestamps, so most neighbours tie on created_at
+        moments = [datetime.datetime(2024, 1, day, tzinfo=datetime.timezone.utc) for day in (1, 2, 3)]
+        for i in range(10):
+            news = make_news(f'news-{i}')
+            News.objects.filter(pk=news.pk).update(created_at=moments[i % 3])
+        cls.expected = list(News.objects.order_by(*cls.ordering).values_list('pk', flat=True))
+
+    def page(self, per_page=3, **cursor):
+        return keyset_paginate(News.objects.all(), self.ordering, per_page, **cursor)
+
+    def test_pages_forward_through_ties(self):
+        seen, page = [], self.page()
+        self.assertFalse(page.has_previous)
+        while True:
+            seen += [news.pk for news in page]
+            if not page.has_next:
+                break
+            page = self.page(after=page.next_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_pages_backward_through_ties(self):
+        pages = [self.page()]
+        while pages[-1].has_next:
+            pages.append(self.page(after=pages[-1].next_cursor))
+        page, seen = pages[-1], []
+        while True:
+            seen = [news.pk for news in page] + seen
+            if not page.has_previous:
+                break
+            page = self.page(before=page.previous_cursor)
+        self.assertEqual(seen, self.expected)
+
+    def test_values_querysets(self):
+        queryset = News.objects.values('pk', 'created_at', 'id')
+        page = keyset_paginate(queryset, self.ordering, 4)
+        page = keyset_paginate(queryset, self.ordering, 4, after=page.next_cursor)
+        self.assertEqual([row['pk'] for row in page], self.expected[4:8])
+
+    def test_tampered_cursors_start_from_the_top(self):
+        valid = self.page().next_cursor
+        tampered = [
+            'not a cursor',
+            valid[:-3],
+            encode_cursor(['2024-01-01']),
+            encode_cursor(['yesterday', '1']),
+            encode_cursor(['2024-01-01 00:00:00+00:00', 'x']),
+        ]
+        first = [news.pk for news in self.page()]
+        for cursor in tampered:
+            with self.subTest(cursor=cursor):
+                self.assertIsNone(decode_cursor(cursor, News, ['created_at', 'id']))
+                self.assertEqual([news.pk for news in self.page(after=cursor)], first)
+                self.assertEqual([news.pk for news in self.page(before=cursor)], first)
+
+    @plain_static
+    def test_news_list_ignores_a_bad_cursor(self):
+        response = self.client.get('/news/', {'after': 'garbage'})
+        self.assertEqual(response.status_code, 200)
+
+
+class RelatedNewsTests(TestCase):
+    TOPICS = {
+        'accreditation': "accreditation visit panel programme resources report",
+        'admission': "admission portal screening candidates cutoff list",
+    }
+
+    # Titles weigh more than the body in the index, so none of them share a word
+    TITLES = ['Alpha', 'Bravo', 'Charlie', 'Delta', 'Echo', 'Foxtrot']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.articles = {
+            topic: [
+                make_news(f'{topic}-{i}', title=cls.TITLES[3 * n + i], content=words)
+                for i in range(3)
+            ]
+            for n, (topic, words) in enumerate(cls.TOPICS.items())
+        }
+
+    def links(self, news):
+        return {link.related_id: link.score for link in RelatedNews.objects.filter(news=news)}
+
+    def assertMatchesRebuild(self, news):
+        incremental = self.links(news)
+        related.rebuild()
+        rebuilt = self.links(news)
+        self.assertEqual(set(incremental), set(rebuilt))
+        for pk, score in rebuilt.items():
+            self.assertAlmostEqual(incremental[pk], score)
+
+    def test_publish(self):
+        news = make_news('new-accreditation', title='India', content=self.TOPICS['accreditation'])
+        found = related.related_for(news, limit=5)
+        self.assertEqual({article.pk for article in found[:3]}, {a.pk for a in self.articles['accreditation']})
+        for article in self.articles['accreditation']:
+            self.assertIn(news, related.related_for(article, limit=5))
+        self.assertMatchesRebuild(news)
+
+    def test_edit_moves_the_article_to_its_new_topic(self):
+        news = self.articles['accreditation'][0]
+        news.content = self.TOPICS['admission']
+        news.save()
+        found = related.related_for(news, limit=5)
+        self.assertEqual({article.pk for article in found[:3]}, {a.pk for a in self.articles['admission']})
+        self.assertMatchesRebuild(news)
+
+    def test_unpublish_removes_links_both_ways(self):
+        news = self.articles['admission'][0]
+        news.status = 'draft'
+        news.save()
+        self.assertFalse(RelatedNews.objects.filter(news=news).exists())
+        self.assertFalse(RelatedNews.objects.filter(related=news).exists())
+        for article in self.articles['admission'][1:]:
+            self.assertNotIn(news, related.related_for(article, limit=5))
+
+
+class RangeParsingTests(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertIsNone(parse_range('', 100))
+        self.assertIsNone(parse_range('bytes=0-9,20-29', 100))
+        self.assertIsNone(parse_range('items=0-9', 100))
+        self.assertIsNone(parse_range('bytes=-', 100))
+        self.assertEqual(parse_range('bytes=0-9', 100), (0, 9))
+        self.assertEqual(parse_range('bytes = 10-', 100), (10, 99))
+        self.assertEqual(parse_range('bytes=90-200', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-10', 100), (90, 99))
+        self.assertEqual(parse_range('bytes=-200', 100), (0, 99))
+        for header in ('bytes=100-', 'bytes=50-10', 'bytes=-0'):
+            with self.subTest(header=header), self.assertRaises(ValueError):
+                parse_range(header, 100)
+        for header in ('bytes=0-', 'bytes=0-0', 'bytes=-1'):
+            with self.subTest(header=header, size=0), self.assertRaises(ValueError):
+                parse_range(header, 0)
+
+    def test_if_range_matches(self):
+        self.assertTrue(if_range_matches('', '"abc"'))
+        self.assertTrue(if_range_matches('"abc"', '"abc"'))
+        self.assertFalse(if_range_matches('"abd"', '"abc"'))
+        self.assertFalse(if_range_matches('W/"abc"', '"abc"'))
+        self.assertFalse(if_range_matches('Wed, 21 Oct 2015 07:28:00 GMT', '"abc"'))
+        self.assertFalse(if_range_matches('"abc"', None))
+
+
+class DownloadCounterTests(SimpleTestCase):
+    def test_pending_counts_are_flushed_by_a_timer(self):
+        model = mock.Mock()
+        flushed = threading.Event()
+        model.objects.filter.return_value.update.side_effect = lambda **kwargs: flushed.set()
+        counter = DownloadCounter(model, interval=0.01)
+        counter.add(7)
+        counter.add(7)
+        self.assertTrue(flushed.wait(5))
+        model.objects.filter.assert_called_once_with(pk=7)
+        self.assertEqual(model.objects.filter.return_value.update.call_args.kwargs['download_count'].rhs.value, 2)
+
+
+class DocumentDownloadTests(TestCase):
+    data = b'0123456789' * 10
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media = override_settings(MEDIA_ROOT=cls.media_root, DOCUMENT_SERVE_MODE='django')
+        cls.media.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media.disable()
+        shutil.rmtree(cls.media_root)
+
+    def setUp(self):
+        self.document = Document.objects.create(title="Guidelines", file=ContentFile(self.data, name='guidelines.txt'))
+        self.document.refresh_from_db()
+        self.url = reverse('nbtelog:document_download', args=[self.document.pk])
+
+    def tearDown(self):
+        # Write what the requests counted while the test database still exists
+        views.download_counts.flush()
+
+    def get(self, **headers):
+        response = self.client.get(self.url, headers=headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_download_counts(self):
+        self.get()
+        self.get(range='bytes=0-9')
+        self.get(range='bytes=10-19')
+        views.download_counts.flush()
+        self.document.refresh_from_db()
+        self.assertEqual(self.document.download_count, 2)
+
+    def test_whole_file(self):
+        response, body = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.data)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertEqual(response['ETag'], f'"{self.document.checksum[:32]}"')
+
+    def test_partial_content(self):
+        response, body = self.get(range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(body, self.data[10:20])
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(response['Content-Length'], '10')
+
+    def test_unsatisfiable_range(self):
+        response, _ = self.get(range='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_empty_file(self):
+        empty = Document.objects.create(title="Empty", file=ContentFile(b'', name='empty.txt'))
+        self.url = reverse('nbtelog:document_download', args=[empty.pk])
+        response, _ = self.get(range='bytes=-10')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */0')
+        response, body = self.get()
+        self.assertEqual((response.status_code, body), (200, b''))
+
+    def test_if_none_match(self):
+        response, body = self.get(if_none_match=f'"{self.document.checksum[:32]}"')
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(body, b'')
+
+    def test_stale_if_range_sends_the_whole_file(self):
+        response, body = self.get(range='bytes=10-19', if_range='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.data)
+        response, body = self.get(range='bytes=10-19', if_range=response['ETag'])
+        self.assertEqual(response.status_code, 206)
+
+
+class RegisterImportTests(TestCase):
+    def import_csv(self, text, **options):
+        return register.import_register(io.BytesIO(text.encode()), 'register.csv', **options)
+
+    def test_institutions_upsert(self):
+        make_institution('FPN', name="Old name")
+        result = self.import_csv(
+            "Code,Name,Address,Contact Email,Contact Phone,Website,Established Date,"
+            "Accreditation Status,Last Audit Date\n"
+            "FPN,Federal Polytechnic Nekede,Owerri,info@fpn.edu.ng,0803,,1978-01-01,Accredited,2023-06-01\n"
+            "YCT,Yaba College of Technology,Lagos,info@yct.edu.ng,0804,,1947-01-01,Interim,\n"
+            "BAD,Broken Row,Nowhere,not-an-email,0805,,someday,Accredited,\n"
+            "\n"
+            "YCT,Yaba College of Technology,Yaba,info@yct.edu.ng,0804,,1947-01-01,Accredited,\n"
+        )
+        self.assertEqual(result.kind, 'institutions')
+        self.assertEqual((result.rows, result.saved), (4, 2))
+        self.assertEqual([number for number, _ in result.errors], [4])
+        self.assertIn('contact_email', result.errors[0][1])
+        self.assertIn('established_date', result.errors[0][1])
+
+        self.assertEqual(Institution.objects.count(), 2)
+        self.assertEqual(Institution.objects.get(code='FPN').name, "Federal Polytechnic Nekede")
+        # The later row for the same code wins
+        self.assertEqual(Institution.objects.get(code='YCT').address, "Yaba")
+        summary = stats.summary()
+        self.assertEqual(summary['institutions'], 2)
+        self.assertEqual(summary['institutions_by_status'], [{'status': 'Accredited', 'count': 2}])
+
+    def test_programs_upsert(self):
+        institution = make_institution('FPN')
+        make_program(institution, 'CS', name="Old name")
+        result = self.import_csv(
+            "institution_code,code,name,description,duration,qualification_type,accreditation_status\n"
+            "FPN,CS,Computer Science,Software,2 years,ND,Accredited\n"
+            "FPN,EE,Electrical Engineering,Power,2 years,HND,Interim\n"
+            "XXX,ME,Mechanical Engineering,Machines,2 years,ND,Accredited\n"
+        )
+        self.assertEqual(result.kind, 'programs')
+        self.assertEqual(result.saved, 2)
+        self.assertEqual(result.errors, [(4, "institution_code: no institution with code 'XXX'")])
+        self.assertEqual(
+            dict(institution.programs.values_list('code', 'name')),
+            {'CS': "Computer Science", 'EE': "Electrical Engineering"},
+        )
+        self.assertEqual(stats.summary()['programs'], 2)
+
+    def test_dry_run_saves_nothing(self):
+        make_institution('FPN')
+        result = self.import_csv(
+            "institution_code,code,name,description,duration,qualification_type,accreditation_status\n"
+            "FPN,CS,Computer Science,Software,2 years,ND,Accredited\n",
+            dry_run=True,
+        )
+        self.assertEqual((result.rows, result.saved, result.errors), (1, 0, []))
+        self.assertFalse(Program.objects.exists())
+
+    def test_error_report(self):
+        result = register.ImportResult('institutions')
+        result.add_error(7, "code: This field cannot be blank.")
+        result.add_error(3, 'name: "quoted", with a comma')
+        result.errors.sort()
+        report = io.StringIO()
+        register.write_report(result, report)
+        self.assertEqual(
+            report.getvalue().splitlines(),
+            ['row,error', '3,"name: ""quoted"", with a comma"', '7,code: This field cannot be blank.'],
+        )
+
+    def test_unsupported_format(self):
+        with self.assertRaises(register.RegisterError):
+            register.import_register(io.BytesIO(b''), 'register.txt')
+
+    def test_backend_without_conflict_target(self):
+        # Like MySQL, which upserts through ON DUPLICATE KEY UPDATE
+        make_institution('FPN')
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                mock.patch.object(Program.objects, 'bulk_create', wraps=Program.objects.bulk_create) as bulk_create:
+            result = self.import_csv(
+                "institution_code,code,name,description,duration,qualification_type,accreditation_status\n"
+                "FPN,CS,Computer Science,Software,2 years,ND,Accredited\n"
+                "FPN,EE,Electrical Engineering,Power,2 years,HND,Interim\n"
+            )
+        self.assertEqual((result.saved, result.errors), (2, []))
+        self.assertEqual(Program.objects.count(), 2)
+        self.assertIsNone(bulk_create.call_args.kwargs['unique_fields'])
+
+
+class ReadOnlyApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        for code in ['A01', 'B02', 'C03']:
+            institution = make_institution(code)
+            make_program(institution, f"{code}-ND")
+        make_program(Institution.objects.get(code='B02'), 'B02-HND1', qualification_type='HND')
+        make_program(Institution.objects.get(code='B02'), 'B02-HND2', qualification_type='HND')
+
+    def get(self, url, **headers):
+        return self.client.get(url, headers=headers)
+
+    def codes(self, response):
+        return [item['code'] for item in response.json()['results']]
+
+    def test_not_modified(self):
+        response = self.get('/api/institutions/')
+        etag = response['ETag']
+        self.assertEqual(self.get('/api/institutions/', if_none_match=etag).status_code, 304)
+
+        make_institution('D04')
+        response = self.get('/api/institutions/', if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_cached_body_skips_the_page_query(self):
+        body = self.get('/api/institutions/').content
+        # Only the two register_version aggregates
+        with self.assertNumQueries(2):
+            self.assertEqual(self.get('/api/institutions/').content, body)
+
+    def test_unread_parameters_share_the_cache_entry(self):
+        first = self.get('/api/institutions/?limit=2')
+        second = self.get('/api/institutions/?utm_source=mail&limit=2')
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertNotIn('utm_source', second.json()['next'])
+
+    def test_next_and_previous_links(self):
+        page = self.get('/api/institutions/?limit=2&accreditation_status=Accredited').json()
+        self.assertEqual([item['code'] for item in page['results']], ['A01', 'B02'])
+        self.assertIsNone(page['previous'])
+        self.assertIn('accreditation_status=Accredited', page['next'])
+
+        response = self.get(page['next'])
+        self.assertEqual(self.codes(response), ['C03'])
+        self.assertIsNone(response.json()['next'])
+
+        response = self.get(response.json()['previous'])
+        self.assertEqual(self.codes(response), ['A01', 'B02'])
+
+    def test_qualification_type_filter(self):
+        results = self.get('/api/institutions/?qualification_type=HND').json()['results']
+        # Two HND programs must not list the institution twice
+        self.assertEqual([item['code'] for item in results], ['B02'])
+        self.assertEqual([program['code'] for program in results[0]['programs']], ['B02-HND1', 'B02-HND2'])
+
+        response = self.get('/api/programs/?qualification_type=HND')
+        self.assertEqual(self.codes(response), ['B02-HND1', 'B02-HND2'])
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(len(self.get('/api/programs/?limit=0').json()['results']), 1)
+        self.assertEqual(len(self.get('/api/programs/?limit=abc').json()['results']), 5)
+        with mock.patch.object(api, 'MAX_LIMIT', 2):
+            self.assertEqual(len(self.get('/api/programs/?limit=1000').json()['results']), 2)
+
+
+class RegisterExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        institution = make_institution('FPN')
+        make_program(institution, 'CS', name="Computer Science")
+        make_program(institution, 'EE', name="Electrical Engineering")
+
+    def get(self, **headers):
+        return self.client.get(reverse('nbtelog:api_export', args=['programs', 'csv']), headers=headers)
+
+    def test_streams_plain_and_gzip(self):
+        plain = self.get()
+        self.assertTrue(plain.streaming)
+        body = b''.join(plain.streaming_content)
+        self.assertEqual(body.decode().splitlines()[0].split(',')[:3], ['institution_code', 'code', 'name'])
+        self.assertEqual(len(body.decode().splitlines()), 3)
+
+        compressed = self.get(accept_encoding='gzip')
+        self.assertTrue(compressed.streaming)
+        self.assertEqual(compressed['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(b''.join(compressed.streaming_content)), body)
+        self.assertNotEqual(plain['ETag'], compressed['ETag'])
+        self.assertNotIn('X-Accel-Buffering', compressed)
+
+    def test_not_modified_until_the_register_changes(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(if_none_match=etag).status_code, 304)
+        Program.objects.get(code='EE').delete()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(b''.join(response.streaming_content).decode().splitlines()), 2)
+
+
+@plain_static
+class HomeBlocksTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.news = make_news('first-story', title="First story")
+
+    def test_cached_until_the_rows_change(self):
+        self.assertEqual([item['title'] for item in home.blocks()['news']], ["First story"])
+        # Only the three version stamps are read while nothing changes
+        with self.assertNumQueries(3):
+            home.blocks()
+
+        # A change made by another worker reaches this one through the stamp
+        News.objects.filter(pk=self.news.pk).update(title="Edited story", updated_at=timezone.now())
+        self.assertEqual([item['title'] for item in home.blocks()['news']], ["Edited story"])
+
+        self.news.delete()
+        self.assertEqual(home.blocks()['news'], [])
+
+    def test_new_institution_shows_up(self):
+        self.assertEqual(home.blocks()['institutions'], [])
+        make_institution('FPN', name="Federal Polytechnic Nekede")
+        self.assertEqual(home.blocks()['institutions'], [{'name': "Federal Polytechnic Nekede"}])
+
+
+def make_chatbot(question, **fields):
+    defaults = {'answer': f"Answer to: {question}", 'category': 'general', 'keywords': ''}
+    return ChatBot.objects.create(question=question, **{**defaults, **fields})
+
+
+def make_docx(text):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as package:
+        package.writestr('word/document.xml', f'<w:document><w:p><w:t>{text}</w:t></w:p></w:document>')
+    return buffer.getvalue()
+
+
+class SyncDocumentMetadataTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        media = override_settings(MEDIA_ROOT=self.root)
+        media.enable()
+        self.addCleanup(media.disable)
+        self.kept = Document.objects.create(title="Kept", file=ContentFile(b'kept file', name='kept.txt'))
+        self.lost = Document.objects.create(title="Lost", file=ContentFile(b'lost file', name='lost.txt'))
+        Path(self.lost.file.path).unlink()
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        call_command('sync_document_metadata', *args, stdout=out)
+        return out.getvalue()
+
+    def test_reads_outdated_metadata_only(self):
+        Document.objects.update(metadata_from='', file_size=None, checksum='', file_exists=None)
+        output = self.run_command()
+        self.assertIn("Updated metadata of 2 documents.", output)
+        self.assertIn(f"Missing {self.lost.file.name}", output)
+
+        kept = Document.objects.get(pk=self.kept.pk)
+        self.assertEqual(kept.file_size, len(b'kept file'))
+        self.assertEqual(kept.checksum, hashlib.sha256(b'kept file').hexdigest())
+        self.assertEqual(kept.content_type, 'text/plain')
+        self.assertTrue(kept.file_exists)
+        self.assertIs(Document.objects.get(pk=self.lost.pk).file_exists, False)
+
+        self.assertIn("Updated metadata of 0 documents.", self.run_command())
+        self.assertIn("Updated metadata of 2 documents.", self.run_command('--force'))
+
+    def test_verify(self):
+        # Saved before the file was removed, so still marked as present
+        self.assertTrue(Document.objects.get(pk=self.lost.pk).file_exists)
+        storage = Document._meta.get_field('file').storage
+        with mock.patch.object(storage, 'listdir', wraps=storage.listdir) as listdir:
+            output = self.run_command('--verify')
+        listdir.assert_called_once_with('documents')
+        self.assertIn("Checked 2 documents: 1 missing, 1 updated.", output)
+        self.assertIs(Document.objects.get(pk=self.lost.pk).file_exists, False)
+        self.assertTrue(Document.objects.get(pk=self.kept.pk).file_exists)
+
+
+class BulkImportDocumentsTests(TestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        self.source = self.root / 'incoming'
+        (self.source / 'policies').mkdir(parents=True)
+        (self.source / 'Accreditation_Guidelines.docx').write_bytes(make_docx("accreditation guidelines polytechnic"))
+        (self.source / 'policies' / 'outsourcing.txt').write_bytes(b'outsourcing policy')
+        (self.source / 'policies' / 'outsourcing-copy.txt').write_bytes(b'outsourcing policy')
+        media = override_settings(MEDIA_ROOT=str(self.root / 'media'))
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def run_command(self, *args):
+        out = io.StringIO()
+        call_command('bulk_import_documents', str(self.source), *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_creates_and_indexes_rows(self):
+        output = self.run_command('--workers', '2')
+        self.assertIn("Created 2 documents.", output)
+        self.assertIn("Skipped duplicate", output)
+
+        document = Document.objects.get(title="Accreditation Guidelines")
+        self.assertTrue(document.file_exists)
+        self.assertEqual(document.content_type, 'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+        self.assertEqual(document.text, "accreditation guidelines polytechnic")
+        self.assertTrue(document.file.storage.exists(document.file.name))
+        hits = search_index.search("guidelines", kinds=['document'])
+        self.assertEqual([object_id for _, object_id, _ in hits], [document.pk])
+
+    def test_skips_checksums_already_stored(self):
+        Document.objects.create(title="Existing", file=ContentFile(b'outsourcing policy', name='existing.txt'))
+        output = self.run_command()
+        self.assertIn("Created 1 documents.", output)
+        self.assertEqual(Document.objects.filter(checksum=Document.objects.get(title="Existing").checksum).count(), 1)
+
+    def test_resumes_from_the_journal(self):
+        read_metadata = documents.read_metadata
+
+        def failing(field_file):
+            if field_file.name.endswith('.docx'):
+                raise OSError("connection reset")
+            return read_metadata(field_file)
+
+        with mock.patch.object(documents, 'read_metadata', failing), self.assertRaisesMessage(CommandError, "1 files failed"):
+            self.run_command()
+        self.assertEqual(Document.objects.count(), 1)
+        journal = Path(f"{self.source.resolve()}.import.jsonl")
+        self.assertEqual(len(journal.read_text().splitlines()), 1)
+
+        output = self.run_command()
+        self.assertIn("3 files, 1 already uploaded, 2 to go.", output)
+        self.assertIn("Created 1 documents.", output)
+        self.assertEqual(Document.objects.count(), 2)
+        # Nothing left to do on a third run
+        self.assertIn("Created 0 documents.", self.run_command())
+
+
+class BulkImportDocumentsS3Tests(TestCase):
+    bucket = 'nbte-documents'
+
+    def setUp(self):
+        from moto import mock_aws
+
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        storage = override_settings(STORAGES={
+            **settings.STORAGES,
+            'default': {
+                'BACKEND': 'storages.backends.s3boto3.S3Boto3Storage',
+                'OPTIONS': {
+                    'bucket_name': self.bucket, 'region_name': 'us-east-1',
+                    'access_key': 'testing', 'secret_key': 'testing',
+                },
+            },
+        })
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.client = Document._meta.get_field('file').storage.connection.meta.client
+        self.client.create_bucket(Bucket=self.bucket)
+
+        root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, root)
+        # The journal is written next to the source directory
+        self.source = root / 'incoming'
+        self.source.mkdir()
+        (self.source / 'guidelines.docx').write_bytes(make_docx("programme guidelines"))
+
+    def test_uploads_through_the_transfer_manager(self):
+        transfer = mock.patch.object(
+            bulk_import_documents.Command, 's3_transfer', autospec=True,
+            side_effect=bulk_import_documents.Command.s3_transfer,
+        )
+        with transfer as s3_transfer:
+            call_command(
+                'bulk_import_documents', str(self.source), '--chunk-size', '5', '--part-threads', '2', stdout=io.StringIO(),
+            )
+        config = s3_transfer.call_args.args[1]
+        self.assertEqual((config['chunk_size'], config['part_threads']), (5, 2))
+
+        document = Document.objects.get()
+        stored = self.client.get_object(Bucket=self.bucket, Key=document.file.name)
+        self.assertEqual(stored['Body'].read(), (self.source / 'guidelines.docx').read_bytes())
+        self.assertEqual(stored['ContentType'], document.content_type)
+        self.assertEqual(document.text, "programme guidelines")
+
+
+def make_image(width, height, format='PNG'):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new('RGB', (width, height), (200, 30, 30)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class ImageVariantsTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        media = override_settings(MEDIA_ROOT=self.root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    def make_slide(self, data, name='slide.png'):
+        slide = SliderImage.objects.create(title="Slide", image=ContentFile(data, name=name))
+        slide.refresh_from_db()
+        return slide
+
+    def test_builds_resized_variants(self):
+        from PIL import Image
+
+        slide = self.make_slide(make_image(1000, 500))
+        variants = slide.image_variants
+        self.assertEqual(variants['source'], slide.image.name)
+        self.assertEqual((variants['width'], variants['height']), (1000, 500))
+        self.assertEqual([width for width, _ in variants['jpeg']], [480, 960, 1000])
+        self.assertEqual([width for width, _ in variants['webp']], [480, 960, 1000])
+        self.assertTrue(variants['placeholder'].startswith('data:image/webp;base64,'))
+
+        storage = slide.image.storage
+        with storage.open(variants['jpeg'][0][1]) as fileobj:
+            image = Image.open(fileobj)
+            self.assertEqual((image.format, image.size), ('JPEG', (480, 240)))
+        with storage.open(variants['webp'][1][1]) as fileobj:
+            image = Image.open(fileobj)
+            self.assertEqual((image.format, image.size), ('WEBP', (960, 480)))
+
+        picture = images.ResponsiveImage(slide.image, variants)
+        self.assertEqual(picture.src, storage.url(variants['jpeg'][1][1]))
+        self.assertIn(f"{storage.url(variants['webp'][0][1])} 480w", picture.webp_srcset)
+        self.assertEqual(images.ResponsiveImage(slide.image).src, slide.image.url)
+
+    def test_replacing_the_image_deletes_old_variants(self):
+        slide = self.make_slide(make_image(600, 300))
+        old = [name for _, name in slide.image_variants['jpeg'] + slide.image_variants['webp']]
+        updated_at = slide.updated_at
+
+        slide.image = ContentFile(make_image(300, 300), name='square.png')
+        slide.save()
+        slide.refresh_from_db()
+        self.assertEqual([width for width, _ in slide.image_variants['jpeg']], [300])
+        self.assertGreater(slide.updated_at, updated_at)
+        storage = slide.image.storage
+        self.assertFalse(any(storage.exists(name) for name in old))
+
+    def test_broken_upload_is_not_retried(self):
+        slide = self.make_slide(b'not an image', name='broken.png')
+        self.assertEqual(slide.image_variants, {'source': slide.image.name})
+        self.assertFalse(images.refresh_variants(slide, 'image', 'image_variants'))
+
+    def test_command_builds_missing_variants(self):
+        self.make_slide(make_image(200, 100))
+        SliderImage.objects.update(image_variants={})
+        out = io.StringIO()
+        call_command('build_image_variants', stdout=out)
+        self.assertIn("Built variants for 1 images.", out.getvalue())
+        self.assertEqual(SliderImage.objects.get().image_variants['width'], 200)
+
+        out = io.StringIO()
+        call_command('build_image_variants', stdout=out)
+        self.assertIn("Built variants for 0 images.", out.getvalue())
+
+
+class SearchIndexTests(TestCase):
+    def search(self, query, kinds=None):
+        return [(kind, object_id) for kind, object_id, _ in search_index.search(query, kinds)]
+
+    def test_ranking(self):
+        title = make_news('in-title', title="Accreditation results", content="The board met on Monday.")
+        body = make_news('in-body', title="Board meeting", content="The board discussed accreditation and budgets.")
+        repeated = make_news('repeated', title="Weekly notes", content="Accreditation, accreditation and more accreditation.")
+        make_news('unrelated', title="Sports day", content="Students ran races.")
+        self.assertEqual(self.search("accreditation"), [('news', title.pk), ('news', repeated.pk), ('news', body.pk)])
+        # A rarer term outweighs a common one
+        self.assertEqual(self.search("budgets board")[0], ('news', body.pk))
+        # Stems and prefixes of the last word match too
+        self.assertEqual(self.search("accredit")[0], ('news', title.pk))
+        self.assertEqual(self.search("budget")[0], ('news', body.pk))
+
+    def test_kinds(self):
+        institution = make_institution('FPN', name="Federal Polytechnic Nekede")
+        program = make_program(institution, 'CS', name="Computer Science", description="Taught at the polytechnic.")
+        make_news('polytechnic-news', title="Polytechnic news")
+        self.assertEqual(self.search("polytechnic", kinds=['institution', 'program']),
+                         [('institution', institution.pk), ('program', program.pk)])
+
+    def test_signals_keep_the_index_current(self):
+        news = make_news('story', title="Budget", content="Allocation for laboratories.")
+        self.assertEqual(self.search("laboratories"), [('news', news.pk)])
+
+        news.content = "Allocation for workshops."
+        news.save()
+        self.assertEqual(self.search("laboratories"), [])
+        self.assertEqual(self.search("workshops"), [('news', news.pk)])
+
+        news.status = 'draft'
+        news.save()
+        self.assertEqual(self.search("workshops"), [])
+
+        institution = make_institution('FPN', name="Federal Polytechnic Nekede")
+        self.assertEqual(self.search("nekede"), [('institution', institution.pk)])
+        institution.delete()
+        self.assertEqual(self.search("nekede"), [])
+
+    def test_rebuild_if_empty_checks_each_kind(self):
+        make_news('story', title="Budget")
+        make_institution('FPN', name="Federal Polytechnic Nekede")
+        SearchDocument.objects.filter(kind='institution').delete()
+
+        out = io.StringIO()
+        call_command('rebuild_search_index', '--if-empty', stdout=out)
+        self.assertIn("Indexed", out.getvalue())
+        self.assertFalse(search_index.is_empty('institution'))
+        self.assertEqual(len(self.search("nekede")), 1)
+
+        out = io.StringIO()
+        call_command('rebuild_search_index', '--if-empty', '--kind', 'news', '--kind', 'institution', stdout=out)
+        self.assertIn("skipping", out.getvalue())
+
+    def test_excerpt(self):
+        text = ' '.join(f"word{i}" for i in range(40)) + " <b>Programmes</b> & more " + ' '.join(f"tail{i}" for i in range(40))
+        excerpt = search_index.excerpt(text, "programme", words=10)
+        self.assertTrue(excerpt.startswith('… '))
+        self.assertTrue(excerpt.endswith(' …'))
+        self.assertIn('<mark>&lt;b&gt;Programmes&lt;/b&gt;</mark> &amp; more', excerpt)
+        self.assertEqual(len(excerpt.split()), 12)
+
+    def test_excerpt_without_a_match_starts_at_the_top(self):
+        self.assertEqual(search_index.excerpt("First words here.", "absent"), "First words here.")
+
+
+@plain_static
+class SearchViewTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        for i in range(views.SEARCH_RESULTS_PER_PAGE + 2):
+            make_news(f'story-{i}', title=f"Story {i}", content=f"Laboratory equipment report number {i}.")
+
+    def test_pages_and_highlights(self):
+        first = self.client.get(reverse('nbtelog:search'), {'q': "laboratory"})
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(len(first.context['results']), views.SEARCH_RESULTS_PER_PAGE)
+        self.assertEqual(first.context['page_obj'].paginator.count, views.SEARCH_RESULTS_PER_PAGE + 2)
+        self.assertIn('<mark>Laboratory</mark>', str(first.context['results'][0]['excerpt']))
+
+        second = self.client.get(reverse('nbtelog:search'), {'q': "laboratory", 'page': 2})
+        self.assertEqual(len(second.context['results']), 2)
+        titles = {result['title'] for result in first.context['results'] + second.context['results']}
+        self.assertEqual(len(titles), views.SEARCH_RESULTS_PER_PAGE + 2)
+
+    def test_out_of_range_page_shows_the_last(self):
+        response = self.client.get(reverse('nbtelog:search'), {'q': "laboratory", 'page': 99})
+        self.assertEqual(response.context['page_obj'].number, 2)
+
+
+class SuggestTests(TestCase):
+    def setUp(self):
+        # A fresh index per test, and no background refresher
+        patcher = mock.patch.multiple(suggest, index=suggest.SuggestionIndex(), _refresher=object())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        make_program(make_institution('FPN', name="Federal Polytechnic Nekede"), 'CS', name="Computer Science")
+        make_news('admission-list', title="Polytechnic admission list")
+        make_news('draft', title="Polytechnic draft", status='draft')
+
+    def labels(self, query, limit=suggest.DEFAULT_LIMIT):
+        return [item['label'] for item in suggest.suggest(query, limit)]
+
+    def test_lookup(self):
+        # Whole-label completions first, then inner words; drafts are left out
+        results = suggest.suggest("POLY ")
+        self.assertEqual([item['label'] for item in results], [
+            "Polytechnic admission list", "Federal Polytechnic Nekede (FPN)",
+        ])
+        self.assertEqual(results[0]['url'], reverse('nbtelog:news_detail', args=['admission-list']))
+        self.assertEqual(results[1]['url'], reverse('nbtelog:search') + '?q=FPN')
+        self.assertEqual(self.labels("fpn"), ["Federal Polytechnic Nekede (FPN)"])
+        self.assertEqual(self.labels("sci"), ["Computer Science"])
+        self.assertEqual(self.labels("poly", limit=1), ["Polytechnic admission list"])
+        self.assertEqual(self.labels("p"), [])
+
+    def test_follows_saves_and_deletes(self):
+        self.labels("poly")
+        program = make_program(Institution.objects.get(), 'PT', name="Polymer Technology")
+        self.assertIn("Polymer Technology", self.labels("polym"))
+        program.delete()
+        self.assertEqual(self.labels("polym"), [])
+        News.objects.get(slug='draft').delete()
+        news = News.objects.get(slug='admission-list')
+        news.status = 'draft'
+        news.save()
+        self.assertEqual(self.labels("poly"), ["Federal Polytechnic Nekede (FPN)"])
+
+    def test_view(self):
+        response = self.client.get(reverse('nbtelog:search_suggest'), {'q': "comp", 'limit': "many"})
+        self.assertEqual(response.json()['suggestions'][0]['label'], "Computer Science")
+
+    def test_one_refresher_per_worker(self):
+        with mock.patch.object(suggest, '_refresher', None), \
+                mock.patch.object(suggest.threading, 'Thread') as thread:
+            self.labels("poly")
+            suggest.index.built_at -= suggest.MAX_AGE + 1
+            self.labels("poly")
+            suggest.start_refresher()
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+
+
+class StaticAssetsTests(SimpleTestCase):
+    def setUp(self):
+        self.root = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.root)
+        for path in ['source/css/site.css', 'vendor/lib.js', 'templates/page.html']:
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_text('')
+        (self.root / 'templates' / 'page.html').write_text(
+            "{% load static %}<link href=\"{% static 'css/site.css' %}\">"
+            "{% if 'css/missing.css'|static_exists %}{% endif %}"
+        )
+        (self.root / 'collected').mkdir()
+        self.settings = override_settings(
+            STATIC_ROOT=str(self.root / 'collected'),
+            STATICFILES_DIRS=[str(self.root / 'source'), ('vendor', str(self.root / 'vendor'))],
+        )
+        self.settings.enable()
+        self.addCleanup(self.settings.disable)
+        self.assets = static_assets.StaticAssets()
+
+    @plain_static
+    def test_lists_what_collectstatic_would_collect(self):
+        self.assertTrue(self.assets.exists('css/site.css'))
+        self.assertTrue(self.assets.exists('vendor/lib.js'))
+        self.assertTrue(self.assets.exists('admin/css/base.css'))
+        self.assertFalse(self.assets.exists('css/missing.css'))
+        self.assertEqual(self.assets.url('css/site.css'), '/static/css/site.css')
+        self.assertEqual(self.assets.url('css/missing.css'), '')
+
+    def test_reads_the_manifest(self):
+        (self.root / 'collected' / 'staticfiles.json').write_text(
+            '{"version": "1.1", "paths": {"css/site.css": "css/site.0123abcd.css"}}'
+        )
+        self.assertEqual(self.assets.url('css/site.css'), '/static/css/site.0123abcd.css')
+        # Only what was collected counts
+        self.assertFalse(self.assets.exists('vendor/lib.js'))
+
+    @plain_static
+    def test_missing_references(self):
+        with override_settings(TEMPLATES=[{**settings.TEMPLATES[0], 'DIRS': [str(self.root / 'templates')]}]), \
+                mock.patch.object(static_assets, 'assets', self.assets):
+            missing = static_assets.missing_references()
+        self.assertIn(('page.html', 'css/missing.css'), missing)
+        self.assertNotIn(('page.html', 'css/site.css'), missing)
+
+
+class PageCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+        self.data = 1
+
+    def view(self, **options):
+        def page(request):
+            self.calls += 1
+            return HttpResponse(f"page {self.calls}: {request.GET.get('lang', '')}")
+        return page_cache.cache_page_for_build(page, **options)
+
+    def test_cached_body_and_not_modified(self):
+        view = self.view()
+        first = view(self.factory.get('/about/'))
+        self.assertEqual(first.content, b"page 1: ")
+        self.assertIn('public', first['Cache-Control'])
+
+        again = view(self.factory.get('/about/'))
+        self.assertEqual((again.content, again['ETag']), (b"page 1: ", first['ETag']))
+
+        not_modified = view(self.factory.get('/about/', headers={'if-none-match': first['ETag']}))
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(self.calls, 1)
+
+    def test_unread_query_parameters_share_one_entry(self):
+        view = self.view()
+        etags = {view(self.factory.get('/about/', {'utm_source': str(i)}))['ETag'] for i in range(5)}
+        self.assertEqual(len(etags), 1)
+        self.assertEqual(self.calls, 1)
+
+    def test_whitelisted_query_parameters(self):
+        view = self.view(query_params=['lang'])
+        english = view(self.factory.get('/about/', {'lang': 'en', 'junk': '1'}))
+        self.assertEqual(view(self.factory.get('/about/', {'junk': '2', 'lang': 'en'}))['ETag'], english['ETag'])
+        french = view(self.factory.get('/about/', {'lang': 'fr'}))
+        self.assertEqual(french.content, b"page 2: fr")
+        self.assertNotEqual(french['ETag'], english['ETag'])
+
+    def test_new_build_or_data_invalidates(self):
+        view = self.view(data_version=lambda: self.data)
+        etag = view(self.factory.get('/about/'))['ETag']
+
+        self.data = 2
+        response = view(self.factory.get('/about/', headers={'if-none-match': etag}))
+        self.assertEqual((response.status_code, response.content), (200, b"page 2: "))
+
+        with mock.patch.object(page_cache, 'build_version', return_value='next-build'):
+            response = view(self.factory.get('/about/'))
+        self.assertEqual(response.content, b"page 3: ")
+
+    def test_other_methods_are_not_cached(self):
+        view = self.view()
+        view(self.factory.post('/about/'))
+        view(self.factory.post('/about/'))
+        self.assertEqual(self.calls, 2)
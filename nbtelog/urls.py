@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import api, views
 
 app_name = 'nbtelog'
 
@@ -9,6 +9,7 @@ urlpatterns = [
     path('news/', views.news_list, name='news_list'),
     path('news/<slug:slug>/', views.news_detail, name='news_detail'),
     path('search/', views.search, name='search'),
+    path('search/suggest/', views.search_suggest, name='search_suggest'),
     path('servicom/', views.servicom, name='servicom'),
     path('departments/aprs-ict/', views.aprs_ict, name='aprs_ict'),
     path('departments/nbte-coex/', views.nbtecoex, name='nbtecoex'),
@@ -21,5 +22,13 @@ urlpatterns = [
     path('nsqf/levels/', views.nsqf_levels, name='nsqf_levels'),
     path('research-development/', views.research_development, name='research_development'),
     path('downloads/', views.downloads, name='downloads'),
+    path('downloads/<int:pk>/', views.document_download, name='document_download'),
     path('chat/', views.chat, name='chat'),
+    path('chat/batch/', views.chat_batch, name='chat_batch'),
+    path('chat/stats/', views.chat_stats, name='chat_stats'),
+    path('api/institutions/', api.institutions, name='api_institutions'),
+    path('api/programs/', api.programs, name='api_programs'),
+    path('api/statistics/', api.statistics, name='api_statistics'),
+    path('metrics/', views.prometheus_metrics, name='metrics'),
+    path('api/export/<str:kind>.<str:format>', api.register_export, name='api_export'),
 ]
\ No newline at end of file
@@ -1,58 +1,51 @@
 from django.shortcuts import render, get_object_or_404
+from django.urls import reverse
 from django.core.paginator import Paginator
-from django.db.models import Q
-from django.utils.text import Truncator
-from .models import News, NewsCategory, Institution, Document, SliderImage, ChatBot
+from .models import News, NewsCategory, Institution, Program, Document
 from django.conf import settings
-from django.http import JsonResponse
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotAllowed, HttpResponseRedirect, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.encoding import filepath_to_uri
+from django.utils.http import content_disposition_header
+from django.views.decorators.cache import cache_control
 from django.views.decorators.csrf import csrf_exempt
+from django.contrib.admin.views.decorators import staff_member_required
+from . import chatbot, home, metrics, related, search_index, stats, suggest
+from .page_cache import cache_page_for_build
+from .pagination import keyset_paginate
+from .serving import DownloadCounter, RangeFile, if_range_matches, is_download_start, parse_range, presigned_url
 import json
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
 import logging
-from django.templatetags.static import static
+import os
 
 logger = logging.getLogger(__name__)
 
+SEARCH_RESULTS_PER_PAGE = 10
+NEWS_PER_PAGE = 5
+NEWS_COUNT_CACHE_SECONDS = 300
+DOCUMENT_MAX_AGE = 3600
+
+# Per-worker buffer of download counts, written to the database in batches
+download_counts = DownloadCounter(Document)
+download_counts.register_exit_flush()
+
 # Create your views here.
 def index(request):
-    slider_queryset = SliderImage.objects.filter(is_active=True).order_by('order')
-
-    if slider_queryset.exists():
-        slider_images = [
-            {
-                'url': slide.image.url,
-                'title': slide.title,
-                'caption': slide.caption,
-            }
-            for slide in slider_queryset
-        ]
-    else:
-        slider_images = [
-            {
-                'url': static(f'images/slide{i}.jpg'),
-                'title': f'Default Slide {i}',
-                'caption': '',
-            }
-            for i in range(1, 8)
-        ]
-
-    latest_news = News.objects.filter(status='published').order_by('-created_at')[:3]
-    
-    # Get featured institutions
-    featured_institutions = Institution.objects.all()[:3]
-    
+    # Slider, latest news and featured institutions come from the cache and
+    # are keyed on a stamp of the rows behind them (see nbtelog.home)
+    blocks = home.blocks()
     context = {
         'title': 'Home',
-        'slider_images': slider_images,
-        'latest_news': latest_news,
-        'featured_institutions': featured_institutions,
+        'slider_images': blocks['slider'],
+        'latest_news': blocks['news'],
+        'featured_institutions': blocks['institutions'],
     }
     return render(request, 'nbtelog/index.html', context)
 
 def news_list(request):
-    news_list = News.objects.filter(status='published').order_by('-created_at')
+    news_list = News.objects.filter(status='published').select_related('category', 'author')
     categories = NewsCategory.objects.all()
     
     # Filter by category if specified
@@ -60,14 +53,21 @@ def news_list(request):
     if category_slug:
         news_list = news_list.filter(category__slug=category_slug)
     
-    # Pagination
-    paginator = Paginator(news_list, 5)  # 5 articles per page
-    page = request.GET.get('page')
-    news = paginator.get_page(page)
+    # Keyset pagination on (created_at, id): every page is one indexed range
+    # query, however deep, and the total is a cached count
+    news = keyset_paginate(
+        news_list, ['-created_at', '-id'], NEWS_PER_PAGE,
+        after=request.GET.get('after'), before=request.GET.get('before'),
+    )
+    total_count = cache.get_or_set(
+        f'news_list:count:{category_slug or ""}', news_list.count, NEWS_COUNT_CACHE_SECONDS,
+    )
     
     context = {
         'title': 'News & Updates',
         'news': news,
+        'total_count': total_count,
+        'category_slug': category_slug,
         'categories': categories,
     }
     return render(request, 'nbtelog/news/list.html', context)
@@ -75,11 +75,14 @@ def news_list(request):
 def news_detail(request, slug):
     news = get_object_or_404(News, slug=slug, status='published')
     
-    # Get related news from the same category
-    related_news = News.objects.filter(
-        category=news.category,
-        status='published'
-    ).exclude(id=news.id)[:3]
+    # Precomputed most similar articles; fall back to the same category
+    # until the related table has been built for this article
+    related_news = related.related_for(news, limit=3)
+    if not related_news:
+        related_news = News.objects.filter(
+            category=news.category,
+            status='published'
+        ).exclude(id=news.id)[:3]
     
     context = {
         'title': news.title,
@@ -88,120 +91,167 @@ def news_detail(request, slug):
     }
     return render(request, 'nbtelog/news/detail.html', context)
 
+def _search_result(kind, obj, query):
+    if kind == 'news':
+        return {
+            'title': obj.title,
+            'excerpt': search_index.excerpt(obj.content, query),
+            'url': obj.get_absolute_url(),
+            'created_at': obj.created_at,
+            'type': 'News'
+        }
+    if kind == 'institution':
+        # Create an excerpt from address and other details
+        details = f"Code: {obj.code} | Address: {obj.address} | Status: {obj.accreditation_status}"
+        return {
+            'title': obj.name,
+            'excerpt': search_index.excerpt(details, query),
+            'url': obj.website if obj.website else '#',
+            'created_at': obj.established_date,
+            'type': 'Institution'
+        }
+    if kind == 'program':
+        details = (
+            f"{obj.qualification_type} at {obj.institution.name} | Code: {obj.code} | "
+            f"Duration: {obj.duration} | Status: {obj.accreditation_status} | {obj.description}"
+        )
+        return {
+            'title': obj.name,
+            'excerpt': search_index.excerpt(details, query),
+            'url': obj.institution.website if obj.institution.website else '#',
+            'created_at': None,
+            'type': 'Program'
+        }
+    return {
+        'title': obj.title,
+        'excerpt': search_index.excerpt(f"{obj.description} {obj.text}", query),
+        'url': reverse('nbtelog:document_download', args=[obj.pk]),
+        'created_at': obj.uploaded_at,
+        'type': 'Document'
+    }
+
 def search(request):
     query = request.GET.get('q', '')
     results = []
+    page_obj = page_range = None
     
     if query:
-        # Search in News
-        news_results = News.objects.filter(
-            Q(title__icontains=query) |
-            Q(content__icontains=query),
-            status='published'
-        )
-        
-        # Search in Institutions
-        institution_results = Institution.objects.filter(
-            Q(name__icontains=query) |
-            Q(code__icontains=query) |
-            Q(address__icontains=query)
-        )
+        # Ranked (kind, id, score) hits from the search index; only the rows
+        # on the requested page are loaded and excerpted
+        hits = search_index.search(query)
+        paginator = Paginator(hits, SEARCH_RESULTS_PER_PAGE)
+        page_obj = paginator.get_page(request.GET.get('page'))
+        page_range = paginator.get_elided_page_range(page_obj.number)
         
-        # Process results to have consistent attributes
-        processed_results = []
-        
-        # Process News results
-        for news in news_results:
-            excerpt = Truncator(news.content).words(30)
-            processed_results.append({
-                'title': news.title,
-                'excerpt': excerpt,
-                'url': news.get_absolute_url() if hasattr(news, 'get_absolute_url') else '#',
-                'created_at': news.created_at,
-                'type': 'News'
-            })
-        
-        # Process Institution results
-        for inst in institution_results:
-            # Create an excerpt from address and other details
-            details = f"Code: {inst.code} | Address: {inst.address} | Status: {inst.accreditation_status}"
-            excerpt = Truncator(details).words(30)
-            processed_results.append({
-                'title': inst.name,
-                'excerpt': excerpt,
-                'url': inst.website if inst.website else '#',
-                'created_at': inst.established_date,
-                'type': 'Institution'
-            })
+        page_hits = page_obj.object_list
+        querysets = {
+            'news': News.objects.all(),
+            'institution': Institution.objects.all(),
+            'program': Program.objects.select_related('institution'),
+            'document': Document.objects.all(),
+        }
+        objects = {
+            kind: queryset.in_bulk([pk for hit_kind, pk, _ in page_hits if hit_kind == kind])
+            for kind, queryset in querysets.items()
+            if any(hit_kind == kind for hit_kind, _, _ in page_hits)
+        }
         
-        results = processed_results
+        for kind, pk, score in page_hits:
+            obj = objects.get(kind, {}).get(pk)
+            if obj is not None:
+                results.append(_search_result(kind, obj, query))
     
     context = {
         'query': query,
         'results': results,
+        'page_obj': page_obj,
+        'page_range': page_range,
         'title': 'Search Results',
     }
     return render(request, 'nbtelog/search.html', context)
 
+@cache_control(public=True, max_age=60)
+def search_suggest(request):
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', suggest.DEFAULT_LIMIT)), suggest.MAX_LIMIT)
+    except ValueError:
+        limit = suggest.DEFAULT_LIMIT
+    # Served from the in-memory suggestion index, not the database
+    return JsonResponse({'q': query, 'suggestions': suggest.suggest(query, limit)})
+
+@cache_page_for_build
 def about_us(request):
     context = {
         'title': 'About the National Board for Technical Education',
     }
     return render(request, 'nbtelog/about.html', context)
 
+@cache_page_for_build
 def servicom(request):
     context = {
         'title': 'SERVICOM - NBTE',
     }
     return render(request, 'nbtelog/servicom.html', context)
 
+@cache_page_for_build(data_version=stats.version, max_age=60)
 def aprs_ict(request):
     context = {
         'title': 'Academic Planning, Research, Statistics and ICT - NBTE',
+        'statistics': stats.summary(),
     }
     return render(request, 'nbtelog/departments/aprs_ict.html', context)
 
+@cache_page_for_build
 def nbtecoex(request):
     context = {
         'title': 'NBTE Centre of Excellence',
     }
     return render(request, 'nbtelog/nbtecoex.html', context)
 
+@cache_page_for_build
 def tvet_institutions(request):
     return render(request, 'nbtelog/tvet_institutions.html', {
         'title': 'TVET Institutions'
     })
 
+@cache_page_for_build
 def odfel(request):
     return render(request, 'nbtelog/odfel.html', {
         'title': 'Open Distance and Flexible e-Learning (ODFeL)'
     })
 
+@cache_page_for_build
 def odfel_guidelines(request):
     return render(request, 'nbtelog/odfel_guidelines.html', {
         'title': 'Guidelines for ODFeL Programme'
     })
 
+@cache_page_for_build
 def nsq_benefits(request):
     return render(request, 'nbtelog/nsq_benefits.html', {
         'title': 'Benefits of NSQ'
     })
 
+@cache_page_for_build
 def nsq(request):
     return render(request, 'nbtelog/nsq.html', {
         'title': 'National Skills Qualifications (NSQ)'
     })
 
+@cache_page_for_build
 def nsqf(request):
     return render(request, 'nbtelog/nsqf.html', {
         'title': 'Nigerian Skills Qualifications Framework (NSQF)'
     })
 
+@cache_page_for_build
 def nsqf_levels(request):
     return render(request, 'nbtelog/nsqf_levels.html', {
         'title': 'NSQF 9-Level Framework'
     })
 
+@cache_page_for_build
 def research_development(request):
     context = {
         'title': 'Research & Development',
@@ -211,15 +261,10 @@ def research_development(request):
 
 def downloads(request):
     try:
-        # Fetch all documents and order by most recent
-        documents = Document.objects.all().order_by('-uploaded_at')
-        
-        # Add file size information
-        for doc in documents:
-            try:
-                doc.file.size  # This will raise an error if file is missing
-            except:
-                doc.file = None  # Set to None if file is missing
+        # Fetch all documents and order by most recent. Size and existence
+        # are stored on the row (see sync_document_metadata), so listing
+        # them does not touch storage.
+        documents = Document.objects.defer('extracted_text').order_by('-uploaded_at')
         
         context = {
             'title': 'Downloads',
@@ -236,77 +281,127 @@ def downloads(request):
         }
         return render(request, 'nbtelog/downloads.html', context)
 
+def document_download(request, pk):
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
+
+    document = get_object_or_404(Document.objects.defer('extracted_text'), pk=pk)
+    if not document.file or document.file_exists is False:
+        raise Http404("Document file is missing")
+
+    name = document.file.name
+    storage = document.file.storage
+    filename = os.path.basename(name)
+    # The stored checksum makes a strong validator, as long as it belongs to
+    # the current file
+    etag = f'"{document.checksum[:32]}"' if document.checksum and document.metadata_from == name else None
+
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        return response
+
+    if is_download_start(request):
+        download_counts.add(document.pk)
+
+    try:
+        path = storage.path(name)
+    except NotImplementedError:
+        path = None
+
+    if path is None:
+        # Remote storage: send the browser to the file itself
+        if hasattr(storage, 'bucket'):
+            url = presigned_url(
+                storage, name, settings.DOCUMENT_URL_EXPIRY,
+                content_disposition_header(False, filename),
+            )
+        else:
+            url = storage.url(name)
+        response = HttpResponseRedirect(url)
+        patch_cache_control(response, private=True, max_age=max(settings.DOCUMENT_URL_EXPIRY // 2, 0))
+        return response
+
+    mode = settings.DOCUMENT_SERVE_MODE
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        # The front proxy sends the file and handles ranges itself
+        response = HttpResponse(content_type=document.content_type or None)
+        if mode == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = settings.DOCUMENT_ACCEL_PREFIX.rstrip('/') + '/' + filepath_to_uri(name)
+        else:
+            response['X-Sendfile'] = path
+        response['Content-Disposition'] = content_disposition_header(False, filename)
+    else:
+        try:
+            fileobj = open(path, 'rb')
+        except FileNotFoundError:
+            raise Http404("Document file is missing")
+        size = os.fstat(fileobj.fileno()).st_size
+
+        byte_range = None
+        if if_range_matches(request.headers.get('If-Range'), etag):
+            try:
+                byte_range = parse_range(request.headers.get('Range'), size)
+            except ValueError:
+                fileobj.close()
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f"bytes */{size}"
+                return response
+
+        start, end = byte_range or (0, size - 1)
+        fileobj.seek(start)
+        # With gunicorn the body goes out through sendfile(); elsewhere it
+        # is read in FileResponse.block_size chunks
+        response = FileResponse(
+            RangeFile(fileobj, end - start + 1),
+            filename=filename,
+            **({'content_type': document.content_type} if document.content_type else {}),
+        )
+        response['Content-Length'] = end - start + 1
+        response['Accept-Ranges'] = 'bytes'
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f"bytes {start}-{end}/{size}"
+
+    if etag:
+        response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=DOCUMENT_MAX_AGE)
+    return response
+
 @csrf_exempt
-def chat(request):
+async def chat(request):
     if request.method == 'POST':
         try:
             data = json.loads(request.body)
             user_message = data.get('message', '').lower()
             
-            logger.info(f"Received message: {user_message}")
+            logger.debug(f"Received message: {user_message}")
             
-            # Get all active chatbot entries
-            chatbot_entries = ChatBot.objects.filter(is_active=True)
-            logger.info(f"Found {chatbot_entries.count()} active chatbot entries")
+            # The fitted index is shared by every request in this worker and
+            # only rebuilt when the ChatBot table changes
+            index = await chatbot.aget_index()
             
-            if not chatbot_entries:
+            if not len(index):
                 logger.warning("No active chatbot entries found")
                 return JsonResponse({
-                    'response': "I'm sorry, I'm not configured yet. Please try again later."
+                    'response': chatbot.NOT_CONFIGURED_RESPONSE
                 })
             
-            # Convert QuerySet to list for easier indexing
-            chatbot_entries_list = list(chatbot_entries)
-            
-            # Prepare data for similarity matching
-            questions = [entry.question.lower() for entry in chatbot_entries_list]
-            keywords_list = [entry.keywords.lower().split(',') for entry in chatbot_entries_list]
-            
-            logger.info(f"Processing {len(questions)} questions for matching")
-            
-            # Create TF-IDF vectorizer
-            vectorizer = TfidfVectorizer()
-            tfidf_matrix = vectorizer.fit_transform(questions + [user_message])
-            
-            # Calculate similarity scores
-            similarity_scores = cosine_similarity(
-                tfidf_matrix[-1:], 
-                tfidf_matrix[:-1]
-            )[0]
-            
-            # Get the best match
-            best_match_idx = int(np.argmax(similarity_scores))  # Convert to Python int
-            best_match_score = float(similarity_scores[best_match_idx])  # Convert to Python float
-            
-            logger.info(f"Best match score: {best_match_score}")
-            
-            # Check if the match is good enough
-            if best_match_score > 0.3:  # Threshold for matching
-                response = chatbot_entries_list[best_match_idx].answer
-                logger.info(f"Using similarity match: {response[:50]}...")
-            else:
-                # Check for keyword matches
-                keyword_matches = []
-                for idx, keywords in enumerate(keywords_list):
-                    matches = [k for k in keywords if k in user_message]
-                    if matches:
-                        keyword_matches.append((idx, len(matches)))
-                        logger.info(f"Found keyword matches: {matches}")
-                
-                if keyword_matches:
-                    # Get the entry with most keyword matches
-                    best_keyword_match = max(keyword_matches, key=lambda x: x[1])
-                    response = chatbot_entries_list[best_keyword_match[0]].answer
-                    logger.info(f"Using keyword match: {response[:50]}...")
-                else:
-                    response = "I'm sorry, I don't understand your question. Please try rephrasing or contact our support team."
-                    logger.info("No matches found, using default response")
+            # Answers are cached per normalized message; misses are scored on
+            # a bounded thread pool and shed with a 503 when it is full
+            response, confidence = await chatbot.aanswer(index, user_message)
             
             return JsonResponse({
                 'response': response,
-                'confidence': best_match_score if best_match_score > 0.3 else 0.0
+                'confidence': confidence
             })
             
+        except chatbot.ChatBotBusy:
+            logger.warning("Chatbot scoring pool is full, shedding request")
+            return JsonResponse(
+                {'response': chatbot.BUSY_RESPONSE, 'error': 'busy'},
+                status=503,
+                headers={'Retry-After': '1'},
+            )
         except json.JSONDecodeError as e:
             logger.error(f"JSON decode error: {str(e)}")
             return JsonResponse({
@@ -321,3 +416,52 @@ def chat(request):
             })
     
     return JsonResponse({'error': 'Invalid request method'})
+
+@csrf_exempt
+def chat_batch(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Invalid request method'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+    except json.JSONDecodeError as e:
+        return JsonResponse({'error': f"Invalid JSON: {e}"}, status=400)
+
+    messages = data.get('messages') if isinstance(data, dict) else None
+    if not isinstance(messages, list) or not all(isinstance(m, str) for m in messages):
+        return JsonResponse({'error': "'messages' must be a list of strings"}, status=400)
+    if len(messages) > chatbot.MAX_BATCH_MESSAGES:
+        return JsonResponse({'error': f"At most {chatbot.MAX_BATCH_MESSAGES} messages per request"}, status=400)
+
+    try:
+        k = int(data.get('k', 5))
+    except (TypeError, ValueError):
+        return JsonResponse({'error': "'k' must be an integer"}, status=400)
+    k = max(1, min(k, chatbot.MAX_TOP_K))
+
+    # All messages are scored against the cached question matrix at once
+    index = chatbot.get_index()
+    results = index.top_k([message.lower() for message in messages], k=k)
+    logger.info(f"Answered batch of {len(messages)} messages")
+
+    return JsonResponse({'results': results})
+
+
+@staff_member_required
+def chat_stats(request):
+    return JsonResponse({'response_cache': chatbot.response_cache.stats()})
+
+
+def prometheus_metrics(request):
+    token = settings.METRICS_TOKEN
+    authorized = request.user.is_active and request.user.is_staff
+    if token and not authorized:
+        authorized = constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not authorized:
+        return HttpResponse('Forbidden', status=403, content_type='text/plain')
+
+    response = HttpResponse(
+        metrics.render(metrics.collect()), content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+    patch_cache_control(response, no_store=True)
+    return response
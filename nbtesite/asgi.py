@@ -3,6 +3,24 @@ ASGI config for nbtesite project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Running under ASGI lets the async /chat/ view wait on the database and the
+chatbot scoring pool without holding a worker. Set SERVER_MODE=asgi for the
+entrypoint scripts, or run it directly:
+
+    gunicorn nbtesite.asgi:application -k uvicorn_worker.UvicornWorker -w 4
+
+Django runs the synchronous HTML views on a single thread per ASGI worker, so
+keep several workers. To isolate chat traffic completely, run an ASGI
+process for /chat/ next to the usual WSGI workers and route the path to it
+from the front proxy. CHATBOT_WORKERS and CHATBOT_MAX_PENDING bound the
+scoring pool; past that limit /chat/ answers 503 with Retry-After.
+
+WhiteNoiseMiddleware only has a sync mode. With it in MIDDLEWARE, Django
+runs it and every middleware above it (MetricsMiddleware and Django's own
+included) on a thread, and /chat/ is handed back to the event loop below
+it. To keep the whole chain async, serve /static/ from the front proxy and
+take WhiteNoiseMiddleware out of MIDDLEWARE for the ASGI processes.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
 """
@@ -14,3 +32,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nbtesite.settings')
 
 application = get_asgi_application()
+
+# Build the search suggestions once per worker, off the request path
+from nbtelog import suggest  # noqa: E402
+
+suggest.start_refresher()
@@ -54,11 +54,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'nbtelog.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    # Sync-only: under ASGI it and the middleware above it run on a thread
+    # (see nbtesite/asgi.py)
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
@@ -105,6 +108,12 @@ DATABASES['default'] = dj_database_url.config(
     conn_health_checks=True,
 )
 
+# Cache
+# e.g. CACHE_URL=redis://localhost:6379/1 to share cached pages between workers
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -149,8 +158,6 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'nbtesite', 'static'),
 ]
 
-STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
-
 # Media files
 USE_S3 = env('USE_S3', default='False') == 'True'
 
@@ -164,20 +171,64 @@ if USE_S3:
     AWS_S3_FILE_OVERWRITE = False
     AWS_QUERYSTRING_AUTH = False
     AWS_S3_ADDRESSING_STYLE = "virtual"
+    # Point at an S3-compatible stand-in (MinIO, moto_server) for local testing
+    AWS_S3_ENDPOINT_URL = env('AWS_S3_ENDPOINT_URL', default=None)
 
     AWS_S3_CUSTOM_DOMAIN = f"{AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com"
 
-    DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
+    MEDIA_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
     MEDIA_URL = f"https://{AWS_S3_CUSTOM_DOMAIN}/"
 else:
     MEDIA_URL = "/media/"
     MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+    MEDIA_STORAGE = "django.core.files.storage.FileSystemStorage"
+
+# DEFAULT_FILE_STORAGE and STATICFILES_STORAGE were removed in Django 5.1
+# and are ignored there, so both storages are configured here
+STORAGES = {
+    "default": {"BACKEND": MEDIA_STORAGE},
+    "staticfiles": {"BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage"},
+}
+
+# How /downloads/<id>/ hands documents out: 'django' streams them itself,
+# 'x-accel-redirect' (nginx) and 'x-sendfile' (Apache, lighttpd) let the
+# front proxy send the file. Documents in S3 are always a redirect to a
+# presigned URL valid for DOCUMENT_URL_EXPIRY seconds.
+DOCUMENT_SERVE_MODE = env('DOCUMENT_SERVE_MODE', default='django')
+# nginx "internal" location that maps to MEDIA_ROOT, used with x-accel-redirect
+DOCUMENT_ACCEL_PREFIX = env('DOCUMENT_ACCEL_PREFIX', default='/protected-media/')
+DOCUMENT_URL_EXPIRY = env.int('DOCUMENT_URL_EXPIRY', default=300)
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Chatbot scoring backend: 'lean' (NumPy only) or 'sklearn' (optional,
+# imported lazily when the chatbot index is first built)
+CHATBOT_BACKEND = env('CHATBOT_BACKEND', default='lean')
+
+# Per-worker cache of chatbot answers keyed on the normalized message
+CHATBOT_CACHE_SIZE = env.int('CHATBOT_CACHE_SIZE', default=1024)
+CHATBOT_CACHE_TTL = env.int('CHATBOT_CACHE_TTL', default=3600)
+
+# Threads that score chat messages for the async view, and how many messages
+# may wait for them before /chat/ answers 503
+CHATBOT_WORKERS = env.int('CHATBOT_WORKERS', default=2)
+CHATBOT_MAX_PENDING = env.int('CHATBOT_MAX_PENDING', default=16)
+
+# Static info pages (see nbtelog.page_cache): how long rendered pages stay in
+# the server cache and how long browsers may reuse them without asking again
+PAGE_CACHE_TIMEOUT = env.int('PAGE_CACHE_TIMEOUT', default=7 * 24 * 3600)
+PAGE_CACHE_MAX_AGE = env.int('PAGE_CACHE_MAX_AGE', default=24 * 3600)
+
+# Request metrics (see nbtelog.metrics), served in Prometheus format at
+# /metrics/ to staff users or with "Authorization: Bearer <METRICS_TOKEN>".
+# With several workers set METRICS_DIR to a directory they all share, and
+# clear it before the server starts.
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+METRICS_DIR = env('METRICS_DIR', default='')
+
 # Logging Configuration
 LOGGING = {
     'version': 1,
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'nbtesite.settings')
 
 application = get_wsgi_application()
+
+# Build the search suggestions once per worker, off the request path
+from nbtelog import suggest  # noqa: E402
+
+suggest.start_refresher()